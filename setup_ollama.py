@@ -3,16 +3,21 @@
 Script de configuration et vérification d'Ollama pour l'application Django
 """
 
+import os
 import requests
 import subprocess
 import sys
 import time
 from pathlib import Path
 
+# Même variable que l'application : permet de viser un serveur distant ou le
+# serveur factice (python manage.py mock_ollama)
+OLLAMA_URL = os.getenv('OLLAMA_URL', 'http://localhost:11434')
+
 def check_ollama_running():
     """Vérifie si Ollama est en cours d'exécution"""
     try:
-        response = requests.get("http://localhost:11434/api/tags", timeout=5)
+        response = requests.get(f"{OLLAMA_URL}/api/tags", timeout=5)
         return response.status_code == 200
     except:
         return False
@@ -20,7 +25,7 @@ def check_ollama_running():
 def get_available_models():
     """Récupère les modèles disponibles"""
     try:
-        response = requests.get("http://localhost:11434/api/tags", timeout=5)
+        response = requests.get(f"{OLLAMA_URL}/api/tags", timeout=5)
         if response.status_code == 200:
             data = response.json()
             return [model['name'] for model in data.get('models', [])]
@@ -106,7 +111,7 @@ def main():
     print("\n3. Test de l'API Ollama...")
     try:
         import ollama
-        client = ollama.Client(host='http://localhost:11434')
+        client = ollama.Client(host=OLLAMA_URL)
         
         # Test avec le premier modèle disponible
         final_models = get_available_models()
@@ -17,6 +17,7 @@ document.addEventListener('DOMContentLoaded', function() {
     initializeKeyboardShortcuts();
     initializeTooltips();
     initializeLazyLoading();
+    initializeFragmentNavigation();
 });
 
 // ===== FONCTION D'INITIALISATION PRINCIPALE =====
@@ -191,12 +192,35 @@ function getCustomErrorMessage(field) {
 }
 
 // ===== GESTION AJAX =====
+
+// Requêtes GET en cours, partagées entre appelants identiques
+const inflightGets = new Map();
+
 function initializeAjaxHandlers() {
     // Configuration globale pour les requêtes AJAX
     const originalFetch = window.fetch;
     window.fetch = function(...args) {
         const [url, config = {}] = args;
+        const method = (config.method || 'GET').toUpperCase();
+        
+        // Dé-duplication : un GET identique déjà en vol est réutilisé
+        // (ex. insights demandés par le bouton puis par Ctrl+I)
+        if (method === 'GET' && !config.body) {
+            const key = String(url);
+            if (!inflightGets.has(key)) {
+                const shared = sendRequest(url, config).finally(() => {
+                    inflightGets.delete(key);
+                });
+                inflightGets.set(key, shared);
+            }
+            // Chaque appelant reçoit sa propre copie du corps de la réponse
+            return inflightGets.get(key).then(response => response.clone());
+        }
         
+        return sendRequest(url, config);
+    };
+    
+    function sendRequest(url, config) {
         // Ajouter automatiquement le token CSRF
         if (config.method && config.method.toUpperCase() !== 'GET') {
             config.headers = {
@@ -204,18 +228,18 @@ function initializeAjaxHandlers() {
                 'X-CSRFToken': getCsrfToken()
             };
         }
-        
+    
         // Ajouter un indicateur de chargement
         const loadingIndicator = showLoadingIndicator();
-        
+    
         return originalFetch(url, config)
             .then(response => {
                 hideLoadingIndicator(loadingIndicator);
-                
+            
                 if (!response.ok) {
                     throw new Error(`HTTP ${response.status}: ${response.statusText}`);
                 }
-                
+            
                 return response;
             })
             .catch(error => {
@@ -224,7 +248,7 @@ function initializeAjaxHandlers() {
                 showToast('Erreur de connexion au serveur', 'error');
                 throw error;
             });
-    };
+    }
 }
 
 function getCsrfToken() {
@@ -418,41 +442,135 @@ function initializeAutoSave() {
 
 // ===== GESTION SPÉCIFIQUE AUX TÂCHES =====
 
-// Changer le statut d'une tâche
-async function toggleTaskStatus(taskId) {
+const STATUS_CYCLE = { todo: 'doing', doing: 'done', done: 'todo' };
+const STATUS_LABELS = { todo: 'À faire', doing: 'En cours', done: 'Terminé' };
+const TOGGLE_BATCH_DELAY = 400;
+
+// File des changements de statut optimistes, envoyés par lots au serveur
+const statusQueue = {
+    pending: new Map(),   // taskId -> nombre de clics non envoyés
+    snapshots: new Map(), // taskId -> statut confirmé par le serveur (pour annuler)
+    timer: null,
+    flushing: null
+};
+
+// Changer le statut d'une tâche : mise à jour immédiate de l'interface,
+// envoi regroupé (debounce) avec les autres clics de la fenêtre
+function toggleTaskStatus(taskId) {
+    taskId = String(taskId);
+    const current = getTaskStatusFromDOM(taskId);
+    
+    if (!statusQueue.snapshots.has(taskId)) {
+        statusQueue.snapshots.set(taskId, current);
+    }
+    statusQueue.pending.set(taskId, (statusQueue.pending.get(taskId) || 0) + 1);
+    
+    const optimistic = STATUS_CYCLE[current] || 'todo';
+    updateTaskStatusInDOM(taskId, optimistic, STATUS_LABELS[optimistic]);
+    
+    clearTimeout(statusQueue.timer);
+    statusQueue.timer = setTimeout(flushStatusQueue, TOGGLE_BATCH_DELAY);
+}
+
+async function flushStatusQueue() {
+    // Un seul lot en vol : les clics suivants attendent le prochain envoi
+    if (statusQueue.flushing) {
+        await statusQueue.flushing;
+    }
+    if (statusQueue.pending.size === 0) {
+        return;
+    }
+    
+    const batch = new Map(statusQueue.pending);
+    statusQueue.pending.clear();
+    
+    statusQueue.flushing = sendStatusBatch(batch).finally(() => {
+        statusQueue.flushing = null;
+    });
+    return statusQueue.flushing;
+}
+
+async function sendStatusBatch(batch) {
+    const tasks = [...batch].map(([id, toggles]) => ({ id: Number(id), toggles }));
+    
     try {
-        const response = await fetch(`/task/${taskId}/toggle-status/`, {
+        const response = await fetch('/api/tasks/toggle-status/', {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json',
-            }
+            },
+            body: JSON.stringify({ tasks })
         });
-        
         const data = await response.json();
         
-        if (data.success) {
-            showToast(`Statut changé vers "${data.status_display}"`, 'success');
-            
-            // Mettre à jour l'interface sans recharger
-            updateTaskStatusInDOM(taskId, data.new_status, data.status_display);
-        } else {
+        if (!data.success) {
             throw new Error(data.error || 'Erreur lors du changement de statut');
         }
+        
+        // Réconciliation : le serveur fait foi
+        let failures = 0;
+        data.results.forEach(result => {
+            const id = String(result.id);
+            if (result.success) {
+                reconcileTaskStatus(id, result.new_status, result.status_display);
+            } else {
+                failures++;
+                rollbackTaskStatus(id);
+            }
+        });
+        
+        if (failures) {
+            showToast(`${failures} changement(s) de statut refusé(s)`, 'error');
+        } else if (data.results.length === 1) {
+            showToast(`Statut changé vers "${data.results[0].status_display}"`, 'success');
+        } else {
+            showToast(`${data.results.length} statuts mis à jour`, 'success');
+        }
     } catch (error) {
         console.error('Erreur:', error);
+        batch.forEach((_, id) => rollbackTaskStatus(id));
         showToast('Erreur lors du changement de statut', 'error');
     }
 }
 
+function reconcileTaskStatus(taskId, serverStatus, statusDisplay) {
+    // Des clics survenus pendant l'envoi restent appliqués par-dessus l'état serveur
+    let status = serverStatus;
+    for (let i = 0; i < (statusQueue.pending.get(taskId) || 0); i++) {
+        status = STATUS_CYCLE[status];
+    }
+    if (statusQueue.pending.has(taskId)) {
+        statusQueue.snapshots.set(taskId, serverStatus);
+    } else {
+        statusQueue.snapshots.delete(taskId);
+    }
+    updateTaskStatusInDOM(taskId, status, status === serverStatus ? statusDisplay : STATUS_LABELS[status]);
+}
+
+function rollbackTaskStatus(taskId) {
+    const confirmed = statusQueue.snapshots.get(taskId);
+    statusQueue.snapshots.delete(taskId);
+    statusQueue.pending.delete(taskId);
+    if (confirmed) {
+        updateTaskStatusInDOM(taskId, confirmed, STATUS_LABELS[confirmed]);
+    }
+}
+
+function getTaskStatusFromDOM(taskId) {
+    const badge = document.querySelector(`.task-status-badge[data-task-id="${taskId}"]`);
+    return badge ? badge.dataset.status : 'todo';
+}
+
 function updateTaskStatusInDOM(taskId, newStatus, statusDisplay) {
+    // Tous les badges de statut de la tâche (carte de la liste, en-tête et
+    // informations de la page de détail)
+    document.querySelectorAll(`.task-status-badge[data-task-id="${taskId}"]`).forEach(statusBadge => {
+        statusBadge.textContent = statusDisplay;
+        statusBadge.dataset.status = newStatus;
+    });
+    
     const taskCard = document.querySelector(`[data-task-id="${taskId}"]`)?.closest('.task-card');
     if (taskCard) {
-        // Mettre à jour le badge de statut
-        const statusBadge = taskCard.querySelector('.badge.bg-secondary');
-        if (statusBadge) {
-            statusBadge.textContent = statusDisplay;
-        }
-        
         // Ajouter une animation
         taskCard.style.transform = 'scale(1.05)';
         setTimeout(() => {
@@ -543,8 +661,71 @@ function initializeSearch() {
 }
 
 async function performSearch(query) {
-    // Implémenter la recherche en temps réel si nécessaire
-    console.log('Recherche:', query);
+    // Recherche en temps réel : soumission du filtre en mode fragment
+    const filterForm = document.getElementById('task-filter-form');
+    if (filterForm) {
+        filterForm.requestSubmit();
+    }
+}
+
+// ===== NAVIGATION PAR FRAGMENTS =====
+
+// Filtrage et pagination sans rechargement : seul le fragment HTML de la
+// grille est demandé au serveur puis remplacé dans la page
+function initializeFragmentNavigation() {
+    const grid = document.getElementById('task-grid');
+    const filterForm = document.getElementById('task-filter-form');
+    if (!grid || !filterForm) {
+        return;
+    }
+    
+    filterForm.addEventListener('submit', function(event) {
+        event.preventDefault();
+        const params = new URLSearchParams(new FormData(filterForm));
+        for (const [key, value] of [...params]) {
+            if (!value) {
+                params.delete(key);
+            }
+        }
+        const query = params.toString();
+        loadTaskGrid(window.location.pathname + (query ? `?${query}` : ''));
+    });
+
+    // Changement de tri appliqué immédiatement
+    const sortSelect = filterForm.querySelector('#sort');
+    if (sortSelect) {
+        sortSelect.addEventListener('change', () => filterForm.requestSubmit());
+    }
+
+    grid.addEventListener('click', function(event) {
+        const link = event.target.closest('.pagination a');
+        if (link) {
+            event.preventDefault();
+            loadTaskGrid(link.href);
+        }
+    });
+    
+    window.addEventListener('popstate', function() {
+        loadTaskGrid(window.location.href, false);
+    });
+}
+
+async function loadTaskGrid(url, pushState = true) {
+    const grid = document.getElementById('task-grid');
+    const target = new URL(url, window.location.origin);
+    const fragmentUrl = new URL(target);
+    fragmentUrl.searchParams.set('fragment', 'html');
+    
+    try {
+        const response = await fetch(fragmentUrl);
+        grid.innerHTML = await response.text();
+        if (pushState && target.href !== window.location.href) {
+            history.pushState(null, '', target);
+        }
+    } catch (error) {
+        // Repli : navigation classique
+        window.location.href = target.href;
+    }
 }
 
 // ===== FONCTIONS D'EXPORT =====
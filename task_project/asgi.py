@@ -5,6 +5,10 @@ It exposes the ASGI callable as a module-level variable named ``application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
+
+Les vues d'insights IA sont asynchrones : servies par un serveur ASGI
+(ex. ``uvicorn task_project.asgi:application``), un seul processus peut
+traiter des centaines d'appels lents à Ollama en parallèle.
 """
 
 import os
@@ -14,3 +18,8 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'task_project.settings')
 
 application = get_asgi_application()
+
+# Préchauffage de l'intégration IA en arrière-plan, une fois le worker prêt
+from tasks.warmup import warm_up_in_background  # noqa: E402
+
+warm_up_in_background()
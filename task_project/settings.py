@@ -28,9 +28,10 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 SECRET_KEY = 'django-insecure-m!pwy4$sjgf=%r24r(*x@r2)6=%n^pw%0ol$d@dvfb8y&637k9'
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+DEBUG = os.getenv('DJANGO_DEBUG', 'True') == 'True'
 
-ALLOWED_HOSTS = ['RubensDevx.pythonanywhere.com']
+# Liste séparée par des virgules (ex. `127.0.0.1` pour un serveur de test local)
+ALLOWED_HOSTS = os.getenv('ALLOWED_HOSTS', 'RubensDevx.pythonanywhere.com').split(',')
 
 
 # Application definition
@@ -46,6 +47,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'tasks.metrics.MetricsMiddleware',
+    'tasks.assets.PrecompressedStaticMiddleware',
+    'django.middleware.gzip.GZipMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -81,9 +85,28 @@ WSGI_APPLICATION = 'task_project.wsgi.application'
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        # Fichier de base substituable (ex. base jetable de manage.py loadtest_http)
+        'NAME': os.getenv('SQLITE_PATH', BASE_DIR / 'db.sqlite3'),
+        'OPTIONS': {
+            'transaction_mode': os.getenv('SQLITE_TRANSACTION_MODE', 'DEFERRED'),
+            'timeout': float(os.getenv('SQLITE_TIMEOUT', '20')),
+            'init_command': f"PRAGMA journal_mode={os.getenv('SQLITE_JOURNAL_MODE', 'WAL')}",
+        },
     }
 }
+# SQLITE_TRANSACTION_MODE : DEFERRED par défaut (comportement de Django). En
+# DEFERRED, une transaction qui lit puis écrit échoue aussitôt en « database
+# is locked » si un autre écrivain a validé entre les deux, sans attendre
+# SQLITE_TIMEOUT ; IMMEDIATE prend le verrou d'écriture dès l'ouverture de
+# chaque bloc atomic() (attente au lieu de l'échec, mais blocs en lecture
+# seule sérialisés eux aussi). À ne changer que sur mesures : seul le serveur
+# lancé par manage.py loadtest_http passe en IMMEDIATE.
+# SQLITE_TIMEOUT : attente maximale du verrou (secondes).
+# SQLITE_JOURNAL_MODE : WAL par défaut, appliqué à chaque connexion. Les
+# lectures (requêtes des pages, sauvegarde en ligne de manage.py backup_db)
+# ne bloquent plus les écritures et inversement ; la sauvegarde copie alors
+# la base en une seule étape sans reprise. DELETE rétablit le journal
+# classique (ex. base sur un système de fichiers réseau, où WAL est exclu).
 
 
 # Password validation
@@ -118,8 +141,19 @@ USE_TZ = True
 
 STATIC_URL = '/static/'
 STATICFILES_DIRS = [
-    BASE_DIR / 'staticfiles',
+    BASE_DIR / 'static',
 ]
+# Destination de collectstatic (fichiers minifiés, avec empreinte et précompressés)
+STATIC_ROOT = BASE_DIR / 'staticfiles'
+
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'tasks.assets.OptimizedManifestStaticFilesStorage',
+    },
+}
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
@@ -134,11 +168,108 @@ MEDIA_ROOT = BASE_DIR / 'media'
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Authentification : chaque utilisateur ne voit que ses propres tâches
+LOGIN_URL = 'login'
+LOGIN_REDIRECT_URL = 'tasks:task_list'
+LOGOUT_REDIRECT_URL = 'login'
+
 # Configuration Ollama
 OLLAMA_URL = os.getenv('OLLAMA_URL', 'http://localhost:11434')
 OLLAMA_MODEL = os.getenv('OLLAMA_MODEL', 'llama3.1:latest')
+# Préchauffage (import de tasks.ai et connexion à Ollama) au chargement des workers
+OLLAMA_WARMUP = os.getenv('OLLAMA_WARMUP', 'True') == 'True'
+# Limiteur d'appels aux modèles (tasks/limiter.py), par processus : appels
+# simultanés, profondeur maximale de chaque voie et attente maximale (secondes)
+OLLAMA_CONCURRENCY = int(os.getenv('OLLAMA_CONCURRENCY', '2'))
+OLLAMA_QUEUE_LIMITS = {
+    'interactive': int(os.getenv('OLLAMA_QUEUE_LIMIT', '20')),
+    'background': 100,
+    'batch': 1000,
+}
+OLLAMA_QUEUE_TIMEOUT = float(os.getenv('OLLAMA_QUEUE_TIMEOUT', '120'))
+# Gestion du modèle (tasks/ai.py) : durée de mise en cache du modèle choisi
+# (secondes), durée de maintien en mémoire demandée à Ollama (`keep_alive`)
+# et intervalle des pings qui le gardent chargé (0 = pas de ping)
+OLLAMA_MODEL_CACHE_TTL = float(os.getenv('OLLAMA_MODEL_CACHE_TTL', '300'))
+OLLAMA_KEEP_ALIVE = os.getenv('OLLAMA_KEEP_ALIVE', '30m')
+OLLAMA_PING_INTERVAL = float(os.getenv('OLLAMA_PING_INTERVAL', '600'))
+
+# Index sémantique : 'ollama' (endpoint /api/embeddings) ou 'hash' (déterministe, hors ligne)
+SEMANTIC_EMBEDDER = os.getenv('SEMANTIC_EMBEDDER', 'ollama')
+OLLAMA_EMBED_MODEL = os.getenv('OLLAMA_EMBED_MODEL', 'nomic-embed-text')
+# Limiteur propre aux embeddings (tasks/limiter.py) : appels courts, faits à
+# l'enregistrement d'une tâche, donc attente maximale de quelques secondes
+OLLAMA_EMBED_CONCURRENCY = int(os.getenv('OLLAMA_EMBED_CONCURRENCY', '2'))
+OLLAMA_EMBED_QUEUE_LIMITS = {
+    'interactive': int(os.getenv('OLLAMA_EMBED_QUEUE_LIMIT', '20')),
+    'background': 100,
+    'batch': 1000,
+}
+OLLAMA_EMBED_QUEUE_TIMEOUT = float(os.getenv('OLLAMA_EMBED_QUEUE_TIMEOUT', '5'))
+SEMANTIC_INDEX_DIR = BASE_DIR / 'semantic_index'
+# Similarité cosinus au-delà de laquelle une tâche est signalée comme doublon
+SEMANTIC_DUPLICATE_THRESHOLD = float(os.getenv('SEMANTIC_DUPLICATE_THRESHOLD', '0.9'))
+# Nombre de vecteurs hors matrice déclenchant une reconstruction en arrière-plan,
+# et intervalle minimal entre deux comptages de ces vecteurs (secondes)
+SEMANTIC_REBUILD_THRESHOLD = 5000
+SEMANTIC_REBUILD_CHECK_INTERVAL = 60
+
+# Mode performance de l'admin (comptages approchés, recherche plein texte)
+# à activer pour les tables de tâches très volumineuses
+ADMIN_PERFORMANCE_MODE = os.getenv('ADMIN_PERFORMANCE_MODE', 'False') == 'True'
+# Durée de mise en cache du nombre total de tâches affiché par l'admin en
+# mode performance (secondes)
+ADMIN_COUNT_CACHE_SECONDS = int(os.getenv('ADMIN_COUNT_CACHE_SECONDS', '300'))
+
+# Opérations de masse : taille des lots, pause entre deux lots (secondes),
+# nombre de tâches au-delà duquel l'action de l'admin part en arrière-plan et
+# durée sans progression après laquelle une opération en cours est reprenable
+BULK_BATCH_SIZE = int(os.getenv('BULK_BATCH_SIZE', '500'))
+BULK_BATCH_PAUSE = float(os.getenv('BULK_BATCH_PAUSE', '0.05'))
+BULK_INLINE_LIMIT = int(os.getenv('BULK_INLINE_LIMIT', '1000'))
+BULK_LEASE_SECONDS = int(os.getenv('BULK_LEASE_SECONDS', '300'))
+
+# Archivage : tâches terminées sans modification depuis ce nombre de jours
+# (manage.py archive_tasks, à planifier via cron)
+ARCHIVE_AFTER_DAYS = int(os.getenv('ARCHIVE_AFTER_DAYS', '90'))
+
+# Sauvegardes en ligne de la base (manage.py backup_db) : répertoire des
+# instantanés, pages copiées par étape, pause entre deux étapes (secondes)
+# pour laisser passer les écritures et nombre d'instantanés conservés
+BACKUP_DIR = Path(os.getenv('BACKUP_DIR', BASE_DIR / 'backups'))
+BACKUP_PAGES = int(os.getenv('BACKUP_PAGES', '256'))
+BACKUP_SLEEP = float(os.getenv('BACKUP_SLEEP', '0.05'))
+BACKUP_KEEP = int(os.getenv('BACKUP_KEEP', '7'))
+
+# Tri automatique par l'IA (manage.py triage_tasks) : tâches par prompt et
+# horizon maximal des échéances suggérées (jours)
+TRIAGE_BATCH_SIZE = int(os.getenv('TRIAGE_BATCH_SIZE', '20'))
+TRIAGE_MAX_HORIZON_DAYS = int(os.getenv('TRIAGE_MAX_HORIZON_DAYS', '365'))
+
+# Indicateurs de flux (tasks/analytics.py) : durée de conservation en cache
+# du résumé d'un jour écoulé (secondes) et période maximale demandée (jours)
+ANALYTICS_CACHE_TTL = int(os.getenv('ANALYTICS_CACHE_TTL', str(7 * 24 * 3600)))
+ANALYTICS_MAX_DAYS = int(os.getenv('ANALYTICS_MAX_DAYS', '365'))
+
+# Sondes de disponibilité (/readyz) : intervalle entre deux vérifications
+# de la base et d'Ollama par le thread de fond, délai maximal d'une sonde (secondes)
+HEALTH_PROBE_INTERVAL = float(os.getenv('HEALTH_PROBE_INTERVAL', '10'))
+HEALTH_PROBE_TIMEOUT = float(os.getenv('HEALTH_PROBE_TIMEOUT', '2'))
+
+# Métriques : un fichier par processus, fusionnés par l'endpoint /metrics.
+# Jeton attendu par /metrics (`Authorization: Bearer <jeton>`, à renseigner
+# dans la configuration de Prometheus) ; sans jeton, réservé à l'équipe
+METRICS_DIR = BASE_DIR / 'metrics'
+METRICS_FLUSH_INTERVAL = 5  # secondes
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
 
 # Configuration du logging
+# Journalisation non bloquante (tasks/log.py) : les requêtes déposent les
+# messages dans une file, un thread par handler les formate et les écrit
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
+LOG_MAX_BYTES = int(os.getenv('LOG_MAX_BYTES', str(10 * 1024 * 1024)))
+LOG_BACKUP_COUNT = int(os.getenv('LOG_BACKUP_COUNT', '5'))
+
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
@@ -151,25 +282,52 @@ LOGGING = {
             'format': '{levelname} {message}',
             'style': '{',
         },
+        'json': {
+            '()': 'tasks.log.JsonFormatter',
+        },
+    },
+    # Une instance de filtre par handler : partagé, un filtre verrait chaque
+    # message une fois par handler (jetons consommés deux fois, échantillon
+    # toujours envoyé au même handler)
+    'filters': {
+        **{f'rate_limit_{handler}': {
+            # Au plus 20 messages/s par logger, rafales de 100
+            '()': 'tasks.log.RateLimitFilter',
+            'rate': 20,
+            'burst': 100,
+        } for handler in ('file', 'console')},
+        **{f'sample_noisy_{handler}': {
+            # Messages répétés à chaque appel d'insights : un sur 100 conservé
+            '()': 'tasks.log.SamplingFilter',
+            'patterns': ['Modèles disponibles', 'Utilisation du modèle'],
+            'every': 100,
+        } for handler in ('file', 'console')},
     },
     'handlers': {
         'file': {
-            'level': 'INFO',
-            'class': 'logging.FileHandler',
+            'level': LOG_LEVEL,
+            'class': 'tasks.log.AsyncHandler',
+            'target': 'logging.handlers.RotatingFileHandler',
             'filename': BASE_DIR / 'logs' / 'django.log',
-            'formatter': 'verbose',
+            'maxBytes': LOG_MAX_BYTES,
+            'backupCount': LOG_BACKUP_COUNT,
+            'encoding': 'utf-8',
+            'formatter': 'json',
+            'filters': ['sample_noisy_file', 'rate_limit_file'],
         },
         'console': {
             'level': 'DEBUG',
-            'class': 'logging.StreamHandler',
+            'class': 'tasks.log.AsyncHandler',
+            'target': 'logging.StreamHandler',
             'formatter': 'simple',
+            'filters': ['sample_noisy_console', 'rate_limit_console'],
         },
     },
     'loggers': {
         'tasks': {
             'handlers': ['file', 'console'],
-            'level': 'INFO',
+            'level': LOG_LEVEL,
             'propagate': True,
         },
     },
-}
\ No newline at end of file
+}
@@ -5,10 +5,12 @@ from django.conf.urls.static import static
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('accounts/', include('django.contrib.auth.urls')),  # Connexion / déconnexion
     path('', include('tasks.urls')),  # Inclut les URLs de l'app tasks
 ]
 
-# En mode développement, servir les fichiers statiques et médias
+# En mode développement, servir les fichiers médias
+# (les fichiers statiques sont servis par runserver en développement et par
+# tasks.assets.PrecompressedStaticMiddleware en production)
 if settings.DEBUG:
-    urlpatterns += static(settings.STATIC_URL, document_root=settings.STATICFILES_DIRS[0])
     urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'task_project.settings')
 
 application = get_wsgi_application()
+
+# Préchauffage de l'intégration IA en arrière-plan, une fois le worker prêt
+from tasks.warmup import warm_up_in_background  # noqa: E402
+
+warm_up_in_background()
@@ -1,16 +1,99 @@
+from django.conf import settings
 from django.contrib import admin
+from django.core.cache import cache
+from django.core.paginator import EmptyPage, Paginator
+from django.db import connection
+from django.db.models import BooleanField, Case, Q, Value, When
+from django.db.models.functions import Now
+from django.utils.functional import cached_property
 from django.utils.html import format_html
 from django.urls import reverse
 from django.utils.safestring import mark_safe
-from .models import Task
+from .models import ArchivedTask, BulkOperation, Task, TaskEvent
+from .archive import restore_tasks
+from .bulk import queue_bulk_update, run_bulk_operation, run_in_background
+from .search import fts_available, fts_filter
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginateur à comptage approché pour les très grandes tables.
+    
+    Sans filtre, le nombre de lignes est un COUNT(*) mis en cache
+    `ADMIN_COUNT_CACHE_SECONDS` secondes. Avec filtre, le COUNT est plafonné
+    à `max_count` lignes pour ne jamais parcourir toute la table.
+    
+    Le compte peut avoir vieilli (suppressions, archivage) : la dernière
+    page réellement atteinte le corrige, et une page au-delà de la fin
+    recalcule le compte exact avant de lever `EmptyPage`.
+    """
+    max_count = 10000
+    
+    @property
+    def _cache_key(self):
+        return f'admin-count:{self.object_list.model._meta.db_table}'
+    
+    def _filtered(self):
+        return bool(self.object_list.query.where)
+    
+    def _exact_count(self):
+        if self._filtered():
+            return self.object_list.order_by()[:self.max_count + 1].count()
+        return self.object_list.model._default_manager.count()
+    
+    @cached_property
+    def count(self):
+        if self._filtered():
+            return self._exact_count()
+        return cache.get_or_set(self._cache_key, self._exact_count, settings.ADMIN_COUNT_CACHE_SECONDS)
+    
+    def _correct_count(self, count):
+        self.__dict__['count'] = count
+        self.__dict__.pop('num_pages', None)
+        if not self._filtered():
+            cache.set(self._cache_key, count, settings.ADMIN_COUNT_CACHE_SECONDS)
+    
+    def page(self, number):
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        object_list = list(self.object_list[bottom:bottom + self.per_page])
+        if len(object_list) < self.per_page and (object_list or number == 1):
+            # Dernière page réelle : le compte exact en découle
+            if bottom + len(object_list) != self.count:
+                self._correct_count(bottom + len(object_list))
+        elif not object_list:
+            self._correct_count(self._exact_count())
+            raise EmptyPage(self.error_messages['no_results'])
+        return self._get_page(object_list, number, self)
+
+
+class OverdueListFilter(admin.SimpleListFilter):
+    """Filtre « en retard » servi par l'index (status, due_date)"""
+    title = 'état'
+    parameter_name = 'overdue'
+    
+    def lookups(self, request, model_admin):
+        return [('1', 'En retard'), ('0', 'À jour')]
+    
+    def queryset(self, request, queryset):
+        overdue = Q(due_date__lt=Now()) & ~Q(status='done')
+        if self.value() == '1':
+            return queryset.filter(overdue)
+        if self.value() == '0':
+            return queryset.exclude(overdue)
+        return queryset
+
 
 @admin.register(Task)
 class TaskAdmin(admin.ModelAdmin):
     """Configuration de l'interface d'administration pour les tâches"""
     
+    # Mode performance pour les tables de plusieurs millions de lignes
+    performance_mode = settings.ADMIN_PERFORMANCE_MODE
+    
     # Configuration de la liste
     list_display = [
         'title', 
+        'user',
         'status_badge', 
         'priority_badge', 
         'due_date', 
@@ -31,6 +114,11 @@ class TaskAdmin(admin.ModelAdmin):
         'description'
     ]
     
+    # Propriétaire : jointure unique pour la liste, widget sans liste déroulante
+    # (des milliers d'utilisateurs)
+    list_select_related = ['user']
+    raw_id_fields = ['user']
+    
     readonly_fields = [
         'created_at', 
         'updated_at',
@@ -39,7 +127,7 @@ class TaskAdmin(admin.ModelAdmin):
     
     fieldsets = (
         ('Informations principales', {
-            'fields': ('title', 'description')
+            'fields': ('title', 'description', 'user')
         }),
         ('Statut et priorité', {
             'fields': ('status', 'priority', 'due_date')
@@ -58,6 +146,10 @@ class TaskAdmin(admin.ModelAdmin):
     list_per_page = 25
     list_max_show_all = 100
     
+    # En mode performance : pas de COUNT(*) complet, comptage approché
+    show_full_result_count = not performance_mode
+    paginator = EstimatedCountPaginator if performance_mode else Paginator
+    
     # Actions personnalisées
     actions = [
         'mark_as_todo',
@@ -67,6 +159,28 @@ class TaskAdmin(admin.ModelAdmin):
         'export_selected_tasks'
     ]
     
+    def get_queryset(self, request):
+        """Calcule l'état « en retard » en SQL plutôt que ligne par ligne en Python"""
+        return super().get_queryset(request).annotate(
+            overdue_flag=Case(
+                When(Q(due_date__lt=Now()) & ~Q(status='done'), then=Value(True)),
+                default=Value(False),
+                output_field=BooleanField(),
+            )
+        )
+    
+    def get_list_filter(self, request):
+        """En mode performance, uniquement des filtres servis par un index"""
+        if self.performance_mode:
+            return ['status', 'priority', OverdueListFilter, 'due_date']
+        return self.list_filter
+    
+    def get_search_results(self, request, queryset, search_term):
+        """En mode performance, la recherche passe par l'index plein texte"""
+        if self.performance_mode and search_term and fts_available(connection):
+            return fts_filter(queryset, search_term), False
+        return super().get_search_results(request, queryset, search_term)
+    
     def status_badge(self, obj):
         """Affiche le statut avec un badge coloré"""
         colors = {
@@ -100,12 +214,16 @@ class TaskAdmin(admin.ModelAdmin):
     
     def is_overdue_badge(self, obj):
         """Indique si la tâche est en retard"""
-        if obj.is_overdue():
+        overdue = getattr(obj, 'overdue_flag', None)
+        if overdue is None:
+            overdue = obj.is_overdue()
+        if overdue:
             return format_html(
                 '<span class="badge bg-danger">En retard</span>'
             )
         return format_html('<span class="badge bg-light">À jour</span>')
     is_overdue_badge.short_description = 'État'
+    is_overdue_badge.admin_order_field = 'overdue_flag'
     
     def actions_column(self, obj):
         """Colonne d'actions rapides"""
@@ -153,39 +271,49 @@ class TaskAdmin(admin.ModelAdmin):
     task_details.short_description = 'Détails complets'
     
     # Actions personnalisées
+    def _bulk_update(self, request, queryset, values, label, done_message):
+        """Applique une action de masse par lots (en arrière-plan si la sélection est grande)"""
+        operation = queue_bulk_update(queryset, values, action=label)
+        if operation.total <= settings.BULK_INLINE_LIMIT:
+            run_bulk_operation(operation)
+            self.message_user(request, done_message.format(count=operation.processed))
+        else:
+            run_in_background(operation)
+            self.message_user(
+                request,
+                f'{operation.total} tâche(s) en cours de traitement en arrière-plan '
+                f'(opération #{operation.pk}, suivie dans « Opérations de masse »).'
+            )
+    
     def mark_as_todo(self, request, queryset):
         """Marquer les tâches sélectionnées comme 'À faire'"""
-        count = queryset.update(status='todo')
-        self.message_user(
-            request, 
-            f'{count} tâche(s) marquée(s) comme "À faire".'
+        self._bulk_update(
+            request, queryset, {'status': 'todo'}, 'Marquer comme "À faire"',
+            '{count} tâche(s) marquée(s) comme "À faire".'
         )
     mark_as_todo.short_description = 'Marquer comme "À faire"'
     
     def mark_as_doing(self, request, queryset):
         """Marquer les tâches sélectionnées comme 'En cours'"""
-        count = queryset.update(status='doing')
-        self.message_user(
-            request, 
-            f'{count} tâche(s) marquée(s) comme "En cours".'
+        self._bulk_update(
+            request, queryset, {'status': 'doing'}, 'Marquer comme "En cours"',
+            '{count} tâche(s) marquée(s) comme "En cours".'
         )
     mark_as_doing.short_description = 'Marquer comme "En cours"'
     
     def mark_as_done(self, request, queryset):
         """Marquer les tâches sélectionnées comme 'Terminé'"""
-        count = queryset.update(status='done')
-        self.message_user(
-            request, 
-            f'{count} tâche(s) marquée(s) comme "Terminé".'
+        self._bulk_update(
+            request, queryset, {'status': 'done'}, 'Marquer comme "Terminé"',
+            '{count} tâche(s) marquée(s) comme "Terminé".'
         )
     mark_as_done.short_description = 'Marquer comme "Terminé"'
     
     def set_high_priority(self, request, queryset):
         """Définir la priorité comme 'Haute'"""
-        count = queryset.update(priority='high')
-        self.message_user(
-            request, 
-            f'{count} tâche(s) définie(s) en priorité haute.'
+        self._bulk_update(
+            request, queryset, {'priority': 'high'}, 'Définir priorité haute',
+            '{count} tâche(s) définie(s) en priorité haute.'
         )
     set_high_priority.short_description = 'Définir priorité haute'
     
@@ -209,6 +337,83 @@ class TaskAdmin(admin.ModelAdmin):
         )
     export_selected_tasks.short_description = 'Exporter les tâches sélectionnées'
 
+@admin.register(BulkOperation)
+class BulkOperationAdmin(admin.ModelAdmin):
+    """Suivi de l'avancement des opérations de masse"""
+    
+    list_display = ['action', 'status', 'progress_bar', 'processed', 'total', 'created_at', 'updated_at']
+    list_filter = ['status']
+    readonly_fields = ['action', 'values', 'status', 'last_pk', 'processed', 'total', 'error', 'created_at', 'updated_at']
+    exclude = ['selection', 'worker']
+    actions = ['resume_operations']
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def progress_bar(self, obj):
+        """Affiche l'avancement de l'opération"""
+        return format_html(
+            '<progress value="{}" max="100"></progress> {} %',
+            obj.progress,
+            obj.progress
+        )
+    progress_bar.short_description = 'Avancement'
+    
+    def resume_operations(self, request, queryset):
+        """Reprendre les opérations interrompues ou échouées"""
+        started = skipped = 0
+        for operation in queryset.exclude(status='done'):
+            # Réservation préalable : une opération encore traitée ailleurs n'est pas relancée
+            if run_in_background(operation):
+                started += 1
+            else:
+                skipped += 1
+        message = f'{started} opération(s) relancée(s) en arrière-plan.'
+        if skipped:
+            message += f' {skipped} opération(s) encore en cours de traitement, ignorée(s).'
+        self.message_user(request, message)
+    resume_operations.short_description = 'Reprendre les opérations sélectionnées'
+
+@admin.register(ArchivedTask)
+class ArchivedTaskAdmin(admin.ModelAdmin):
+    """Consultation et restauration des tâches archivées"""
+    
+    list_display = ['title', 'user', 'priority', 'created_at', 'archived_at']
+    list_filter = ['priority']
+    search_fields = ['title']
+    list_select_related = ['user']
+    readonly_fields = ['id', 'user', 'title', 'description', 'priority', 'due_date', 'triaged_at', 'created_at', 'updated_at', 'archived_at']
+    show_full_result_count = False
+    actions = ['restore_selected']
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def restore_selected(self, request, queryset):
+        """Remettre les tâches sélectionnées dans la table active"""
+        count = restore_tasks(queryset)
+        self.message_user(request, f'{count} tâche(s) restaurée(s).')
+    restore_selected.short_description = 'Restaurer les tâches sélectionnées'
+
+@admin.register(TaskEvent)
+class TaskEventAdmin(admin.ModelAdmin):
+    """Historique des statuts, en lecture seule (journal en ajout seul)"""
+    
+    list_display = ['task_id', 'user', 'from_status', 'to_status', 'at']
+    list_filter = ['to_status']
+    list_select_related = ['user']
+    date_hierarchy = 'at'
+    show_full_result_count = False
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+    
+    def has_delete_permission(self, request, obj=None):
+        return False
+
 # Configuration globale de l'admin
 admin.site.site_header = "Administration - Gestionnaire de Tâches IA"
 admin.site.site_title = "Admin Tâches IA"
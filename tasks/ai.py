@@ -0,0 +1,453 @@
+"""
+Intégration Ollama : connexion, choix du modèle et génération des insights.
+
+Le modèle choisi est mis en cache et maintenu en mémoire par Ollama
+(`ModelManager`) : la découverte des modèles et leur chargement ne sont pas
+payés à chaque appel.
+
+Module chargé à la demande (par les vues d'insights ou le préchauffage) :
+`ollama`, `httpx` et `requests` ne sont importés ni au démarrage des
+workers ni par les commandes `manage.py` qui n'en ont pas besoin. Les
+clients sont eux aussi construits au premier usage puis réutilisés, ce qui
+garde les connexions HTTP ouvertes (keep-alive) entre deux appels.
+"""
+
+import asyncio
+import json
+import logging
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+
+import httpx
+import ollama
+import requests
+from django.conf import settings
+from django.utils import timezone
+
+from . import metrics
+from .limiter import OllamaBusy, ollama_limiter
+
+logger = logging.getLogger(__name__)
+
+# Clients synchrones (session requests, client Ollama), construits au premier usage
+_sync_clients = None
+_sync_clients_lock = threading.Lock()
+
+def _get_sync_clients():
+    """Retourne (session HTTP, client Ollama) partagés par les threads du processus"""
+    global _sync_clients
+    clients = _sync_clients
+    if clients is None or clients[2] != settings.OLLAMA_URL:
+        with _sync_clients_lock:
+            clients = _sync_clients
+            if clients is None or clients[2] != settings.OLLAMA_URL:
+                clients = _sync_clients = (
+                    requests.Session(),
+                    ollama.Client(host=settings.OLLAMA_URL),
+                    settings.OLLAMA_URL,
+                )
+    return clients[0], clients[1]
+
+def check_ollama_connection():
+    """Vérifie si Ollama est accessible"""
+    try:
+        session, _ = _get_sync_clients()
+        response = session.get(f"{settings.OLLAMA_URL}/api/tags", timeout=5)
+        return response.status_code == 200
+    except Exception as e:
+        logger.error(f"Impossible de se connecter à Ollama : {e}")
+        return False
+
+# Clients HTTP asynchrones, un jeu par boucle d'événements : leur création
+# (contexte SSL, pool de connexions) est coûteuse et bloquerait la boucle
+_async_clients = weakref.WeakKeyDictionary()
+
+def _get_async_clients():
+    """Retourne (client HTTP, client Ollama) associés à la boucle courante"""
+    loop = asyncio.get_running_loop()
+    clients = _async_clients.get(loop)
+    if clients is not None and clients[2] == settings.OLLAMA_URL:
+        metrics.cache_hit('ollama_async_client')
+    else:
+        metrics.cache_miss('ollama_async_client')
+        # Appels simultanés bornés en amont par le limiteur (tasks/limiter.py)
+        limits = httpx.Limits(max_connections=None, max_keepalive_connections=20)
+        clients = (
+            httpx.AsyncClient(timeout=5, limits=limits),
+            ollama.AsyncClient(host=settings.OLLAMA_URL, limits=limits),
+            settings.OLLAMA_URL,
+        )
+        _async_clients[loop] = clients
+    return clients[0], clients[1]
+
+async def acheck_ollama_connection():
+    """Version asynchrone de check_ollama_connection (ne bloque pas le worker)"""
+    try:
+        http_client, _ = _get_async_clients()
+        response = await http_client.get(f"{settings.OLLAMA_URL}/api/tags")
+        return response.status_code == 200
+    except Exception as e:
+        logger.error(f"Impossible de se connecter à Ollama : {e}")
+        return False
+
+def get_available_models():
+    """Récupère la liste des modèles disponibles"""
+    try:
+        session, _ = _get_sync_clients()
+        response = session.get(f"{settings.OLLAMA_URL}/api/tags", timeout=5)
+        if response.status_code == 200:
+            data = response.json()
+            return [model['name'] for model in data.get('models', [])]
+        return []
+    except Exception as e:
+        logger.error(f"Erreur lors de la récupération des modèles : {e}")
+        return []
+
+async def aget_available_models():
+    """Version asynchrone de get_available_models"""
+    try:
+        http_client, _ = _get_async_clients()
+        response = await http_client.get(f"{settings.OLLAMA_URL}/api/tags")
+        if response.status_code == 200:
+            data = response.json()
+            return [model['name'] for model in data.get('models', [])]
+        return []
+    except Exception as e:
+        logger.error(f"Erreur lors de la récupération des modèles : {e}")
+        return []
+
+def get_loaded_models():
+    """Récupère la liste des modèles actuellement chargés en mémoire (`/api/ps`)"""
+    try:
+        session, _ = _get_sync_clients()
+        response = session.get(f"{settings.OLLAMA_URL}/api/ps", timeout=5)
+        if response.status_code == 200:
+            return [model['name'] for model in response.json().get('models', [])]
+        return []
+    except Exception as e:
+        logger.error(f"Erreur lors de la récupération des modèles chargés : {e}")
+        return []
+
+async def aget_loaded_models():
+    """Version asynchrone de get_loaded_models"""
+    try:
+        http_client, _ = _get_async_clients()
+        response = await http_client.get(f"{settings.OLLAMA_URL}/api/ps")
+        if response.status_code == 200:
+            return [model['name'] for model in response.json().get('models', [])]
+        return []
+    except Exception as e:
+        logger.error(f"Erreur lors de la récupération des modèles chargés : {e}")
+        return []
+
+def _select_model(available_models, loaded_models=()):
+    """Détermine le modèle à utiliser parmi les modèles disponibles.
+    
+    Le modèle configuré est toujours préféré ; à défaut, un modèle de repli
+    déjà chargé en mémoire passe avant les autres (pas de chargement de
+    plusieurs secondes avant le premier token).
+    """
+    logger.info("Modèles disponibles : %s", available_models)
+    
+    possible_models = [
+        settings.OLLAMA_MODEL,  # D'abord le modèle configuré
+        'llama3.1:latest',
+        'llama3.1',
+        'llama3:latest', 
+        'llama3',
+        'mistral:latest',
+        'mistral'
+    ]
+    
+    candidates = [model for model in possible_models if model in available_models]
+    if candidates and candidates[0] == settings.OLLAMA_MODEL:
+        return candidates[0]
+    
+    for model in candidates:
+        if model in loaded_models:
+            logger.warning(f"Modèle configuré non trouvé, utilisation de {model} (déjà chargé)")
+            return model
+    
+    if candidates:
+        return candidates[0]
+    
+    if available_models:
+        model_to_use = available_models[0]  # Utiliser le premier modèle disponible
+        logger.warning(f"Modèle configuré non trouvé, utilisation de {model_to_use}")
+        return model_to_use
+    
+    raise Exception("Aucun modèle Ollama n'est disponible. Veuillez installer un modèle avec 'ollama pull llama3.1'")
+
+class ModelManager:
+    """Choix du modèle mis en cache et maintien de ce modèle en mémoire.
+    
+    - `resolve()` / `aresolve()` : modèle choisi par `_select_model`, gardé
+      `OLLAMA_MODEL_CACHE_TTL` secondes (pas de `/api/tags` à chaque appel) ;
+      `invalidate()` force un nouveau choix (ex. après une erreur d'appel).
+    - `ping()` : charge le modèle s'il ne l'est pas et prolonge son maintien
+      en mémoire (`keep_alive`), via la voie `background` du limiteur.
+    - `start_pinger()` : thread qui appelle `ping()` toutes les
+      `OLLAMA_PING_INTERVAL` secondes, pour que le modèle reste chargé
+      pendant les périodes creuses.
+    """
+    
+    def __init__(self):
+        self._model = None
+        self._url = None
+        self._expires_at = 0.0
+        self._lock = threading.Lock()
+        self._pinger = None
+    
+    def _cached(self):
+        if (self._model and self._url == settings.OLLAMA_URL
+                and time.monotonic() < self._expires_at):
+            metrics.cache_hit('ollama_model')
+            return self._model
+        return None
+    
+    def _store(self, model):
+        self._model = model
+        self._url = settings.OLLAMA_URL
+        self._expires_at = time.monotonic() + settings.OLLAMA_MODEL_CACHE_TTL
+        return model
+    
+    def resolve(self):
+        """Modèle à utiliser (découverte au premier appel puis à l'expiration du cache)"""
+        model = self._cached()
+        if model:
+            return model
+        with self._lock:
+            model = self._cached()
+            if model:
+                return model
+            metrics.cache_miss('ollama_model')
+            return self._store(_select_model(get_available_models(), get_loaded_models()))
+    
+    async def aresolve(self):
+        """Version asynchrone de resolve"""
+        model = self._cached()
+        if model:
+            return model
+        metrics.cache_miss('ollama_model')
+        available_models, loaded_models = await asyncio.gather(
+            aget_available_models(), aget_loaded_models()
+        )
+        return self._store(_select_model(available_models, loaded_models))
+    
+    def invalidate(self):
+        self._model = None
+    
+    def ping(self):
+        """Charge le modèle si besoin et prolonge son maintien ; renvoie la durée de chargement"""
+        model = self.resolve()
+        _, ollama_client = _get_sync_clients()
+        # Requête sans prompt : Ollama charge le modèle sans rien générer
+        with ollama_limiter.slot('background'):
+            response = ollama_client.generate(model=model, keep_alive=settings.OLLAMA_KEEP_ALIVE)
+        load_time = (response.get('load_duration') or 0) / 1e9
+        metrics.observe('ollama_load_seconds', load_time, model=model)
+        if load_time >= 1:
+            logger.info(f"Modèle {model} chargé en mémoire en {load_time:.1f} s")
+        return load_time
+    
+    def start_pinger(self):
+        """Démarre (une fois par processus) le thread de maintien du modèle en mémoire"""
+        if not settings.OLLAMA_PING_INTERVAL or self._pinger is not None:
+            return self._pinger
+        self._pinger = threading.Thread(target=self._ping_forever, name='ollama-pinger', daemon=True)
+        self._pinger.start()
+        return self._pinger
+    
+    def _ping_forever(self):
+        while True:
+            time.sleep(settings.OLLAMA_PING_INTERVAL)
+            try:
+                self.ping()
+            except OllamaBusy:
+                # Limiteur saturé : le modèle est en cours d'utilisation, donc chargé
+                pass
+            except Exception as e:
+                self.invalidate()
+                logger.warning(f"Ping du modèle impossible : {e}")
+
+model_manager = ModelManager()
+
+def _call_timings(response):
+    """Répartition de la durée d'un appel d'après les métadonnées d'Ollama (secondes)"""
+    return {
+        'load': round((response.get('load_duration') or 0) / 1e9, 3),
+        'prompt': round((response.get('prompt_eval_duration') or 0) / 1e9, 3),
+        'generation': round((response.get('eval_duration') or 0) / 1e9, 3),
+    }
+
+def _build_insights_prompt(tasks):
+    """Prépare les statistiques et le prompt envoyés à l'IA"""
+    # Préparation des données des tâches
+    task_data = []
+    for task in tasks:
+        task_info = {
+            'titre': task.title,
+            'description': task.description or 'Pas de description',
+            'statut': task.get_status_display(),
+            'priorité': task.get_priority_display(),
+            'créée_le': task.created_at.strftime('%d/%m/%Y'),
+            'en_retard': task.is_overdue()
+        }
+        task_data.append(task_info)
+    
+    # Statistiques rapides
+    stats = {
+        'total': len(task_data),
+        'à_faire': len([t for t in task_data if t['statut'] == 'À faire']),
+        'en_cours': len([t for t in task_data if t['statut'] == 'En cours']),
+        'terminées': len([t for t in task_data if t['statut'] == 'Terminé']),
+        'en_retard': len([t for t in task_data if t['en_retard']])
+    }
+    
+    # Construction du prompt pour l'IA
+    prompt = f"""
+    Analyse ces {stats['total']} tâches et fournis des insights utiles en français :
+
+    Statistiques :
+    - Total : {stats['total']} tâches
+    - À faire : {stats['à_faire']}
+    - En cours : {stats['en_cours']}
+    - Terminées : {stats['terminées']}
+    - En retard : {stats['en_retard']}
+
+    Détail des tâches :
+    {json.dumps(task_data, indent=2, ensure_ascii=False)}
+
+    Fournis une analyse structurée avec :
+    1. Un résumé général de la situation
+    2. Les priorités recommandées
+    3. Des conseils d'organisation
+    4. Des points d'attention particuliers
+
+    Réponds en français, de manière concise et actionnable.
+    """
+    
+    return stats, prompt
+
+# Options de génération communes aux appels synchrones et asynchrones
+CHAT_OPTIONS = {
+    'temperature': 0.7,
+    'top_p': 0.9,
+    'num_predict': 800,  # Limiter la longueur de la réponse
+}
+
+def _insights_error(e):
+    """Construit la réponse d'erreur des insights"""
+    logger.error(f"Erreur génération insights : {e}")
+    error_msg = str(e)
+    if "model" in error_msg.lower() and "not found" in error_msg.lower():
+        error_msg += "\n\nPour résoudre ce problème :\n1. Ouvrez un terminal\n2. Exécutez : ollama pull llama3.1\n3. Attendez le téléchargement\n4. Réessayez"
+    
+    return {
+        'analysis': f"Erreur lors de la génération des insights : {error_msg}",
+        'stats': {},
+        'model_used': 'N/A',
+        'generated_at': timezone.now().strftime('%d/%m/%Y à %H:%M')
+    }
+
+def _chat_arguments(model, prompt):
+    """Arguments de l'appel `chat`, communs aux versions synchrone et asynchrone"""
+    return {
+        'model': model,
+        'messages': [{
+            'role': 'user',
+            'content': prompt
+        }],
+        'options': CHAT_OPTIONS,
+        # Modèle gardé en mémoire entre deux appels
+        'keep_alive': settings.OLLAMA_KEEP_ALIVE,
+    }
+
+@contextmanager
+def _measured_call(model):
+    """Mesure l'appel fait dans le bloc (réponse à placer dans `call['response']`)"""
+    call = {}
+    start = time.perf_counter()
+    try:
+        yield call
+    except Exception:
+        metrics.record_ollama_call(model, time.perf_counter() - start, error=True)
+        # Modèle supprimé, Ollama redémarré... : nouveau choix au prochain appel
+        model_manager.invalidate()
+        raise
+    metrics.record_ollama_call(model, time.perf_counter() - start, call.get('response'))
+
+def _insights_result(model, stats, response, waited):
+    """Construit la réponse des insights à partir de la réponse d'Ollama"""
+    return {
+        'analysis': response['message']['content'],
+        'stats': stats,
+        'model_used': model,
+        'generated_at': timezone.now().strftime('%d/%m/%Y à %H:%M'),
+        'queue_wait': round(waited, 3),
+        'timings': _call_timings(response),
+    }
+
+def generate_ai_insights(tasks, lane=None, client=None):
+    """Génère des insights IA basés sur les tâches.
+    
+    L'appel au modèle passe par le limiteur (voie `lane`, client `client`) ;
+    `OllamaBusy` est propagée pour que l'appelant réponde 503.
+    """
+    try:
+        # Modèle en cache (découverte au premier appel uniquement)
+        model_to_use = model_manager.resolve()
+        stats, prompt = _build_insights_prompt(tasks)
+        
+        # Client Ollama partagé (construit au premier appel)
+        _, ollama_client = _get_sync_clients()
+        
+        # Appel à Ollama, une fois une place obtenue auprès du limiteur
+        logger.info("Utilisation du modèle : %s", model_to_use)
+        with ollama_limiter.slot(lane, client) as waited, _measured_call(model_to_use) as call:
+            call['response'] = ollama_client.chat(**_chat_arguments(model_to_use, prompt))
+        
+        return _insights_result(model_to_use, stats, call['response'], waited)
+        
+    except OllamaBusy:
+        raise
+    except Exception as e:
+        return _insights_error(e)
+
+async def agenerate_ai_insights(tasks, lane=None, client=None):
+    """Version asynchrone de generate_ai_insights.
+    
+    `tasks` doit être une liste déjà évaluée (pas de requête ORM synchrone ici).
+    """
+    try:
+        model_to_use = await model_manager.aresolve()
+        stats, prompt = _build_insights_prompt(tasks)
+        
+        _, ollama_client = _get_async_clients()
+        
+        logger.info("Utilisation du modèle : %s", model_to_use)
+        async with ollama_limiter.aslot(lane, client) as waited:
+            with _measured_call(model_to_use) as call:
+                call['response'] = await ollama_client.chat(**_chat_arguments(model_to_use, prompt))
+        
+        return _insights_result(model_to_use, stats, call['response'], waited)
+        
+    except OllamaBusy:
+        raise
+    except Exception as e:
+        return _insights_error(e)
+
+def warm_up():
+    """Ouvre une connexion vers Ollama, charge le modèle et le garde en mémoire"""
+    start = time.perf_counter()
+    if check_ollama_connection():
+        try:
+            model_manager.ping()
+        except Exception as e:
+            logger.warning(f"Préchauffage : chargement du modèle impossible ({e})")
+        logger.info(f"Ollama préchauffé en {time.perf_counter() - start:.2f} s")
+    else:
+        logger.warning("Préchauffage : Ollama injoignable, connexion établie au premier appel")
+    model_manager.start_pinger()
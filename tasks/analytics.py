@@ -0,0 +1,184 @@
+"""
+Indicateurs de flux calculés à partir de l'historique des statuts (`TaskEvent`).
+
+- débit : tâches terminées par jour ;
+- travail en cours (WIP) : tâches « En cours » à la fin de chaque jour
+  (une tâche supprimée en cours en sort par son événement « supprimée ») ;
+- temps de cycle (premier passage « En cours » → « Terminé ») et délai de
+  livraison (création → « Terminé ») des tâches terminées, en heures, avec
+  leurs percentiles sur la période.
+
+Les événements sont chargés en colonnes (tableau numpy structuré) et tous
+les calculs sont vectorisés : rattachement au jour par `searchsorted`,
+comptages par `bincount`, WIP par somme cumulée.
+
+L'historique étant en ajout seul, un jour écoulé ne change plus : chaque
+jour est mis en cache (`ANALYTICS_CACHE_TTL`) sous forme de résumé compact
+(débit, WIP, durées des tâches terminées ce jour-là). Seuls les jours
+absents du cache et le jour courant sont recalculés.
+"""
+
+import datetime
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from . import metrics
+from .models import TaskEvent
+
+EVENT_DTYPE = np.dtype([('task', 'i8'), ('src', 'i1'), ('dst', 'i1'), ('at', 'f8')])
+
+CREATED = -1  # `src` d'un événement de création
+DOING = TaskEvent.STATUS_CODES['doing']
+DONE = TaskEvent.STATUS_CODES['done']
+
+PERCENTILES = (50, 85, 95)
+
+# Taille des lots de clés pour les requêtes `task_id IN (...)`
+TASK_CHUNK = 5000
+
+
+def load_events(queryset):
+    """Événements du queryset en colonnes (task, src, dst, at en secondes epoch)"""
+    rows = queryset.values_list('task_id', 'from_status', 'to_status', 'at')
+    return np.fromiter(
+        ((task, CREATED if src is None else src, dst, at.timestamp())
+         for task, src, dst, at in rows.iterator(chunk_size=5000)),
+        dtype=EVENT_DTYPE,
+    )
+
+
+def _first_per_task(events):
+    """(tâches triées, date du premier événement de chacune)"""
+    if not len(events):
+        return np.empty(0, 'i8'), np.empty(0, 'f8')
+    order = np.lexsort((events['at'], events['task']))
+    tasks, first = np.unique(events['task'][order], return_index=True)
+    return tasks, events['at'][order][first]
+
+
+def _lookup(keys, values, query):
+    """values[keys == query] pour chaque élément de `query` (NaN si absent)"""
+    if not len(keys):
+        return np.full(len(query), np.nan)
+    position = np.minimum(np.searchsorted(keys, query), len(keys) - 1)
+    return np.where(keys[position] == query, values[position], np.nan)
+
+
+def _day_bounds(days):
+    """Minuits locaux encadrant les jours (len(days) + 1 bornes, en secondes epoch)"""
+    tz = timezone.get_current_timezone()
+    edges = [*days, days[-1] + datetime.timedelta(days=1)]
+    return np.array([
+        datetime.datetime.combine(day, datetime.time.min, tzinfo=tz).timestamp() for day in edges
+    ])
+
+
+def _durations_by_day(values, day, count):
+    """Découpe `values` (NaN ignorés) en listes par jour, en heures"""
+    keep = ~np.isnan(values)
+    values, day = values[keep], day[keep]
+    order = np.argsort(day, kind='stable')
+    splits = np.cumsum(np.bincount(day, minlength=count))[:-1]
+    return [np.round(chunk / 3600, 2).tolist() for chunk in np.split(values[order], splits)]
+
+
+def compute_days(user_id, days):
+    """Résumés d'une suite de jours consécutifs (recalcul depuis l'historique)"""
+    bounds = _day_bounds(days)
+    start, end = (datetime.datetime.fromtimestamp(b, datetime.timezone.utc) for b in bounds[[0, -1]])
+    count = len(days)
+    history = TaskEvent.objects.filter(user_id=user_id)
+
+    events = load_events(history.filter(at__gte=start, at__lt=end))
+    day = np.searchsorted(bounds, events['at'], side='right') - 1
+
+    # Débit et WIP (tâches « En cours » avant la période, puis variations quotidiennes)
+    done = events['dst'] == DONE
+    throughput = np.bincount(day[done], minlength=count)
+    before = history.filter(at__lt=start).aggregate(
+        entered=Count('pk', filter=Q(to_status=DOING)),
+        left=Count('pk', filter=Q(from_status=DOING)),
+    )
+    wip = (before['entered'] - before['left']) + np.cumsum(
+        np.bincount(day[events['dst'] == DOING], minlength=count)
+        - np.bincount(day[events['src'] == DOING], minlength=count)
+    )
+
+    # Durées des tâches terminées : création et premier démarrage de chacune
+    done_tasks, done_at, done_day = events['task'][done], events['at'][done], day[done]
+    task_ids = np.unique(done_tasks).tolist()
+    starts = np.concatenate([
+        load_events(history.filter(task_id__in=task_ids[i:i + TASK_CHUNK], at__lt=end)
+                    .filter(Q(to_status=DOING) | Q(from_status__isnull=True)))
+        for i in range(0, len(task_ids), TASK_CHUNK)
+    ] or [np.empty(0, EVENT_DTYPE)])
+    started = _lookup(*_first_per_task(starts[starts['dst'] == DOING]), done_tasks)
+    created = _lookup(*_first_per_task(starts[starts['src'] == CREATED]), done_tasks)
+    cycle = done_at - started
+    lead = done_at - created
+    cycle[cycle < 0] = np.nan
+    lead[lead < 0] = np.nan
+
+    cycle_by_day = _durations_by_day(cycle, done_day, count)
+    lead_by_day = _durations_by_day(lead, done_day, count)
+    return [{
+        'throughput': int(throughput[i]),
+        'wip': int(wip[i]),
+        'cycle_hours': cycle_by_day[i],
+        'lead_hours': lead_by_day[i],
+    } for i in range(count)]
+
+
+def _cache_key(user_id, day):
+    return f"analytics:{user_id}:{day.isoformat()}"
+
+
+def daily_buckets(user_id, days):
+    """Résumés des jours demandés : jours écoulés depuis le cache, les autres recalculés"""
+    today = timezone.localdate()
+    keys = {day: _cache_key(user_id, day) for day in days}
+    cached = cache.get_many([keys[day] for day in days if day < today])
+    metrics.inc('cache_requests_total', len(cached), cache='analytics_day', result='hit')
+
+    missing = [day for day in days if keys[day] not in cached]
+    computed = {}
+    if missing:
+        metrics.inc('cache_requests_total', len(missing), cache='analytics_day', result='miss')
+        # Un seul passage sur la plage couvrant tous les jours manquants
+        span = [missing[0] + datetime.timedelta(days=i) for i in range((missing[-1] - missing[0]).days + 1)]
+        computed = dict(zip(span, compute_days(user_id, span)))
+        cache.set_many(
+            {keys[day]: bucket for day, bucket in computed.items() if day < today},
+            timeout=settings.ANALYTICS_CACHE_TTL,
+        )
+    return [cached[keys[day]] if keys[day] in cached else computed[day] for day in days]
+
+
+def _summary(hours):
+    values = np.asarray(hours, dtype=float)
+    if not len(values):
+        return {'count': 0, 'mean': None, **{f"p{p}": None for p in PERCENTILES}}
+    return {
+        'count': int(len(values)),
+        'mean': round(float(values.mean()), 2),
+        **{f"p{p}": round(float(v), 2) for p, v in zip(PERCENTILES, np.percentile(values, PERCENTILES))},
+    }
+
+
+def task_analytics(user, days=30):
+    """Indicateurs des `days` derniers jours (aujourd'hui compris) pour un utilisateur"""
+    today = timezone.localdate()
+    period = [today - datetime.timedelta(days=i) for i in range(days - 1, -1, -1)]
+    buckets = daily_buckets(user.pk, period)
+    return {
+        'days': [day.isoformat() for day in period],
+        'throughput': [bucket['throughput'] for bucket in buckets],
+        'wip': [bucket['wip'] for bucket in buckets],
+        'completed': sum(bucket['throughput'] for bucket in buckets),
+        'cycle_time_hours': _summary([h for bucket in buckets for h in bucket['cycle_hours']]),
+        'lead_time_hours': _summary([h for bucket in buckets for h in bucket['lead_hours']]),
+    }
@@ -4,3 +4,21 @@ from django.apps import AppConfig
 class TasksConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'tasks'
+
+    def ready(self):
+        # Connexion des signaux (index sémantique)
+        from . import signals  # noqa: F401
+        
+        # Jauges de files d'attente calculées à la lecture de /metrics
+        from .bulk import queue_depths
+        from .metrics import register_collector
+        register_collector(queue_depths)
+        
+        # Occupation des limiteurs d'appels à Ollama
+        from .limiter import embedding_limiter, ollama_limiter
+        register_collector(ollama_limiter.collect)
+        register_collector(embedding_limiter.collect)
+        
+        # État des sondes de disponibilité (/readyz)
+        from .health import health_monitor
+        register_collector(health_monitor.collect)
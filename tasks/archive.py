@@ -0,0 +1,113 @@
+"""
+Archivage des tâches terminées.
+
+Les tâches `done` non modifiées depuis `ARCHIVE_AFTER_DAYS` jours quittent
+la table active (parcourue par la liste, les statistiques, la recherche et
+les insights) pour la table compacte `ArchivedTask`. Comme pour les
+opérations de masse, le déplacement se fait par plages de clés primaires,
+chaque lot dans sa propre transaction (copie puis suppression) suivie d'une
+courte pause : une interruption ne perd ni ne duplique aucune tâche.
+
+La restauration recrée les tâches avec leur clé et leurs dates d'origine.
+L'historique des statuts (`TaskEvent`) n'est pas lié aux tables : il reste
+intact dans les deux sens.
+"""
+
+import logging
+import time
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, Value, When
+from django.utils import timezone
+
+from .models import ArchivedTask, Task
+
+logger = logging.getLogger(__name__)
+
+# Champs recopiés à l'identique entre les deux tables
+COPIED_FIELDS = [
+    'id', 'user_id', 'title', 'description', 'priority', 'due_date', 'triaged_at', 'created_at', 'updated_at',
+]
+
+
+def archivable_tasks(days=None):
+    """Tâches terminées sans modification depuis `days` jours"""
+    days = settings.ARCHIVE_AFTER_DAYS if days is None else days
+    cutoff = timezone.now() - timezone.timedelta(days=days)
+    return Task.objects.filter(status='done', updated_at__lt=cutoff)
+
+
+def archive_tasks(queryset, batch_size=None, pause=None, progress=None):
+    """Déplace les tâches du queryset vers l'archive ; retourne le nombre archivé.
+
+    `progress` est appelé après chaque lot avec le total archivé.
+    """
+    batch_size = batch_size or settings.BULK_BATCH_SIZE
+    pause = settings.BULK_BATCH_PAUSE if pause is None else pause
+    archived = 0
+    last_pk = 0
+
+    while True:
+        pks = list(
+            queryset.filter(pk__gt=last_pk).order_by('pk').values_list('pk', flat=True)[:batch_size]
+        )
+        if not pks:
+            break
+        last_pk = pks[-1]
+
+        with transaction.atomic():
+            # Condition d'archivage vérifiée de nouveau dans la transaction :
+            # une tâche rouverte ou modifiée entre-temps reste active
+            rows = list(queryset.filter(pk__in=pks).values(*COPIED_FIELDS))
+            # Une clé déjà présente dans l'archive n'est ni écrasée ni
+            # supprimée de la table active (copie incohérente à examiner)
+            conflicts = set(
+                ArchivedTask.objects.filter(pk__in=[row['id'] for row in rows]).values_list('pk', flat=True)
+            )
+            if conflicts:
+                logger.warning(f"Archivage : tâche(s) déjà présente(s) dans l'archive, conservée(s) : {sorted(conflicts)}")
+            moved = [row['id'] for row in rows if row['id'] not in conflicts]
+            ArchivedTask.objects.bulk_create([ArchivedTask(**row) for row in rows if row['id'] not in conflicts])
+            # Vecteurs sémantiques supprimés en cascade, index plein texte par
+            # trigger ; pas d'événement de suppression : la tâche reste terminée
+            Task.objects.filter(pk__in=moved).delete(record_events=False)
+        archived += len(moved)
+
+        if progress:
+            progress(archived)
+        if pause:
+            time.sleep(pause)
+
+    logger.info(f"{archived} tâche(s) archivée(s)")
+    return archived
+
+
+def restore_tasks(queryset, batch_size=None):
+    """Remet des tâches archivées dans la table active ; retourne le nombre restauré.
+
+    Les vecteurs sémantiques des tâches restaurées sont recalculés par
+    `manage.py build_semantic_index`.
+    """
+    batch_size = batch_size or settings.BULK_BATCH_SIZE
+    restored = 0
+
+    while True:
+        with transaction.atomic():
+            rows = list(queryset.order_by('pk').values(*COPIED_FIELDS)[:batch_size])
+            if not rows:
+                break
+            pks = [row['id'] for row in rows]
+            # Pas d'événement de création : l'historique des statuts est conservé
+            Task.objects.bulk_create([Task(status='done', **row) for row in rows], record_events=False)
+            # bulk_create applique auto_now/auto_now_add : dates d'origine
+            # réécrites en une seule requête
+            Task.objects.filter(pk__in=pks).update(
+                created_at=Case(*[When(pk=row['id'], then=Value(row['created_at'])) for row in rows]),
+                updated_at=Case(*[When(pk=row['id'], then=Value(row['updated_at'])) for row in rows]),
+            )
+            ArchivedTask.objects.filter(pk__in=pks).delete()
+        restored += len(rows)
+
+    logger.info(f"{restored} tâche(s) restaurée(s)")
+    return restored
@@ -0,0 +1,196 @@
+"""
+Chaîne de construction et de service des fichiers statiques.
+
+À `collectstatic`, `OptimizedManifestStaticFilesStorage` :
+1. minifie les CSS et JS copiés dans STATIC_ROOT ;
+2. les renomme avec l'empreinte de leur contenu (ManifestStaticFilesStorage) ;
+3. écrit à côté de chaque fichier texte ses variantes `.gz` et `.br`.
+
+En production, `PrecompressedStaticMiddleware` sert directement ces
+fichiers depuis STATIC_ROOT, en choisissant la variante précompressée
+acceptée par le navigateur. Les noms avec empreinte sont servis avec
+`Cache-Control: immutable` : un rechargement de page ne redemande aucun
+fichier statique.
+"""
+
+import gzip
+import mimetypes
+import os
+import posixpath
+import re
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage, staticfiles_storage
+from django.http import FileResponse, Http404
+from django.utils._os import safe_join
+from django.utils.functional import cached_property
+
+try:
+    import brotli
+except ImportError:  # Dépendance optionnelle : seules les variantes gzip sont produites
+    brotli = None
+
+COMPRESSIBLE_EXTENSIONS = ('.css', '.js', '.svg', '.json', '.txt', '.html', '.map', '.xml')
+MIN_COMPRESS_SIZE = 256
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+DEFAULT_CACHE_CONTROL = 'public, max-age=3600'
+
+
+def minify_css(source):
+    """Minification CSS prudente : commentaires et espaces superflus"""
+    source = re.sub(r'/\*.*?\*/', '', source, flags=re.S)
+    source = re.sub(r'\s+', ' ', source)
+    source = re.sub(r'\s*([{};,])\s*', r'\1', source)
+    source = source.replace(';}', '}')
+    return source.strip()
+
+
+def minify_js(source):
+    """Minification JS prudente, ligne par ligne.
+
+    Supprime l'indentation, les lignes vides et les commentaires occupant des
+    lignes entières ; les retours à la ligne sont conservés pour ne pas
+    changer l'insertion automatique des points-virgules.
+    """
+    lines = []
+    in_comment = False
+    for line in source.splitlines():
+        stripped = line.strip()
+        if in_comment:
+            if '*/' in stripped:
+                in_comment = False
+            continue
+        if stripped.startswith('/*'):
+            in_comment = '*/' not in stripped
+            continue
+        if not stripped or stripped.startswith('//'):
+            continue
+        lines.append(stripped)
+    return '\n'.join(lines) + '\n'
+
+
+MINIFIERS = {
+    '.css': minify_css,
+    '.js': minify_js,
+}
+
+
+class OptimizedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """Stockage statique : minification, empreinte du contenu et précompression"""
+
+    def post_process(self, paths, dry_run=False, **options):
+        if dry_run:
+            return
+
+        # La minification précède le calcul des empreintes : les fichiers du
+        # projet (STATICFILES_DIRS) sont minifiés dans STATIC_ROOT, puis hachés
+        # depuis cette copie plutôt que depuis la source
+        project_dirs = {os.path.realpath(str(d)) for d in settings.STATICFILES_DIRS}
+        paths = dict(paths)
+        for name, (storage, source_name) in list(paths.items()):
+            minifier = MINIFIERS.get(os.path.splitext(name)[1])
+            if not minifier or name.endswith(('.min.css', '.min.js')):
+                continue
+            if os.path.realpath(str(getattr(storage, 'location', ''))) not in project_dirs:
+                continue
+            with storage.open(source_name) as f:
+                source = f.read().decode('utf-8')
+            with open(self.path(name), 'w', encoding='utf-8') as f:
+                f.write(minifier(source))
+            paths[name] = (self, name)
+
+        yield from super().post_process(paths, dry_run=dry_run, **options)
+
+        names = set(paths) | set(self.hashed_files.values())
+        for name in sorted(names):
+            if name.endswith(COMPRESSIBLE_EXTENSIONS) and self.exists(name):
+                self._precompress(self.path(name))
+
+    def _precompress(self, path):
+        """Écrit les variantes .gz et .br si elles sont plus petites que l'original"""
+        with open(path, 'rb') as f:
+            data = f.read()
+        if len(data) < MIN_COMPRESS_SIZE:
+            return
+        variants = [('.gz', gzip.compress(data, compresslevel=9, mtime=0))]
+        if brotli is not None:
+            variants.append(('.br', brotli.compress(data, quality=11)))
+        for suffix, compressed in variants:
+            if len(compressed) < len(data):
+                with open(path + suffix, 'wb') as f:
+                    f.write(compressed)
+
+
+class PrecompressedStaticMiddleware:
+    """Sert les fichiers de STATIC_ROOT avec leurs variantes précompressées.
+
+    Actif uniquement hors DEBUG : en développement, runserver sert les
+    fichiers statiques depuis les dossiers sources. Compatible asynchrone
+    pour ne pas sérialiser les vues asynchrones.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+        self.prefix = settings.STATIC_URL if settings.STATIC_URL.startswith('/') else '/' + settings.STATIC_URL
+
+    @cached_property
+    def hashed_names(self):
+        """Noms avec empreinte du manifeste (lu une fois par processus)"""
+        return frozenset(getattr(staticfiles_storage, 'hashed_files', {}).values())
+
+    def _static_name(self, request):
+        """Nom du fichier statique demandé, ou None si la requête n'en relève pas"""
+        if settings.DEBUG or not request.path.startswith(self.prefix) or not settings.STATIC_ROOT:
+            return None
+        if request.method not in ('GET', 'HEAD'):
+            return None
+        return posixpath.normpath(request.path[len(self.prefix):]).lstrip('/')
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        name = self._static_name(request)
+        if name is None:
+            return self.get_response(request)
+        return self.serve(request, name)
+
+    async def __acall__(self, request):
+        name = self._static_name(request)
+        if name is None:
+            return await self.get_response(request)
+        return self.serve(request, name)
+
+    def serve(self, request, name):
+        try:
+            path = safe_join(str(settings.STATIC_ROOT), name)
+        except Exception:
+            raise Http404("Fichier statique introuvable")
+        if not os.path.isfile(path):
+            raise Http404("Fichier statique introuvable")
+
+        accepted = request.headers.get('Accept-Encoding', '')
+        encoding, served_path = None, path
+        for candidate, suffix in (('br', '.br'), ('gzip', '.gz')):
+            if candidate in accepted and os.path.isfile(path + suffix):
+                encoding, served_path = candidate, path + suffix
+                break
+
+        content_type = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        response = FileResponse(open(served_path, 'rb'), content_type=content_type)
+        # FileResponse le déduit du fichier ouvert (« style.css.br ») : inutile
+        # pour une ressource statique, et trompeur pour une variante compressée
+        del response.headers['Content-Disposition']
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        response.headers['Vary'] = 'Accept-Encoding'
+        response.headers['Cache-Control'] = (
+            IMMUTABLE_CACHE_CONTROL if name in self.hashed_names else DEFAULT_CACHE_CONTROL
+        )
+        return response
@@ -0,0 +1,262 @@
+"""
+Sauvegarde en ligne de la base SQLite, sans arrêter l'application.
+
+Copier le fichier pendant que l'application écrit donne une copie
+incohérente ; le verrouiller le temps de la copie bloque les écritures.
+Ici, l'API de sauvegarde de SQLite copie la base par étapes de
+`BACKUP_PAGES` pages, avec une pause de `BACKUP_SLEEP` secondes entre deux
+étapes : le verrou de lecture n'est tenu que pendant une étape, les
+écritures passent entre deux.
+
+Une écriture faite par une autre connexion pendant la sauvegarde oblige
+SQLite à reprendre la copie depuis le début. À chaque reprise, la taille
+des étapes est doublée : sous forte charge d'écriture, la sauvegarde finit
+toujours (au pire en une seule étape, comme une copie bloquante). Mesuré
+sur une base de 2 Go, une écriture par seconde suffit à provoquer ces
+reprises (`manage.py backup_db --benchmark`).
+
+En mode WAL (mode de la base de l'application, `SQLITE_JOURNAL_MODE`), la
+lecture ne bloque pas les écritures : la copie se fait alors par défaut en
+une seule étape, sur un instantané cohérent de la base, sans reprise ni
+attente des écritures.
+
+Les instantanés sont nommés d'après l'heure UTC à la microseconde : l'ordre
+alphabétique reste l'ordre chronologique, y compris au changement d'heure,
+et deux sauvegardes rapprochées ne se remplacent pas.
+
+Chaque instantané est vérifié (`PRAGMA integrity_check`) avant d'être
+renommé à son nom définitif, puis éventuellement compressé (gzip) ; les
+plus anciens au-delà de `BACKUP_KEEP` sont supprimés. La restauration
+passe elle aussi par l'API de sauvegarde : la base cible passe d'un état
+cohérent à l'autre en une transaction.
+"""
+
+import datetime
+import gzip
+import shutil
+import sqlite3
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connections
+from django.utils import timezone
+
+SNAPSHOT_PREFIX = 'db-'
+SNAPSHOT_SUFFIXES = ('.sqlite3', '.sqlite3.gz')
+
+# Attente maximale d'un verrou tenu par l'application (secondes)
+LOCK_TIMEOUT = 30
+
+# Tables dénombrées lors de la vérification d'un instantané
+COUNTED_TABLES = ('auth_user', 'tasks_task', 'tasks_archivedtask', 'tasks_taskevent')
+
+
+class BackupError(Exception):
+    pass
+
+
+class _Restarted(Exception):
+    """Copie relancée par SQLite après une écriture concurrente"""
+
+
+def database_path(alias='default'):
+    """Chemin du fichier de la base `alias` (SQLite uniquement)"""
+    database = connections.databases[alias]
+    if database['ENGINE'] != 'django.db.backends.sqlite3':
+        raise BackupError(f"La base « {alias} » n'est pas une base SQLite")
+    return Path(database['NAME'])
+
+
+def _connect(path, readonly=False):
+    if readonly:
+        return sqlite3.connect(f"file:{path}?mode=ro", uri=True, timeout=LOCK_TIMEOUT)
+    return sqlite3.connect(path, timeout=LOCK_TIMEOUT)
+
+
+def journal_mode(path):
+    db = _connect(path, readonly=True)
+    try:
+        return db.execute('PRAGMA journal_mode').fetchone()[0].lower()
+    finally:
+        db.close()
+
+
+def copy_database(source, destination, pages=None, sleep=None, progress=None):
+    """Copie en ligne de `source` vers `destination` par étapes de `pages` pages.
+
+    Sans `pages`, une base en mode WAL est copiée en une seule étape, les
+    autres par étapes de `BACKUP_PAGES` pages. Retourne des statistiques :
+    pages copiées, étapes, reprises après une écriture concurrente, taille
+    finale des étapes (-1 = une seule étape) et durée. `progress(copied,
+    total)` est appelé après chaque étape.
+    """
+    if pages is None:
+        pages = -1 if journal_mode(source) == 'wal' else settings.BACKUP_PAGES
+    sleep = settings.BACKUP_SLEEP if sleep is None else sleep
+    stats = {'pages': 0, 'steps': 0, 'restarts': 0, 'step_pages': pages, 'seconds': 0.0}
+    start = time.perf_counter()
+
+    source_db = _connect(source, readonly=True)
+    try:
+        while True:
+            remaining_before = [None]
+
+            def step(status, remaining, total):
+                stats['steps'] += 1
+                stats['pages'] = total
+                # Copie reprise depuis le début : plus de pages restantes qu'à l'étape précédente
+                if remaining_before[0] is not None and remaining >= remaining_before[0]:
+                    raise _Restarted()
+                remaining_before[0] = remaining
+                if progress:
+                    progress(total - remaining, total)
+                if remaining and sleep:
+                    # Verrou relâché : les écritures en attente passent maintenant
+                    time.sleep(sleep)
+
+            destination_db = _connect(destination)
+            try:
+                source_db.backup(destination_db, pages=stats['step_pages'], progress=step)
+                # La copie reprend le mode WAL de la source : repassée en journal
+                # classique, elle tient dans un seul fichier (ni -wal ni -shm)
+                destination_db.execute('PRAGMA journal_mode=DELETE')
+                break
+            except _Restarted:
+                stats['restarts'] += 1
+                doubled = stats['step_pages'] * 2
+                stats['step_pages'] = -1 if doubled >= stats['pages'] else doubled
+            finally:
+                destination_db.close()
+    finally:
+        source_db.close()
+    stats['seconds'] = time.perf_counter() - start
+    return stats
+
+
+def check_integrity(path):
+    """Anomalies relevées par `PRAGMA integrity_check` (liste vide : base saine)"""
+    db = _connect(path, readonly=True)
+    try:
+        rows = [row[0] for row in db.execute('PRAGMA integrity_check')]
+    except sqlite3.DatabaseError as e:
+        return [str(e)]
+    finally:
+        db.close()
+    return [] if rows == ['ok'] else rows
+
+
+def _compress(path, destination):
+    with open(path, 'rb') as source, gzip.open(destination, 'wb', compresslevel=6) as target:
+        shutil.copyfileobj(source, target, length=1024 * 1024)
+
+
+def snapshots(directory=None):
+    """Instantanés du répertoire, du plus récent au plus ancien"""
+    directory = Path(directory or settings.BACKUP_DIR)
+    if not directory.is_dir():
+        return []
+    found = [
+        path for path in directory.iterdir()
+        if path.name.startswith(SNAPSHOT_PREFIX) and path.name.endswith(SNAPSHOT_SUFFIXES)
+    ]
+    # Nom horodaté : l'ordre alphabétique est l'ordre chronologique
+    return sorted(found, key=lambda path: path.name, reverse=True)
+
+
+def rotate(directory=None, keep=None):
+    """Supprime les instantanés au-delà des `keep` plus récents (0 = tout garder)"""
+    keep = settings.BACKUP_KEEP if keep is None else keep
+    if not keep:
+        return []
+    removed = snapshots(directory)[keep:]
+    for path in removed:
+        path.unlink()
+    return removed
+
+
+def create_snapshot(directory=None, compress=False, keep=None, pages=None, sleep=None,
+                    progress=None, source=None):
+    """Sauvegarde vérifiée de la base dans `directory`.
+
+    Retourne (chemin de l'instantané, statistiques de copie, instantanés supprimés).
+    """
+    directory = Path(directory or settings.BACKUP_DIR)
+    directory.mkdir(parents=True, exist_ok=True)
+    source = source or database_path()
+    name = f"{SNAPSHOT_PREFIX}{timezone.now().astimezone(datetime.timezone.utc):%Y%m%dT%H%M%S%fZ}.sqlite3"
+    partial = directory / f"{name}.partial"
+    try:
+        stats = copy_database(source, partial, pages=pages, sleep=sleep, progress=progress)
+        problems = check_integrity(partial)
+        if problems:
+            raise BackupError(f"Copie corrompue : {'; '.join(problems[:5])}")
+        if compress:
+            path = directory / f"{name}.gz"
+            _compress(partial, directory / f"{name}.gz.partial")
+            (directory / f"{name}.gz.partial").rename(path)
+            partial.unlink()
+        else:
+            path = directory / name
+            partial.rename(path)
+    except BaseException:
+        for leftover in (partial, directory / f"{name}.gz.partial"):
+            leftover.unlink(missing_ok=True)
+        raise
+    return path, stats, rotate(directory, keep)
+
+
+@contextmanager
+def opened_snapshot(path):
+    """Chemin d'une copie SQLite lisible de l'instantané (décompressée si besoin)"""
+    path = Path(path)
+    if not path.name.endswith('.gz'):
+        yield path
+        return
+    with tempfile.TemporaryDirectory(dir=path.parent) as tmp:
+        plain = Path(tmp) / path.name[:-len('.gz')]
+        with gzip.open(path, 'rb') as source, open(plain, 'wb') as target:
+            shutil.copyfileobj(source, target, length=1024 * 1024)
+        yield plain
+
+
+def verify_snapshot(path):
+    """(anomalies, nombre de lignes des principales tables) d'un instantané"""
+    try:
+        with opened_snapshot(path) as plain:
+            problems = check_integrity(plain)
+            counts = {}
+            if not problems:
+                db = _connect(plain, readonly=True)
+                try:
+                    existing = {row[0] for row in db.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+                    counts = {
+                        table: db.execute(f'SELECT COUNT(*) FROM "{table}"').fetchone()[0]
+                        for table in COUNTED_TABLES if table in existing
+                    }
+                finally:
+                    db.close()
+    except (OSError, EOFError, gzip.BadGzipFile) as e:
+        return [f"Lecture impossible : {e}"], {}
+    return problems, counts
+
+
+def restore_snapshot(path, target=None):
+    """Remplace le contenu de la base par celui d'un instantané vérifié"""
+    target = target or database_path()
+    with opened_snapshot(path) as plain:
+        problems = check_integrity(plain)
+        if problems:
+            raise BackupError(f"Instantané corrompu, restauration annulée : {'; '.join(problems[:5])}")
+        # Connexions Django fermées : rien n'est gardé en cache de l'ancienne base
+        connections.close_all()
+        source_db = _connect(plain, readonly=True)
+        target_db = _connect(target)
+        try:
+            # Une seule étape : la base passe d'un état cohérent à l'autre
+            source_db.backup(target_db)
+        finally:
+            target_db.close()
+            source_db.close()
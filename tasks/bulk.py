@@ -0,0 +1,189 @@
+"""
+Moteur d'opérations de masse sur les tâches.
+
+Un `queryset.update()` sur des centaines de milliers de lignes garde le
+verrou d'écriture SQLite pendant toute sa durée et bloque le site. Ici, la
+sélection est parcourue par plages de clés primaires croissantes : chaque
+lot est mis à jour dans sa propre transaction (avec le curseur de reprise),
+puis une courte pause laisse passer les autres écrivains.
+
+La sélection est figée à la création de l'opération : ses clés primaires
+sont enregistrées en plages contiguës [début, fin] (JSON), compactes pour
+une sélection « tout sélectionner » et relues sans désérialiser de code.
+
+Un seul exécutant à la fois : l'opération est réservée par une mise à jour
+conditionnelle (compare-and-set) qui y inscrit un jeton, et chaque lot
+n'est validé que si l'opération porte toujours ce jeton. Une opération
+« En cours » dont la progression (`updated_at`) date de plus de
+`BULK_LEASE_SECONDS` est considérée abandonnée et peut être reprise.
+"""
+
+import bisect
+import datetime
+import logging
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import BulkOperation, Task
+
+logger = logging.getLogger(__name__)
+
+
+class OperationClaimed(Exception):
+    """Opération déjà détenue par un autre exécutant (ou terminée)"""
+
+
+class _LeaseLost(Exception):
+    """Opération reprise par un autre exécutant en cours de traitement"""
+
+
+def pk_ranges(pks):
+    """Plages contiguës [début, fin] d'une suite croissante de clés primaires"""
+    ranges = []
+    for pk in pks:
+        if ranges and pk == ranges[-1][1] + 1:
+            ranges[-1][1] = pk
+        else:
+            ranges.append([pk, pk])
+    return ranges
+
+
+def queue_bulk_update(queryset, values, action=''):
+    """Enregistre une opération de masse (sans l'exécuter) et la retourne"""
+    ranges = pk_ranges(queryset.order_by('pk').values_list('pk', flat=True).iterator(chunk_size=5000))
+    return BulkOperation.objects.create(
+        action=action or ', '.join(f"{field}={value}" for field, value in values.items()),
+        values=values,
+        selection=ranges,
+        total=sum(end - start + 1 for start, end in ranges),
+    )
+
+
+def _next_batch(ranges, ends, after, size):
+    """Au plus `size` clés de la sélection supérieures à `after`, dans l'ordre"""
+    batch = []
+    index = bisect.bisect_right(ends, after)
+    while index < len(ranges) and len(batch) < size:
+        start, end = ranges[index]
+        first = max(start, after + 1)
+        batch.extend(range(first, min(end + 1, first + size - len(batch))))
+        index += 1
+    return batch
+
+
+def claim_operation(operation):
+    """Réserve l'opération pour cet exécutant ; False si un autre la détient.
+
+    Réservable : en attente, en échec, ou en cours sans progression depuis
+    `BULK_LEASE_SECONDS` (exécutant interrompu).
+    """
+    now = timezone.now()
+    expired = now - datetime.timedelta(seconds=settings.BULK_LEASE_SECONDS)
+    worker = uuid.uuid4().hex
+    claimed = BulkOperation.objects.filter(pk=operation.pk).filter(
+        Q(status__in=['pending', 'failed']) | Q(status='running', updated_at__lt=expired)
+    ).update(status='running', worker=worker, error='', updated_at=now)
+    if not claimed:
+        return False
+    operation.refresh_from_db()
+    return True
+
+
+def _save_owned(operation, **values):
+    """Enregistre la progression si l'opération est toujours détenue par cet exécutant"""
+    values['updated_at'] = timezone.now()
+    if not BulkOperation.objects.filter(pk=operation.pk, worker=operation.worker).update(**values):
+        raise _LeaseLost()
+    for field, value in values.items():
+        setattr(operation, field, value)
+
+
+def run_bulk_operation(operation, batch_size=None, pause=None, progress=None):
+    """Exécute (ou reprend) une opération par lots ; retourne l'opération à jour.
+
+    L'opération est d'abord réservée (`claim_operation`), sauf si l'appelant
+    l'a déjà fait ; lève `OperationClaimed` si un autre exécutant la détient.
+    `progress` est appelé après chaque lot avec l'opération en paramètre.
+    """
+    batch_size = batch_size or settings.BULK_BATCH_SIZE
+    pause = settings.BULK_BATCH_PAUSE if pause is None else pause
+    if not getattr(operation, '_claimed', False) and not claim_operation(operation):
+        raise OperationClaimed(f"Opération #{operation.pk} déjà en cours de traitement ou terminée")
+
+    ranges = operation.selection
+    ends = [end for _, end in ranges]
+    try:
+        while True:
+            pks = _next_batch(ranges, ends, operation.last_pk, batch_size)
+            if not pks:
+                break
+
+            # Mise à jour et avancement du curseur dans la même transaction :
+            # une reprise ne retraite jamais un lot déjà validé, et le lot est
+            # annulé si l'opération a été reprise par un autre exécutant
+            with transaction.atomic():
+                updated = Task.objects.filter(pk__in=pks).update(**operation.values)
+                _save_owned(operation, last_pk=pks[-1], processed=operation.processed + updated)
+
+            if progress:
+                progress(operation)
+            if pause:
+                time.sleep(pause)
+
+        _save_owned(operation, status='done')
+    except _LeaseLost:
+        logger.warning(f"Opération de masse #{operation.pk} reprise par un autre exécutant, arrêt")
+        operation.refresh_from_db()
+    except Exception as e:
+        logger.error(f"Échec de l'opération de masse #{operation.pk} : {e}")
+        try:
+            _save_owned(operation, status='failed', error=str(e))
+        except _LeaseLost:
+            operation.refresh_from_db()
+
+    return operation
+
+
+def _run_in_thread(operation):
+    close_old_connections()
+    try:
+        run_bulk_operation(operation)
+    except OperationClaimed as e:
+        logger.info(str(e))
+    finally:
+        connection.close()
+
+
+def run_in_background(operation):
+    """Lance l'opération dans un thread ; la reprise reste possible via
+    `manage.py resume_bulk_operations` si le processus est interrompu.
+
+    Retourne None si l'opération est détenue par un autre exécutant.
+    """
+    if not claim_operation(operation):
+        return None
+    operation._claimed = True
+    thread = threading.Thread(
+        target=_run_in_thread,
+        args=(operation,),
+        name=f"bulk-operation-{operation.pk}",
+        daemon=True,
+    )
+    thread.start()
+    return thread
+
+
+def pending_operations():
+    """Opérations non terminées (en attente ou interrompues en cours de route)"""
+    return BulkOperation.objects.filter(status__in=['pending', 'running']).order_by('created_at')
+
+
+def queue_depths():
+    """Collecteur de métriques : opérations de masse en attente"""
+    return [('bulk_operations_pending', {}, pending_operations().count())]
@@ -1,7 +1,11 @@
+import logging
+
 from django import forms
 from django.utils import timezone
 from .models import Task
 
+logger = logging.getLogger(__name__)
+
 class TaskForm(forms.ModelForm):
     """Formulaire pour créer et modifier les tâches"""
     
@@ -66,6 +70,27 @@ class TaskForm(forms.ModelForm):
             raise forms.ValidationError('Le titre doit contenir au moins 3 caractères.')
         
         return title.strip() if title else title
+    
+    def clean(self):
+        """Signale les tâches quasi identiques déjà existantes (index sémantique)"""
+        cleaned_data = super().clean()
+        self.near_duplicates = []
+        
+        title = cleaned_data.get('title')
+        if title:
+            from .semantic import embed_text, find_near_duplicates, task_text
+            try:
+                _, vector = embed_text(task_text(title, cleaned_data.get('description')))
+                exclude = [self.instance.pk] if self.instance.pk else []
+                self.near_duplicates = find_near_duplicates(
+                    vector, exclude=exclude, user_id=self.instance.user_id,
+                )
+                # Réutilisé à l'enregistrement pour ne pas recalculer le vecteur
+                self.instance._embedding = vector
+            except Exception as e:
+                logger.warning(f"Détection de doublons indisponible : {e}")
+        
+        return cleaned_data
 
 class TaskFilterForm(forms.Form):
     """Formulaire pour filtrer les tâches"""
@@ -0,0 +1,167 @@
+"""
+Sondes de vie et de disponibilité pour les répartiteurs de charge.
+
+- `/healthz` (vie) : le processus répond, sans consulter aucune dépendance ;
+- `/readyz` (disponibilité) : lit le dernier résultat des sondes de la base
+  et d'Ollama, exécutées par un thread de fond toutes les
+  `HEALTH_PROBE_INTERVAL` secondes (délai `HEALTH_PROBE_TIMEOUT`). La
+  requête ne fait ni accès à la base ni appel réseau.
+
+La base est indispensable : sonde en échec (ou résultat périmé, si le
+thread de fond ne tourne plus) => 503. Ollama ne l'est pas : sans lui,
+seules les analyses IA sont indisponibles, l'état est alors « degraded »
+mais l'instance reste disponible (200).
+
+Le thread est démarré à la première sonde reçue par chaque processus (et
+redémarré après un fork) : jusqu'au premier résultat de la base, quelques
+millisecondes plus tard, l'instance est signalée indisponible (« pending »).
+"""
+
+import logging
+import os
+import threading
+import time
+
+from django.conf import settings
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+
+class ProbeFailed(Exception):
+    pass
+
+
+def probe_database():
+    try:
+        with connection.cursor() as cursor:
+            # Lecture d'une vraie table : `SELECT 1` réussit sans lire le fichier
+            # (fichier absent, illisible ou qui n'est pas une base)
+            cursor.execute('SELECT 1 FROM django_migrations LIMIT 1')
+    finally:
+        # Pas de connexion gardée ouverte par le thread des sondes
+        connection.close()
+    return 'ok'
+
+
+# Session HTTP du thread des sondes, recréée après un fork : la sonde ne
+# partage ni le pool de connexions ni l'état des appels au modèle
+_probe_session = (None, None)  # (pid, session)
+
+
+def _session():
+    global _probe_session
+    pid, session = _probe_session
+    if pid != os.getpid():
+        # Import différé : `requests` n'est pas chargé au démarrage du worker
+        import requests
+
+        session = requests.Session()
+        _probe_session = (os.getpid(), session)
+    return session
+
+
+def probe_ollama():
+    response = _session().get(f"{settings.OLLAMA_URL}/api/tags", timeout=settings.HEALTH_PROBE_TIMEOUT)
+    response.raise_for_status()
+    models = [model['name'] for model in response.json().get('models', [])]
+    if not models:
+        raise ProbeFailed("aucun modèle installé")
+    return f"{len(models)} modèle(s) disponible(s)"
+
+
+# (nom, fonction, indispensable à la disponibilité)
+PROBES = (
+    ('database', probe_database, True),
+    ('ollama', probe_ollama, False),
+)
+
+
+class HealthMonitor:
+    """Exécute les sondes en tâche de fond et garde leur dernier résultat"""
+
+    def __init__(self, probes=PROBES):
+        self.probes = probes
+        self._results = {}
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+
+    def ensure_started(self):
+        if self._running():
+            return
+        with self._lock:
+            if self._running():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='health-probes', daemon=True)
+            self._thread.start()
+
+    def _running(self):
+        return self._thread is not None and self._pid == os.getpid() and self._thread.is_alive()
+
+    def _run(self):
+        while True:
+            for name, probe, _ in self.probes:
+                self.run_probe(name, probe)
+            time.sleep(settings.HEALTH_PROBE_INTERVAL)
+
+    def run_probe(self, name, probe):
+        start = time.perf_counter()
+        try:
+            ok, detail = True, probe()
+        except Exception as e:
+            ok, detail = False, str(e) or type(e).__name__
+        previous = self._results.get(name)
+        if previous is None or previous['ok'] != ok:
+            log = logger.info if ok else logger.warning
+            log(f"Sonde {name} : {'ok' if ok else 'en échec'} ({detail})")
+        # Remplacement d'un seul bloc : lu sans verrou par les requêtes
+        self._results[name] = {
+            'ok': ok,
+            'detail': detail,
+            'latency_ms': round((time.perf_counter() - start) * 1000, 1),
+            'checked_at': time.time(),
+        }
+
+    def readiness(self):
+        """(disponible, rapport) d'après les derniers résultats des sondes"""
+        self.ensure_started()
+        now = time.time()
+        stale_after = 3 * settings.HEALTH_PROBE_INTERVAL
+        checks = {}
+        ready, degraded = True, False
+        for name, _, critical in self.probes:
+            result = self._results.get(name)
+            if result is None:
+                status = 'pending'
+            elif now - result['checked_at'] > stale_after:
+                status = 'stale'
+            else:
+                status = 'ok' if result['ok'] else 'failing'
+            if status != 'ok':
+                if critical:
+                    ready = False
+                else:
+                    degraded = True
+            checks[name] = {'status': status, 'critical': critical}
+            if result is not None:
+                checks[name].update(
+                    detail=result['detail'],
+                    latency_ms=result['latency_ms'],
+                    age_seconds=round(now - result['checked_at'], 1),
+                )
+        overall = 'unavailable' if not ready else 'degraded' if degraded else 'ok'
+        return ready, {'status': overall, 'checks': checks}
+
+    def collect(self):
+        """Collecteur de métriques : état et ancienneté de chaque sonde"""
+        now = time.time()
+        gauges = []
+        for name, result in list(self._results.items()):
+            gauges.append(('health_check_up', {'check': name}, int(result['ok'])))
+            gauges.append(('health_check_age_seconds', {'check': name}, round(now - result['checked_at'], 1)))
+        return gauges
+
+
+health_monitor = HealthMonitor()
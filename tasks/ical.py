@@ -0,0 +1,161 @@
+"""
+Flux iCalendar (RFC 5545) des échéances des tâches, pour l'abonnement
+depuis une application d'agenda.
+
+- l'URL du flux porte un jeton signé (`django.core.signing`) identifiant
+  l'utilisateur : les agendas ne gèrent pas la session de connexion ;
+- le corps est produit à la volée à partir d'un itérateur `values_list`
+  (`StreamingHttpResponse`) : mémoire constante quel que soit le nombre de
+  tâches. Sous ASGI, un itérateur synchrone serait consommé en entier
+  avant l'envoi : le flux est alors produit par un générateur asynchrone
+  (`astream_feed`) qui avance l'itérateur morceau par morceau ;
+- l'ETag est dérivé du nombre de tâches du flux et de la dernière
+  modification (`updated_at`) : les interrogations périodiques des agendas
+  se résument à une requête d'agrégation et une réponse 304 tant que rien
+  n'a changé.
+"""
+
+import datetime
+
+from asgiref.sync import sync_to_async
+from django.core import signing
+
+from .models import Task
+
+TOKEN_SALT = 'tasks.ical.feed'
+
+STATUS_LABELS = dict(Task.STATUS_CHOICES)
+PRIORITY_LABELS = dict(Task.PRIORITY_CHOICES)
+STATUSES = list(STATUS_LABELS)
+PRIORITIES = list(PRIORITY_LABELS)
+
+# Priorité iCalendar : 1 (la plus haute) à 9 (la plus basse)
+ICAL_PRIORITIES = {'urgent': 1, 'high': 3, 'medium': 5, 'low': 9}
+
+# Champs lus pour chaque événement (ordre du tuple de `values_list`)
+FEED_FIELDS = ('pk', 'title', 'description', 'status', 'priority', 'due_date', 'updated_at')
+
+# Événements regroupés par morceau de la réponse : moins d'écritures réseau
+EVENTS_PER_CHUNK = 100
+
+# Intervalle de rafraîchissement suggéré aux agendas
+REFRESH_INTERVAL = 'PT15M'
+
+# Longueur maximale d'une ligne, en octets (RFC 5545, 3.1)
+LINE_LIMIT = 75
+
+
+def feed_token(user):
+    """Jeton signé identifiant l'utilisateur dans l'URL du flux (stable : sans horodatage)"""
+    return signing.Signer(salt=TOKEN_SALT).sign(str(user.pk))
+
+
+def user_id_from_token(token):
+    """Identifiant de l'utilisateur du jeton, None si la signature est invalide"""
+    try:
+        return int(signing.Signer(salt=TOKEN_SALT).unsign(token))
+    except (signing.BadSignature, ValueError):
+        return None
+
+
+def parse_filters(params):
+    """Filtres `status` et `priority` (répétés ou séparés par des virgules).
+
+    Lève ValueError sur une valeur inconnue.
+    """
+    filters = {}
+    for name, allowed in (('status', STATUSES), ('priority', PRIORITIES)):
+        values = sorted({v for raw in params.getlist(name) for v in raw.split(',') if v})
+        unknown = set(values) - set(allowed)
+        if unknown:
+            raise ValueError(f"Valeur inconnue pour {name} : {', '.join(sorted(unknown))}")
+        if values:
+            filters[f"{name}__in"] = values
+    return filters
+
+
+def feed_queryset(user_id, filters):
+    """Tâches datées du flux (servi par l'index (user, due_date))"""
+    return Task.objects.filter(user_id=user_id, due_date__isnull=False, **filters)
+
+
+def escape_text(value):
+    """Échappement d'une valeur TEXT (RFC 5545, 3.3.11)"""
+    return (
+        value.replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,')
+        .replace('\r\n', '\\n').replace('\n', '\\n').replace('\r', '\\n')
+    )
+
+
+def fold(line):
+    """Découpe une ligne en lignes de 75 octets au plus, sans couper un caractère"""
+    if len(line.encode('utf-8')) <= LINE_LIMIT:
+        return line + '\r\n'
+    parts, current, size = [], [], 0
+    for char in line:
+        width = len(char.encode('utf-8'))
+        # Les lignes de continuation commencent par une espace
+        if size + width > LINE_LIMIT - (1 if parts else 0):
+            parts.append(''.join(current))
+            current, size = [], 0
+        current.append(char)
+        size += width
+    parts.append(''.join(current))
+    return '\r\n '.join(parts) + '\r\n'
+
+
+def _utc(value):
+    return value.astimezone(datetime.timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+
+def render_event(row, host, task_url):
+    pk, title, description, status, priority, due_date, updated_at = row
+    url = task_url(pk)
+    text = f"{description}\n\n{url}" if description else url
+    lines = [
+        'BEGIN:VEVENT',
+        f"UID:task-{pk}@{host}",
+        f"DTSTAMP:{_utc(updated_at)}",
+        f"LAST-MODIFIED:{_utc(updated_at)}",
+        f"DTSTART:{_utc(due_date)}",
+        f"SUMMARY:{escape_text(('✓ ' if status == 'done' else '') + title)}",
+        f"DESCRIPTION:{escape_text(text)}",
+        f"URL:{url}",
+        f"PRIORITY:{ICAL_PRIORITIES[priority]}",
+        f"CATEGORIES:{escape_text(PRIORITY_LABELS[priority])},{escape_text(STATUS_LABELS[status])}",
+        'TRANSP:TRANSPARENT',
+        'END:VEVENT',
+    ]
+    return ''.join(fold(line) for line in lines)
+
+
+def stream_feed(queryset, host, task_url, name="Tâches"):
+    """Corps du flux, par morceaux de EVENTS_PER_CHUNK événements"""
+    yield ''.join(fold(line) for line in (
+        'BEGIN:VCALENDAR',
+        'VERSION:2.0',
+        f"PRODID:-//{host}//Gestionnaire de tâches//FR",
+        'CALSCALE:GREGORIAN',
+        'METHOD:PUBLISH',
+        f"X-WR-CALNAME:{escape_text(name)}",
+        f"REFRESH-INTERVAL;VALUE=DURATION:{REFRESH_INTERVAL}",
+        f"X-PUBLISHED-TTL:{REFRESH_INTERVAL}",
+    ))
+    chunk = []
+    rows = queryset.order_by('due_date', 'pk').values_list(*FEED_FIELDS)
+    for row in rows.iterator(chunk_size=2000):
+        chunk.append(render_event(row, host, task_url))
+        if len(chunk) >= EVENTS_PER_CHUNK:
+            yield ''.join(chunk)
+            chunk = []
+    chunk.append(fold('END:VCALENDAR'))
+    yield ''.join(chunk)
+
+
+async def astream_feed(queryset, host, task_url, name="Tâches"):
+    """Version asynchrone de stream_feed (serveur ASGI) : chaque morceau est
+    produit dans le thread des accès à la base, la boucle reste libre"""
+    chunks = stream_feed(queryset, host, task_url, name)
+    next_chunk = sync_to_async(next)
+    while (chunk := await next_chunk(chunks, None)) is not None:
+        yield chunk
@@ -0,0 +1,277 @@
+"""
+Limiteur de concurrence devant les appels aux modèles Ollama.
+
+Ollama ne sert qu'une ou deux générations à la fois : au-delà, les appels
+attendent chez lui, sans visibilité, jusqu'à expirer. Ici, au plus
+`OLLAMA_CONCURRENCY` appels sont en cours par processus ; les autres
+attendent dans une file :
+
+- par voie de priorité : `interactive` (requêtes des utilisateurs) passe
+  avant `background` (tâches de fond), qui passe avant `batch` ;
+- équitablement entre clients à l'intérieur d'une voie (tourniquet) : un
+  utilisateur qui lance dix analyses ne bloque pas les autres ;
+- avec une profondeur maximale par voie (`OLLAMA_QUEUE_LIMITS`) : une voie
+  pleine refuse immédiatement (`QueueFull`, HTTP 503) plutôt que de laisser
+  la requête expirer ; l'attente est en outre bornée par
+  `OLLAMA_QUEUE_TIMEOUT` (`QueueTimeout`).
+
+Le limiteur sert les threads (`slot`) comme les coroutines (`aslot`) : les
+attentes synchrones reposent sur un `threading.Event`, les asynchrones sur
+un futur réveillé par `call_soon_threadsafe`.
+
+Voie et client par défaut se fixent pour un bloc de code avec `context()`
+(ex. `with context(lane='batch')` dans une commande de gestion).
+
+La capacité est par processus : avec plusieurs workers, répartir la
+capacité d'Ollama entre eux.
+
+Deux limiteurs : `ollama_limiter` pour les générations (réglages
+`OLLAMA_*`) et `embedding_limiter` pour les embeddings (réglages
+`OLLAMA_EMBED_*`). Un embedding dure quelques dizaines de millisecondes et
+bloque l'enregistrement d'une tâche : il ne doit ni attendre derrière des
+générations de plusieurs secondes, ni patienter au-delà d'une attente
+courte (`OLLAMA_EMBED_QUEUE_TIMEOUT`).
+"""
+
+import asyncio
+import contextvars
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+
+from django.conf import settings
+
+from . import metrics
+
+LANES = ('interactive', 'background', 'batch')
+
+_current_lane = contextvars.ContextVar('ollama_lane', default='interactive')
+_current_client = contextvars.ContextVar('ollama_client', default=None)
+
+
+class OllamaBusy(Exception):
+    """Appel refusé faute de capacité"""
+
+    def __init__(self, message, lane, retry_after=5):
+        super().__init__(message)
+        self.lane = lane
+        self.retry_after = retry_after
+
+
+class QueueFull(OllamaBusy):
+    pass
+
+
+class QueueTimeout(OllamaBusy):
+    pass
+
+
+class _Ticket:
+    __slots__ = ('lane', 'client', 'wake', 'granted', 'enqueued_at')
+
+    def __init__(self, lane, client, wake):
+        self.lane = lane
+        self.client = client
+        self.wake = wake
+        self.granted = False
+        self.enqueued_at = time.monotonic()
+
+
+class _Lane:
+    """File d'une voie : un tourniquet de clients, chacun avec ses tickets"""
+
+    def __init__(self):
+        self.clients = deque()
+        self.tickets = {}
+        self.size = 0
+
+    def push(self, ticket):
+        tickets = self.tickets.get(ticket.client)
+        if tickets is None:
+            tickets = self.tickets[ticket.client] = deque()
+            self.clients.append(ticket.client)
+        tickets.append(ticket)
+        self.size += 1
+
+    def pop(self):
+        client = self.clients.popleft()
+        tickets = self.tickets[client]
+        ticket = tickets.popleft()
+        if tickets:
+            self.clients.append(client)
+        else:
+            del self.tickets[client]
+        self.size -= 1
+        return ticket
+
+    def remove(self, ticket):
+        tickets = self.tickets.get(ticket.client)
+        if not tickets or ticket not in tickets:
+            return False
+        tickets.remove(ticket)
+        if not tickets:
+            del self.tickets[ticket.client]
+            self.clients.remove(ticket.client)
+        self.size -= 1
+        return True
+
+
+class Limiter:
+    """Sémaphore à voies de priorité et équité entre clients"""
+
+    def __init__(self, name='ollama', capacity=None, queue_limits=None, timeout=None):
+        # Préfixe des réglages (`OLLAMA_CONCURRENCY`...) et des métriques
+        self.name = name
+        self._capacity = capacity
+        self._queue_limits = queue_limits
+        self._timeout = timeout
+        self._lock = threading.Lock()
+        self._lanes = {lane: _Lane() for lane in LANES}
+        self.active = 0
+        self.rejected = dict.fromkeys(LANES, 0)
+
+    # Réglages lus à l'usage (modifiables par override_settings dans les tests)
+    def _setting(self, suffix):
+        return getattr(settings, f"{self.name.upper()}_{suffix}")
+
+    @property
+    def capacity(self):
+        return self._capacity or self._setting('CONCURRENCY')
+
+    @property
+    def queue_limits(self):
+        return self._queue_limits or self._setting('QUEUE_LIMITS')
+
+    @property
+    def timeout(self):
+        return self._timeout if self._timeout is not None else self._setting('QUEUE_TIMEOUT')
+
+    # --- File d'attente ---------------------------------------------------
+
+    def _enqueue(self, lane, client, wake):
+        if lane not in self._lanes:
+            raise ValueError(f"Voie inconnue : {lane}")
+        ticket = _Ticket(lane, client, wake)
+        with self._lock:
+            queued = sum(queue.size for queue in self._lanes.values())
+            if self.active < self.capacity and not queued:
+                self.active += 1
+                ticket.granted = True
+                return ticket
+            if self._lanes[lane].size >= self.queue_limits.get(lane, 0):
+                self.rejected[lane] += 1
+                metrics.inc(f'{self.name}_queue_rejected_total', lane=lane)
+                raise QueueFull(f"File d'attente « {lane} » pleine", lane)
+            self._lanes[lane].push(ticket)
+        return ticket
+
+    def _withdraw(self, ticket):
+        """Retire un ticket abandonné ; False s'il venait d'être servi (place acquise)"""
+        with self._lock:
+            return self._lanes[ticket.lane].remove(ticket)
+
+    def _release(self):
+        with self._lock:
+            self.active -= 1
+            ticket = None
+            for lane in LANES:
+                if self._lanes[lane].size:
+                    ticket = self._lanes[lane].pop()
+                    break
+            if ticket is not None:
+                self.active += 1
+                ticket.granted = True
+        if ticket is not None:
+            try:
+                ticket.wake()
+            except RuntimeError:
+                # Boucle d'événements du demandeur fermée : place passée au suivant
+                self._release()
+
+    def _granted(self, ticket):
+        waited = time.monotonic() - ticket.enqueued_at
+        metrics.observe(f'{self.name}_queue_wait_seconds', waited, lane=ticket.lane)
+        return waited
+
+    # --- Acquisition ------------------------------------------------------
+
+    @contextmanager
+    def slot(self, lane=None, client=None):
+        """Bloc exécuté avec une place réservée ; renvoie l'attente en secondes"""
+        lane = lane or _current_lane.get()
+        client = client if client is not None else _current_client.get()
+        event = threading.Event()
+        ticket = self._enqueue(lane, client, event.set)
+        if not ticket.granted and not event.wait(self.timeout) and self._withdraw(ticket):
+            raise QueueTimeout(f"Attente maximale dépassée (voie « {lane} »)", lane)
+        try:
+            yield self._granted(ticket)
+        finally:
+            self._release()
+
+    @asynccontextmanager
+    async def aslot(self, lane=None, client=None):
+        """Version asynchrone de `slot` : l'attente ne bloque pas la boucle"""
+        lane = lane or _current_lane.get()
+        client = client if client is not None else _current_client.get()
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        def wake():
+            loop.call_soon_threadsafe(lambda: future.done() or future.set_result(True))
+
+        ticket = self._enqueue(lane, client, wake)
+        if not ticket.granted:
+            try:
+                await asyncio.wait_for(asyncio.shield(future), self.timeout)
+            except asyncio.TimeoutError:
+                if self._withdraw(ticket):
+                    raise QueueTimeout(f"Attente maximale dépassée (voie « {lane} »)", lane)
+            except asyncio.CancelledError:
+                # Requête abandonnée : rendre la place si elle venait d'être attribuée
+                if not self._withdraw(ticket):
+                    self._release()
+                raise
+        try:
+            yield self._granted(ticket)
+        finally:
+            self._release()
+
+    # --- Observation ------------------------------------------------------
+
+    def stats(self):
+        with self._lock:
+            return {
+                'capacity': self.capacity,
+                'active': self.active,
+                'queued': {lane: queue.size for lane, queue in self._lanes.items()},
+                'clients_waiting': {lane: len(queue.clients) for lane, queue in self._lanes.items()},
+                'rejected': dict(self.rejected),
+            }
+
+    def collect(self):
+        """Collecteur de métriques : occupation et profondeur des files"""
+        stats = self.stats()
+        gauges = [(f'{self.name}_active_calls', {}, stats['active'])]
+        gauges += [(f'{self.name}_queue_depth', {'lane': lane}, depth) for lane, depth in stats['queued'].items()]
+        return gauges
+
+
+ollama_limiter = Limiter()
+embedding_limiter = Limiter('ollama_embed')
+
+
+@contextmanager
+def context(lane=None, client=None):
+    """Fixe la voie et/ou le client par défaut des appels faits dans le bloc"""
+    tokens = []
+    if lane is not None:
+        tokens.append((_current_lane, _current_lane.set(lane)))
+    if client is not None:
+        tokens.append((_current_client, _current_client.set(client)))
+    try:
+        yield
+    finally:
+        for var, token in reversed(tokens):
+            var.reset(token)
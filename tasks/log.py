@@ -0,0 +1,186 @@
+"""
+Journalisation non bloquante.
+
+- `AsyncHandler` : le thread de la requête ne fait que déposer
+  l'enregistrement dans une file bornée ; un `QueueListener` (un thread par
+  handler) le formate et l'écrit via le handler cible (fichier avec
+  rotation par taille, console...). File pleine : le message est abandonné
+  et compté plutôt que de bloquer la requête.
+- `JsonFormatter` : une ligne JSON par message.
+- `RateLimitFilter` : débit maximal par logger (seau à jetons), avec le
+  nombre de messages supprimés reporté sur le message suivant.
+- `SamplingFilter` : ne garde qu'un message bruyant sur N (liste des
+  modèles Ollama, etc.).
+
+Les filtres s'exécutent dans le thread appelant mais ne formatent rien :
+ils ne lisent que le nom du logger et le gabarit du message.
+"""
+
+import atexit
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+from django.utils.module_loading import import_string
+
+
+class AsyncHandler(QueueHandler):
+    """Handler asynchrone enveloppant un handler cible construit à partir de
+    son chemin (`target`) et des paramètres restants, ex. :
+
+        'class': 'tasks.log.AsyncHandler',
+        'target': 'logging.handlers.RotatingFileHandler',
+        'filename': ..., 'maxBytes': ..., 'backupCount': ...
+    """
+
+    def __init__(self, target='logging.StreamHandler', queue_size=10000, **kwargs):
+        super().__init__(queue.Queue(maxsize=queue_size))
+        self.queue_size = queue_size
+        self.target = import_string(target)(**kwargs)
+        self.dropped = 0
+        self._dropped_lock = threading.Lock()
+        self.listener = None
+        self._start_listener()
+        atexit.register(self.stop)
+        os.register_at_fork(after_in_child=self._after_fork_in_child)
+
+    def _after_fork_in_child(self):
+        """Un worker forké (gunicorn --preload) n'hérite pas du thread
+        d'écriture, et la file copiée a pu l'être verrouillée par ce thread :
+        file, verrou et thread d'écriture neufs (les messages en attente
+        restent écrits par le parent)"""
+        self.queue = queue.Queue(maxsize=self.queue_size)
+        self.dropped = 0
+        self._dropped_lock = threading.Lock()
+        self._start_listener()
+
+    def _start_listener(self):
+        self.listener = QueueListener(self.queue, self.target, respect_handler_level=True)
+        self.listener.start()
+
+    def stop(self):
+        """Vide la file puis arrête le thread d'écriture"""
+        if self.listener is not None and self.listener._thread is not None:
+            self.listener.stop()
+
+    def setFormatter(self, fmt):
+        # Le formatage a lieu dans le thread d'écriture, par le handler cible
+        self.target.setFormatter(fmt)
+
+    def prepare(self, record):
+        """Fige le message (arguments évalués) sans le formater"""
+        record = logging.makeLogRecord(record.__dict__)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            if self.dropped:
+                self._enqueue_dropped_notice()
+            self.queue.put_nowait(record)
+        except queue.Full:
+            with self._dropped_lock:
+                self.dropped += 1
+
+    def _enqueue_dropped_notice(self):
+        with self._dropped_lock:
+            dropped, self.dropped = self.dropped, 0
+        notice = logging.LogRecord(
+            'tasks.log', logging.WARNING, __file__, 0,
+            f"{dropped} message(s) de journal abandonné(s) (file pleine)", None, None,
+        )
+        try:
+            self.queue.put_nowait(notice)
+        except queue.Full:
+            with self._dropped_lock:
+                self.dropped += dropped
+
+    def close(self):
+        self.stop()
+        self.target.close()
+        super().close()
+
+
+class JsonFormatter(logging.Formatter):
+    """Une ligne JSON par message"""
+
+    def format(self, record):
+        entry = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'module': record.module,
+            'process': record.process,
+            'thread': record.thread,
+            'message': record.getMessage(),
+        }
+        for key in ('suppressed', 'sampled'):
+            if hasattr(record, key):
+                entry[key] = getattr(record, key)
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class RateLimitFilter(logging.Filter):
+    """Limite chaque logger à `rate` messages par seconde (rafales de `burst`).
+
+    Les messages de niveau ERROR et au-delà ne sont jamais supprimés.
+    """
+
+    def __init__(self, rate=20.0, burst=100):
+        super().__init__()
+        self.rate = float(rate)
+        self.burst = float(burst)
+        self._lock = threading.Lock()
+        self._buckets = {}  # logger -> [jetons, dernier remplissage, supprimés]
+
+    def filter(self, record):
+        if record.levelno >= logging.ERROR:
+            return True
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(record.name)
+            if bucket is None:
+                bucket = self._buckets[record.name] = [self.burst, now, 0]
+            bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+            if bucket[0] < 1:
+                bucket[2] += 1
+                return False
+            bucket[0] -= 1
+            if bucket[2]:
+                record.suppressed, bucket[2] = bucket[2], 0
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Ne garde qu'un message sur `every` parmi ceux dont le gabarit commence
+    par l'un des `patterns` (les autres messages passent tous)"""
+
+    def __init__(self, patterns=(), every=100):
+        super().__init__()
+        self.patterns = tuple(patterns)
+        self.every = max(1, int(every))
+        self._lock = threading.Lock()
+        self._counts = {}
+
+    def filter(self, record):
+        template = record.msg if isinstance(record.msg, str) else ''
+        pattern = next((p for p in self.patterns if template.startswith(p)), None)
+        if pattern is None:
+            return True
+        with self._lock:
+            count = self._counts.get(pattern, 0)
+            self._counts[pattern] = count + 1
+        if count % self.every:
+            return False
+        record.sampled = self.every
+        return True
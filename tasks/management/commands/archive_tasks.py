@@ -0,0 +1,65 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from tasks.archive import archivable_tasks, archive_tasks, restore_tasks
+from tasks.models import ArchivedTask
+
+
+class Command(BaseCommand):
+    help = (
+        "Déplace les tâches terminées anciennes vers la table d'archive "
+        "(à lancer depuis une tâche planifiée), ou restaure des tâches archivées."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=None,
+                            help="Ancienneté minimale depuis la dernière modification "
+                                 "(défaut : ARCHIVE_AFTER_DAYS)")
+        parser.add_argument('--user', default=None,
+                            help="Limiter à un utilisateur (nom d'utilisateur)")
+        parser.add_argument('--batch-size', type=int, default=None,
+                            help="Nombre de tâches par lot")
+        parser.add_argument('--pause', type=float, default=None,
+                            help="Pause entre deux lots (secondes)")
+        parser.add_argument('--dry-run', action='store_true',
+                            help="Compter les tâches concernées sans rien déplacer")
+        parser.add_argument('--restore', nargs='*', type=int, metavar='ID',
+                            help="Restaurer les tâches archivées indiquées "
+                                 "(toutes celles de --user si aucun identifiant)")
+
+    def handle(self, *args, **options):
+        if options['restore'] is not None:
+            return self._restore(options)
+
+        queryset = archivable_tasks(options['days'])
+        if options['user']:
+            queryset = queryset.filter(user__username=options['user'])
+
+        if options['dry_run']:
+            self.stdout.write(f"{queryset.count()} tâche(s) à archiver.")
+            return
+
+        start = time.perf_counter()
+        archived = archive_tasks(
+            queryset,
+            batch_size=options['batch_size'],
+            pause=options['pause'],
+            progress=lambda count: self.stdout.write(f"  {count} tâche(s) archivée(s)", ending='\r'),
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"\n{archived} tâche(s) archivée(s) en {time.perf_counter() - start:.1f} s"
+        ))
+
+    def _restore(self, options):
+        queryset = ArchivedTask.objects.all()
+        if options['restore']:
+            queryset = queryset.filter(pk__in=options['restore'])
+        elif options['user']:
+            queryset = queryset.filter(user__username=options['user'])
+        else:
+            self.stderr.write("Indiquez des identifiants ou --user pour la restauration.")
+            return
+
+        restored = restore_tasks(queryset, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"{restored} tâche(s) restaurée(s)"))
@@ -0,0 +1,240 @@
+import sqlite3
+import statistics
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from tasks.backup import (
+    BackupError, copy_database, create_snapshot, database_path, restore_snapshot, snapshots,
+    verify_snapshot,
+)
+
+# Taille d'une ligne de remplissage de la base de mesure (octets)
+FILLER_ROW = 4000
+
+
+class Command(BaseCommand):
+    help = (
+        "Sauvegarde en ligne de la base SQLite (API de sauvegarde : par étapes "
+        "entre lesquelles passent les écritures, ou en une étape en mode WAL), "
+        "avec compression et rotation des "
+        "instantanés ; vérification et restauration d'un instantané ; mesure "
+        "de l'effet d'une sauvegarde sur la latence des écritures."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dir', default=None,
+                            help="Répertoire des instantanés (défaut : BACKUP_DIR)")
+        parser.add_argument('--compress', action='store_true',
+                            help="Compresser l'instantané (gzip)")
+        parser.add_argument('--keep', type=int, default=None,
+                            help="Instantanés conservés (défaut : BACKUP_KEEP, 0 = tous)")
+        parser.add_argument('--pages', type=int, default=None,
+                            help="Pages copiées par étape (-1 = une seule étape ; défaut : une seule "
+                                 "étape en mode WAL, BACKUP_PAGES sinon)")
+        parser.add_argument('--sleep', type=float, default=None,
+                            help="Pause entre deux étapes en secondes (défaut : BACKUP_SLEEP)")
+        parser.add_argument('--list', action='store_true',
+                            help="Lister les instantanés")
+        parser.add_argument('--verify', metavar='INSTANTANÉ',
+                            help="Vérifier un instantané (chemin ou « latest »)")
+        parser.add_argument('--restore', metavar='INSTANTANÉ',
+                            help="Restaurer un instantané (chemin ou « latest ») dans la base")
+        parser.add_argument('--noinput', action='store_true',
+                            help="Restaurer sans demander de confirmation")
+        parser.add_argument('--benchmark', type=int, metavar='MO',
+                            help="Mesurer la latence des écritures pendant la sauvegarde "
+                                 "d'une base de test de cette taille (Mo)")
+        parser.add_argument('--write-rate', type=float, default=20.0,
+                            help="Écritures par seconde pendant la mesure")
+        parser.add_argument('--baseline', type=float, default=10.0,
+                            help="Durée de la mesure de référence, sans sauvegarde (secondes)")
+        parser.add_argument('--wal', action='store_true',
+                            help="Base de mesure en mode WAL, comme db.sqlite3 (défaut : journal "
+                                 "classique, cas le plus défavorable pour les écritures)")
+
+    def handle(self, *args, **options):
+        try:
+            if options['benchmark']:
+                return self._benchmark(options)
+            if options['list']:
+                return self._list(options)
+            if options['verify']:
+                return self._verify(self._resolve(options['verify'], options))
+            if options['restore']:
+                return self._restore(self._resolve(options['restore'], options), options)
+            return self._backup(options)
+        except BackupError as e:
+            raise CommandError(str(e))
+
+    def _resolve(self, value, options):
+        if value != 'latest':
+            path = Path(value)
+            if not path.exists():
+                raise CommandError(f"Instantané introuvable : {path}")
+            return path
+        found = snapshots(options['dir'])
+        if not found:
+            raise CommandError("Aucun instantané")
+        return found[0]
+
+    def _progress(self, copied, total):
+        self.stdout.write(f"  {copied}/{total} pages ({copied / total:.0%})", ending='\r')
+
+    def _backup(self, options):
+        path, stats, removed = create_snapshot(
+            directory=options['dir'],
+            compress=options['compress'],
+            keep=options['keep'],
+            pages=options['pages'],
+            sleep=options['sleep'],
+            progress=self._progress,
+        )
+        size = path.stat().st_size / 1024 ** 2
+        self.stdout.write(self.style.SUCCESS(
+            f"\nInstantané vérifié : {path} ({size:.1f} Mo) en {stats['seconds']:.1f} s, "
+            f"{stats['steps']} étape(s), {stats['restarts']} reprise(s)"
+        ))
+        for old in removed:
+            self.stdout.write(f"Supprimé (rotation) : {old.name}")
+
+    def _list(self, options):
+        found = snapshots(options['dir'])
+        if not found:
+            self.stdout.write("Aucun instantané")
+        for path in found:
+            self.stdout.write(f"{path.name}  {path.stat().st_size / 1024 ** 2:.1f} Mo")
+
+    def _verify(self, path):
+        problems, counts = verify_snapshot(path)
+        if problems:
+            for problem in problems[:20]:
+                self.stderr.write(f"  {problem}")
+            raise CommandError(f"Instantané corrompu : {path}")
+        summary = ', '.join(f"{table} : {count}" for table, count in counts.items())
+        self.stdout.write(self.style.SUCCESS(f"Instantané sain : {path.name} ({summary})"))
+
+    def _restore(self, path, options):
+        target = database_path()
+        if not options['noinput']:
+            answer = input(
+                f"Le contenu de {target} sera remplacé par {path.name}. "
+                "Arrêter l'application avant de continuer. Confirmer (oui/non) ? "
+            )
+            if answer.strip().lower() not in ('oui', 'o', 'yes', 'y'):
+                self.stdout.write("Restauration annulée")
+                return
+        start = time.perf_counter()
+        restore_snapshot(path, target)
+        self.stdout.write(self.style.SUCCESS(
+            f"Base restaurée depuis {path.name} en {time.perf_counter() - start:.1f} s"
+        ))
+
+    # --- Mesure -----------------------------------------------------------
+
+    def _benchmark(self, options):
+        """Latence d'écritures régulières : sans sauvegarde, pendant une sauvegarde
+        par étapes, puis pendant une copie en une seule étape"""
+        pages = options['pages'] or settings.BACKUP_PAGES
+        sleep = settings.BACKUP_SLEEP if options['sleep'] is None else options['sleep']
+        with tempfile.TemporaryDirectory(prefix='backup_benchmark_') as tmp:
+            source = Path(tmp) / 'source.sqlite3'
+            self._fill(source, options['benchmark'], options['wal'])
+            scenarios = [
+                ("référence", None),
+                (f"par étapes ({pages} pages, pause {sleep * 1000:.0f} ms)", pages),
+                ("une seule étape", -1),
+            ]
+            rows = []
+            for label, step_pages in scenarios:
+                writer = _Writer(source, options['write_rate'])
+                writer.start()
+                if step_pages is None:
+                    time.sleep(options['baseline'])
+                    stats = None
+                else:
+                    destination = Path(tmp) / 'copy.sqlite3'
+                    stats = copy_database(source, destination, pages=step_pages,
+                                          sleep=sleep if step_pages > 0 else 0)
+                    destination.unlink()
+                writer.stop()
+                rows.append((label, writer.latencies, writer.errors, stats))
+        self._benchmark_report(rows)
+
+    def _fill(self, path, size_mb, wal):
+        start = time.perf_counter()
+        db = sqlite3.connect(path, isolation_level=None)
+        if wal:
+            db.execute('PRAGMA journal_mode=WAL')
+        db.execute('CREATE TABLE filler (id INTEGER PRIMARY KEY, payload BLOB)')
+        db.execute('CREATE TABLE writes (id INTEGER PRIMARY KEY, at REAL)')
+        rows = size_mb * 1024 ** 2 // FILLER_ROW
+        chunk = 10000
+        for offset in range(0, rows, chunk):
+            db.execute(
+                'INSERT INTO filler (payload) WITH RECURSIVE n(i) AS '
+                '(SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < ?) SELECT randomblob(?) FROM n',
+                (min(chunk, rows - offset), FILLER_ROW),
+            )
+        db.close()
+        self.stdout.write(
+            f"Base de mesure : {path.stat().st_size / 1024 ** 2:.0f} Mo "
+            f"({'WAL' if wal else 'journal classique'}), créée en {time.perf_counter() - start:.1f} s"
+        )
+
+    def _benchmark_report(self, rows):
+        def ms(values, p):
+            return values[min(len(values) - 1, int(len(values) * p))] * 1000 if values else float('nan')
+
+        self.stdout.write(
+            f"{'scénario':<34} {'durée s':>8} {'reprises':>8} {'écritures':>9} {'p50 ms':>8} "
+            f"{'p95 ms':>8} {'p99 ms':>8} {'max ms':>8} {'échecs':>7}"
+        )
+        for label, latencies, errors, stats in rows:
+            latencies = sorted(latencies)
+            duration = f"{stats['seconds']:8.1f}" if stats else f"{'-':>8}"
+            restarts = f"{stats['restarts']:>8}" if stats else f"{'-':>8}"
+            self.stdout.write(
+                f"{label:<34} {duration} {restarts} {len(latencies):>9} "
+                f"{statistics.median(latencies) * 1000 if latencies else float('nan'):8.1f} "
+                f"{ms(latencies, 0.95):8.1f} {ms(latencies, 0.99):8.1f} "
+                f"{latencies[-1] * 1000 if latencies else float('nan'):8.1f} {errors:>7}"
+            )
+
+
+class _Writer(threading.Thread):
+    """Écritures courtes et régulières (une transaction chacune), latences mesurées"""
+
+    def __init__(self, path, rate):
+        super().__init__(daemon=True)
+        self.path = path
+        self.interval = 1 / rate
+        self.latencies = []
+        self.errors = 0
+        self._stopped = threading.Event()
+
+    def run(self):
+        db = sqlite3.connect(self.path, timeout=60, isolation_level=None)
+        next_at = time.perf_counter()
+        while not self._stopped.is_set():
+            start = time.perf_counter()
+            try:
+                db.execute('BEGIN IMMEDIATE')
+                db.execute('INSERT INTO writes (at) VALUES (?)', (time.time(),))
+                db.execute('COMMIT')
+                self.latencies.append(time.perf_counter() - start)
+            except sqlite3.OperationalError:
+                self.errors += 1
+                if db.in_transaction:
+                    db.execute('ROLLBACK')
+            next_at += self.interval
+            self._stopped.wait(max(0.0, next_at - time.perf_counter()))
+        db.close()
+
+    def stop(self):
+        self._stopped.set()
+        self.join()
@@ -0,0 +1,46 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from tasks.limiter import context
+from tasks.models import Task
+from tasks.semantic import get_embedder, index_task, semantic_index
+
+
+class Command(BaseCommand):
+    help = (
+        "Calcule les vecteurs manquants ou obsolètes puis reconstruit la "
+        "matrice projetée en mémoire de l'index sémantique."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--skip-embed', action='store_true',
+                            help="Reconstruire la matrice sans recalculer les vecteurs")
+
+    def handle(self, *args, **options):
+        embedder = get_embedder()
+        self.stdout.write(f"Embedder : {embedder.name}")
+
+        if not options['skip_embed']:
+            start = time.perf_counter()
+            done = errors = 0
+            tasks = Task.objects.only('pk', 'title', 'description').order_by('pk')
+            # Voie batch : les requêtes des utilisateurs passent avant l'indexation
+            with context(lane='batch'):
+                for task in tasks.iterator(chunk_size=2000):
+                    try:
+                        index_task(task)
+                        done += 1
+                    except Exception as e:
+                        errors += 1
+                        self.stderr.write(f"Tâche #{task.pk} : {e}")
+            self.stdout.write(
+                f"{done} tâche(s) vérifiée(s), {errors} erreur(s) "
+                f"en {time.perf_counter() - start:.1f} s"
+            )
+
+        start = time.perf_counter()
+        count = semantic_index.build()
+        self.stdout.write(self.style.SUCCESS(
+            f"Matrice reconstruite : {count} vecteur(s) en {time.perf_counter() - start:.1f} s"
+        ))
@@ -0,0 +1,422 @@
+import asyncio
+import json
+import os
+import random
+import shlex
+import shutil
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from contextlib import closing, contextmanager
+from pathlib import Path
+
+import httpx
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY, get_user_model
+from django.contrib.sessions.backends.db import SessionStore
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+from django.utils.crypto import get_random_string
+
+from tasks.mock_ollama import start_mock_server
+from tasks.models import Task
+
+ENDPOINTS = ('list', 'detail', 'create', 'toggle', 'search', 'insights')
+DEFAULT_MIX = 'list=35,detail=20,create=10,toggle=15,search=15,insights=5'
+
+# Serveurs prédéfinis (`--server nom[:workers]`) ; tout autre modèle de
+# commande contenant {port} est aussi accepté
+SERVERS = {
+    'runserver': "{python} manage.py runserver --noreload {host}:{port}",
+    'gunicorn': "gunicorn task_project.wsgi:application --workers {workers} --bind {host}:{port}",
+    'uvicorn': "uvicorn task_project.asgi:application --workers {workers} --host {host} --port {port}",
+}
+
+LIST_QUERIES = ('', '?status=todo', '?priority=high', '?sort=urgency', '?status=doing&sort=due', '?page=2')
+WORDS = ('rapport', 'réunion', 'client', 'facture', 'migration', 'serveur', 'budget', 'recrutement')
+STATUSES = ['todo', 'doing', 'done']
+PRIORITIES = ['low', 'medium', 'high', 'urgent']
+
+# Seuils acceptés par --sla (latences en millisecondes)
+SLA_METRICS = ('p50', 'p95', 'p99', 'error_rate', 'rps')
+
+
+def percentile(durations, p):
+    """Percentile (plus proche rang) d'une liste triée, en millisecondes"""
+    if not durations:
+        return None
+    return durations[min(len(durations) - 1, int(len(durations) * p))] * 1000
+
+
+def summarize(durations, errors, elapsed):
+    durations = sorted(durations)
+    count = len(durations)
+    return {
+        'requests': count,
+        'rps': count / elapsed if elapsed else 0.0,
+        'p50': percentile(durations, 0.50),
+        'p95': percentile(durations, 0.95),
+        'p99': percentile(durations, 0.99),
+        'max': durations[-1] * 1000 if durations else None,
+        'errors': sum(errors.values()),
+        'error_rate': sum(errors.values()) / count if count else 0.0,
+        'error_statuses': dict(errors),
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "Test de charge HTTP de bout en bout : démarre le serveur (runserver, "
+        "gunicorn, uvicorn...) sur une base jetable et un Ollama factice, lance "
+        "des utilisateurs virtuels (asyncio + httpx) sur un mélange réaliste "
+        "d'URL, puis affiche débit, latences p50/p95/p99 et taux d'erreur par "
+        "endpoint. Échoue si les seuils --sla ne sont pas tenus."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--server', action='append', dest='servers',
+                            help="Serveur testé : runserver, gunicorn:4, uvicorn:2 ou commande "
+                                 "contenant {host} et {port} (option répétable pour comparer)")
+        parser.add_argument('--concurrency', type=int, default=20,
+                            help="Utilisateurs virtuels simultanés")
+        parser.add_argument('--duration', type=float, default=30.0,
+                            help="Durée de la mesure (secondes)")
+        parser.add_argument('--warmup', type=float, default=5.0,
+                            help="Durée de chauffe exclue des mesures (secondes)")
+        parser.add_argument('--mix', default=DEFAULT_MIX,
+                            help=f"Poids des endpoints (défaut : {DEFAULT_MIX})")
+        parser.add_argument('--users', type=int, default=20,
+                            help="Nombre d'utilisateurs de la base de test")
+        parser.add_argument('--tasks-per-user', type=int, default=200,
+                            help="Tâches créées par utilisateur")
+        parser.add_argument('--llm-latency', type=float, default=0.5,
+                            help="Latence simulée d'un appel au LLM (secondes)")
+        parser.add_argument('--sla', action='append', default=[],
+                            help="Seuil, ex. p95=300, error_rate=0.01, rps=50 (total) ou "
+                                 "insights.p99=3000 (par endpoint) ; latences en ms")
+        parser.add_argument('--timeout', type=float, default=30.0,
+                            help="Délai maximal d'une requête (secondes)")
+        parser.add_argument('--output', help="Fichier JSON où écrire les résultats")
+        parser.add_argument('--keep', action='store_true',
+                            help="Conserver le répertoire de travail (base et journaux des serveurs)")
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        servers = [self._server_command(spec) for spec in options['servers'] or ['runserver']]
+        mix = self._parse_mix(options['mix'])
+        slas = self._parse_slas(options['sla'])
+
+        # Le serveur tourne avec DEBUG=False : fichiers statiques issus du manifeste
+        if not (Path(settings.STATIC_ROOT) / 'staticfiles.json').exists():
+            self.stdout.write("Manifeste des fichiers statiques absent : collectstatic")
+            call_command('collectstatic', interactive=False, verbosity=0)
+
+        mock = start_mock_server(latency=options['llm_latency'], seed=options['seed'])
+        workdir = Path(tempfile.mkdtemp(prefix='loadtest_http_'))
+        # Base jetable sur fichier (et non en mémoire) : partagée avec le serveur lancé
+        connection.settings_dict['TEST']['NAME'] = str(workdir / 'db.sqlite3')
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        results = {}
+        try:
+            with connection.cursor() as cursor:
+                # Lecteurs et écrivain concurrents entre workers
+                cursor.execute('PRAGMA journal_mode=WAL')
+            accounts = self._populate(random.Random(options['seed']), options['users'], options['tasks_per_user'])
+            snapshot = workdir / 'seed.sqlite3'
+            self._snapshot_database(snapshot)
+            for index, (label, command) in enumerate(servers):
+                if index:
+                    # Chaque serveur part du jeu de données initial (créations,
+                    # bascules et sessions du serveur précédent effacées)
+                    self._restore_database(snapshot)
+                with self._running_server(command, mock.url, workdir) as base_url:
+                    self.stdout.write(f"\n== {label} ({base_url}) ==")
+                    results[label] = asyncio.run(self._run(base_url, accounts, mix, options))
+                self._report(results[label])
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=options['keep'])
+            mock.shutdown()
+            if options['keep']:
+                self.stdout.write(f"Base et journaux des serveurs conservés dans {workdir}")
+            else:
+                shutil.rmtree(workdir, ignore_errors=True)
+
+        if len(results) > 1:
+            self._compare(results)
+        if options['output']:
+            Path(options['output']).write_text(json.dumps(results, indent=2, ensure_ascii=False))
+
+        failures = [f"{label} : {failure}" for label, result in results.items()
+                    for failure in self._check_slas(result, slas)]
+        if failures:
+            for failure in failures:
+                self.stderr.write(f"SLA non respecté - {failure}")
+            raise CommandError(f"{len(failures)} seuil(s) SLA non respecté(s)")
+        if slas:
+            self.stdout.write(self.style.SUCCESS("Tous les seuils SLA sont respectés"))
+
+    # --- Préparation ------------------------------------------------------
+
+    def _server_command(self, spec):
+        """(libellé, modèle de commande) d'une option --server"""
+        if '{port}' in spec:
+            return spec, spec
+        name, _, workers = spec.partition(':')
+        if name not in SERVERS:
+            raise CommandError(f"Serveur inconnu : {name} (choix : {', '.join(SERVERS)})")
+        executable = sys.executable if name == 'runserver' else name
+        if shutil.which(executable) is None:
+            raise CommandError(f"{name} n'est pas installé")
+        if name == 'runserver' and workers:
+            raise CommandError("runserver ne gère qu'un processus (threads)")
+        return spec, SERVERS[name].replace('{workers}', workers or '1')
+
+    def _parse_mix(self, value):
+        mix = {}
+        for part in value.split(','):
+            name, _, weight = part.partition('=')
+            name = name.strip()
+            if name not in ENDPOINTS:
+                raise CommandError(f"Endpoint inconnu dans --mix : {name} (choix : {', '.join(ENDPOINTS)})")
+            try:
+                mix[name] = float(weight)
+            except ValueError:
+                raise CommandError(f"Poids invalide dans --mix : {part}")
+        if not any(mix.values()):
+            raise CommandError("--mix : au moins un endpoint doit avoir un poids positif")
+        return mix
+
+    def _parse_slas(self, values):
+        """{(endpoint ou 'total', mesure): seuil}"""
+        slas = {}
+        for value in values:
+            key, _, threshold = value.partition('=')
+            scope, _, metric = key.rpartition('.')
+            scope = scope or 'total'
+            if metric not in SLA_METRICS or scope not in (*ENDPOINTS, 'total'):
+                raise CommandError(f"Seuil SLA invalide : {value} (mesures : {', '.join(SLA_METRICS)})")
+            try:
+                slas[scope, metric] = float(threshold)
+            except ValueError:
+                raise CommandError(f"Seuil SLA invalide : {value}")
+        return slas
+
+    def _populate(self, rng, users, tasks_per_user):
+        """Comptes de test avec sessions ouvertes : (cookies, ids des tâches) par utilisateur"""
+        User = get_user_model()
+        now = timezone.now()
+        accounts = []
+        for i in range(users):
+            # Mot de passe inutilisable : la session est ouverte directement
+            user = User.objects.create(username=f"charge{i}", password='!')
+            Task.objects.bulk_create(
+                Task(
+                    user=user,
+                    title=f"{rng.choice(WORDS).capitalize()} {rng.choice(WORDS)} n°{n}",
+                    description=f"Préparer le {rng.choice(WORDS)} avec l'équipe",
+                    status=rng.choice(STATUSES),
+                    priority=rng.choice(PRIORITIES),
+                    due_date=now + timezone.timedelta(days=rng.randint(-10, 60)) if rng.random() < 0.7 else None,
+                )
+                for n in range(tasks_per_user)
+            )
+            session = SessionStore()
+            session[SESSION_KEY] = str(user.pk)
+            session[BACKEND_SESSION_KEY] = settings.AUTHENTICATION_BACKENDS[0]
+            session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+            session.create()
+            csrf_token = get_random_string(32)
+            accounts.append({
+                'cookies': {settings.SESSION_COOKIE_NAME: session.session_key, settings.CSRF_COOKIE_NAME: csrf_token},
+                'csrf_token': csrf_token,
+                'task_ids': list(Task.objects.filter(user=user).values_list('pk', flat=True)),
+            })
+        self.stdout.write(f"Jeu de données : {users} utilisateurs, {users * tasks_per_user} tâches")
+        return accounts
+
+    def _snapshot_database(self, path):
+        """Copie de la base peuplée (API de sauvegarde SQLite, valable en mode WAL)"""
+        connection.ensure_connection()
+        with closing(sqlite3.connect(path)) as target:
+            connection.connection.backup(target)
+
+    def _restore_database(self, path):
+        """Remet la base dans l'état de la copie (aucun serveur lancé)"""
+        connection.ensure_connection()
+        with closing(sqlite3.connect(path)) as source:
+            source.backup(connection.connection)
+
+    # --- Serveur ----------------------------------------------------------
+
+    def _server_env(self, host, ollama_url):
+        """Environnement du serveur lancé : base jetable, Ollama factice"""
+        return {
+            **os.environ,
+            'DJANGO_SETTINGS_MODULE': 'task_project.settings',
+            'SQLITE_PATH': connection.settings_dict['NAME'],
+            # Écritures concurrentes de plusieurs workers sur la même base :
+            # attente du verrou plutôt qu'un échec immédiat (voir settings.py)
+            'SQLITE_TRANSACTION_MODE': 'IMMEDIATE',
+            'ALLOWED_HOSTS': f"{host},localhost",
+            'DJANGO_DEBUG': 'False',
+            'OLLAMA_URL': ollama_url,
+            'PYTHONUNBUFFERED': '1',
+        }
+
+    @contextmanager
+    def _running_server(self, command, ollama_url, workdir):
+        """Lance le serveur sur un port libre et renvoie son URL une fois prêt"""
+        host = '127.0.0.1'
+        with socket.socket() as sock:
+            sock.bind((host, 0))
+            port = sock.getsockname()[1]
+        env = self._server_env(host, ollama_url)
+        log_path = workdir / f"server-{port}.log"
+        with open(log_path, 'wb') as log:
+            process = subprocess.Popen(
+                shlex.split(command.format(python=sys.executable, host=host, port=port)),
+                cwd=settings.BASE_DIR, env=env, stdout=log, stderr=subprocess.STDOUT,
+            )
+            try:
+                base_url = f"http://{host}:{port}"
+                self._wait_ready(base_url, process, log_path)
+                yield base_url
+            finally:
+                process.terminate()
+                try:
+                    process.wait(10)
+                except subprocess.TimeoutExpired:
+                    process.kill()
+                    process.wait()
+
+    def _wait_ready(self, base_url, process, log_path, timeout=60):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                raise CommandError(f"Le serveur s'est arrêté au démarrage :\n{log_path.read_text()[-2000:]}")
+            try:
+                if httpx.get(f"{base_url}/accounts/login/", timeout=1).status_code < 500:
+                    return
+            except httpx.TransportError:
+                pass
+            time.sleep(0.2)
+        raise CommandError(f"Serveur injoignable après {timeout} s :\n{log_path.read_text()[-2000:]}")
+
+    # --- Charge -----------------------------------------------------------
+
+    def _request(self, endpoint, account, rng):
+        """(méthode, chemin, options httpx, statut attendu) d'une requête de l'endpoint"""
+        task_id = rng.choice(account['task_ids'])
+        if endpoint == 'list':
+            return 'GET', f"/{rng.choice(LIST_QUERIES)}", {}, 200
+        if endpoint == 'detail':
+            return 'GET', f"/task/{task_id}/", {}, 200
+        if endpoint == 'search':
+            return 'GET', f"/?search={rng.choice(WORDS)}", {}, 200
+        if endpoint == 'insights':
+            return 'GET', '/api/insights/', {}, 200
+        if endpoint == 'toggle':
+            return 'POST', f"/task/{task_id}/toggle-status/", {
+                'headers': {'X-CSRFToken': account['csrf_token']},
+            }, 200
+        # Création par le formulaire TaskForm (redirection vers la liste si valide)
+        due_date = timezone.localtime() + timezone.timedelta(days=rng.randint(1, 30))
+        return 'POST', '/task/new/', {'data': {
+            'csrfmiddlewaretoken': account['csrf_token'],
+            'title': f"{rng.choice(WORDS).capitalize()} à traiter",
+            'description': f"Créée par le test de charge ({rng.choice(WORDS)})",
+            'status': 'todo',
+            'priority': rng.choice(PRIORITIES),
+            'due_date': due_date.strftime('%Y-%m-%dT%H:%M'),
+        }}, 302
+
+    async def _run(self, base_url, accounts, mix, options):
+        endpoints, weights = zip(*mix.items())
+        durations = {endpoint: [] for endpoint in endpoints}
+        errors = {endpoint: Counter() for endpoint in endpoints}
+        start = time.perf_counter()
+        measure_from = start + options['warmup']
+        stop_at = measure_from + options['duration']
+
+        async def virtual_user(index):
+            account = accounts[index % len(accounts)]
+            rng = random.Random(options['seed'] * 1000 + index)
+            async with httpx.AsyncClient(base_url=base_url, cookies=account['cookies'],
+                                         timeout=options['timeout']) as client:
+                while time.perf_counter() < stop_at:
+                    endpoint = rng.choices(endpoints, weights)[0]
+                    method, path, kwargs, expected = self._request(endpoint, account, rng)
+                    began = time.perf_counter()
+                    try:
+                        response = await client.request(method, path, **kwargs)
+                        status = response.status_code
+                    except httpx.HTTPError as e:
+                        status = type(e).__name__
+                    ended = time.perf_counter()
+                    if began < measure_from or ended > stop_at:
+                        continue
+                    durations[endpoint].append(ended - began)
+                    if status != expected:
+                        errors[endpoint][str(status)] += 1
+
+        await asyncio.gather(*(virtual_user(i) for i in range(options['concurrency'])))
+        elapsed = options['duration']
+        result = {endpoint: summarize(durations[endpoint], errors[endpoint], elapsed) for endpoint in endpoints}
+        result['total'] = summarize(
+            [d for values in durations.values() for d in values],
+            sum(errors.values(), Counter()),
+            elapsed,
+        )
+        return result
+
+    # --- Rapport ----------------------------------------------------------
+
+    def _format_row(self, name, stats):
+        def ms(value):
+            return f"{value:8.1f}" if value is not None else f"{'-':>8}"
+        return (
+            f"{name:<10} {stats['requests']:>8} {stats['rps']:>8.1f} {ms(stats['p50'])} "
+            f"{ms(stats['p95'])} {ms(stats['p99'])} {ms(stats['max'])} {stats['error_rate'] * 100:>7.2f}%"
+        )
+
+    def _report(self, result):
+        self.stdout.write(
+            f"{'endpoint':<10} {'requêtes':>8} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} "
+            f"{'p99 ms':>8} {'max ms':>8} {'erreurs':>8}"
+        )
+        for name, stats in result.items():
+            self.stdout.write(self._format_row(name, stats))
+            if stats['error_statuses'] and name != 'total':
+                statuses = ', '.join(f"{status} x{count}" for status, count in stats['error_statuses'].items())
+                self.stdout.write(f"{'':<10} réponses inattendues : {statuses}")
+
+    def _compare(self, results):
+        self.stdout.write("\n== Comparaison (total) ==")
+        self.stdout.write(
+            f"{'serveur':<10} {'requêtes':>8} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} "
+            f"{'p99 ms':>8} {'max ms':>8} {'erreurs':>8}"
+        )
+        for number, (label, result) in enumerate(results.items(), 1):
+            self.stdout.write(self._format_row(f"#{number}", result['total']))
+        for number, label in enumerate(results, 1):
+            self.stdout.write(f"#{number} : {label}")
+
+    def _check_slas(self, result, slas):
+        failures = []
+        for (scope, metric), threshold in slas.items():
+            if scope not in result:
+                continue
+            value = result[scope][metric]
+            if value is None:
+                continue
+            # Débit : seuil minimal ; latences et erreurs : seuils maximaux
+            failed = value < threshold if metric == 'rps' else value > threshold
+            if failed:
+                failures.append(f"{scope}.{metric} = {value:.3g} (seuil {threshold:g})")
+        return failures
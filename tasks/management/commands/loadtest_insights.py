@@ -0,0 +1,114 @@
+import asyncio
+import statistics
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import AsyncClient
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+
+from tasks.mock_ollama import start_mock_server
+from tasks.models import Task
+
+
+class Command(BaseCommand):
+    help = (
+        "Test de charge des vues d'insights asynchrones contre un serveur "
+        "Ollama factice (base de données de test jetable)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200,
+                            help="Nombre de requêtes simultanées")
+        parser.add_argument('--latency', type=float, default=2.0,
+                            help="Latence simulée d'un appel au LLM (secondes)")
+        parser.add_argument('--tokens-per-second', type=float, default=0.0,
+                            help="Vitesse de génération simulée (0 = instantanée)")
+        parser.add_argument('--error-rate', type=float, default=0.0,
+                            help="Proportion d'appels au LLM en erreur")
+        parser.add_argument('--seed', type=int, default=0,
+                            help="Graine du tirage des pannes (reproductible)")
+        parser.add_argument('--tasks', type=int, default=20,
+                            help="Nombre de tâches créées dans la base de test")
+        parser.add_argument('--path', default='/api/insights/',
+                            help="URL testée")
+        parser.add_argument('--concurrency', type=int, default=0,
+                            help="Appels simultanés autorisés vers le LLM (0 = OLLAMA_CONCURRENCY, "
+                                 "comme l'application en production)")
+        parser.add_argument('--queue-limit', type=int, default=0,
+                            help="Profondeur de la file interactive (0 = autant que de requêtes)")
+
+    def handle(self, *args, **options):
+        server = start_mock_server(
+            latency=options['latency'],
+            tokens_per_second=options['tokens_per_second'],
+            error_rate=options['error_rate'],
+            seed=options['seed'],
+        )
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            user = get_user_model().objects.create_user('charge')
+            Task.objects.bulk_create(
+                Task(title=f"Tâche de charge {i}", priority='medium', user=user)
+                for i in range(options['tasks'])
+            )
+            limits = {**settings.OLLAMA_QUEUE_LIMITS,
+                      'interactive': options['queue_limit'] or options['requests']}
+            with override_settings(OLLAMA_URL=server.url, ALLOWED_HOSTS=['*'],
+                                   OLLAMA_CONCURRENCY=options['concurrency'] or settings.OLLAMA_CONCURRENCY,
+                                   OLLAMA_QUEUE_LIMITS=limits):
+                durations, errors, rejected, elapsed = asyncio.run(
+                    self._run(options['path'], options['requests'], user)
+                )
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+            server.shutdown()
+
+        # Durée d'un appel au LLM : traitement du prompt puis génération
+        call_time = options['latency'] + server.generation_time(len(server.reply_tokens({})))
+        self._report(durations, errors, rejected, elapsed, call_time)
+
+    async def _run(self, path, count, user):
+        client = AsyncClient()
+        await client.aforce_login(user)
+
+        async def one():
+            start = time.perf_counter()
+            response = await client.get(path)
+            # Un échec de génération est renvoyé avec success=true et model_used="N/A"
+            ok = (response.status_code == 200 and b'"success": true' in response.content
+                  and b'"model_used": "N/A"' not in response.content)
+            return time.perf_counter() - start, ok, response.status_code == 503
+
+        start = time.perf_counter()
+        results = await asyncio.gather(*(one() for _ in range(count)))
+        elapsed = time.perf_counter() - start
+
+        durations = sorted(d for d, _, _ in results)
+        rejected = sum(1 for _, _, busy in results if busy)
+        errors = sum(1 for _, ok, busy in results if not ok and not busy)
+        return durations, errors, rejected, elapsed
+
+    def _report(self, durations, errors, rejected, elapsed, call_time):
+        def percentile(p):
+            return durations[min(len(durations) - 1, int(len(durations) * p))]
+
+        self.stdout.write(
+            f"Requêtes        : {len(durations)} ({errors} en erreur, {rejected} refusée(s) en 503)"
+        )
+        self.stdout.write(f"Appel LLM simulé: {call_time:.2f} s")
+        self.stdout.write(f"Durée totale    : {elapsed:.2f} s")
+        self.stdout.write(f"Débit           : {len(durations) / elapsed:.1f} req/s")
+        self.stdout.write(
+            f"Latence         : médiane {statistics.median(durations):.2f} s, "
+            f"p95 {percentile(0.95):.2f} s, max {durations[-1]:.2f} s"
+        )
+        # En séquentiel, la durée serait requêtes x durée d'un appel
+        serial = (len(durations) - rejected) * call_time
+        self.stdout.write(self.style.SUCCESS(
+            f"Concurrence effective : x{serial / elapsed:.0f} par rapport à un worker bloquant"
+        ))
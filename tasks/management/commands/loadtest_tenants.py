@@ -0,0 +1,132 @@
+import random
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import Count, Q
+from django.test import Client
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+from django.utils import timezone
+
+from tasks.models import Task
+
+STATUSES = ['todo', 'doing', 'done']
+PRIORITIES = ['low', 'medium', 'high']
+
+
+class Command(BaseCommand):
+    help = (
+        "Test de charge multi-utilisateurs : crée des milliers de comptes et "
+        "leurs tâches (base de test jetable), puis mesure la liste et les "
+        "statistiques d'utilisateurs pris au hasard et affiche les plans d'exécution."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10000,
+                            help="Nombre d'utilisateurs créés")
+        parser.add_argument('--tasks-per-user', type=int, default=20,
+                            help="Nombre moyen de tâches par utilisateur")
+        parser.add_argument('--samples', type=int, default=200,
+                            help="Nombre d'utilisateurs tirés au hasard pour les mesures")
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            user_ids = self._populate(rng, options['users'], options['tasks_per_user'])
+            self._explain(user_ids[0])
+            with override_settings(ALLOWED_HOSTS=['*']):
+                self._measure(rng, user_ids, options['samples'])
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+    def _populate(self, rng, users, tasks_per_user):
+        User = get_user_model()
+        start = time.perf_counter()
+        # Mot de passe inutilisable : les mesures passent par force_login
+        User.objects.bulk_create(
+            (User(username=f"charge{i}", password='!') for i in range(users)),
+            batch_size=1000,
+        )
+        user_ids = list(User.objects.order_by('pk').values_list('pk', flat=True))
+
+        now = timezone.now()
+        batch = []
+        total = 0
+        for user_id in user_ids:
+            # Répartition inégale : quelques gros comptes, beaucoup de petits
+            for i in range(max(1, int(rng.expovariate(1 / tasks_per_user)))):
+                batch.append(Task(
+                    user_id=user_id,
+                    title=f"Tâche {i} de l'utilisateur {user_id}",
+                    status=rng.choice(STATUSES),
+                    priority=rng.choice(PRIORITIES),
+                    due_date=now + timezone.timedelta(days=rng.randint(-30, 30)) if rng.random() < 0.5 else None,
+                ))
+            if len(batch) >= 5000:
+                Task.objects.bulk_create(batch)
+                total += len(batch)
+                batch = []
+        Task.objects.bulk_create(batch)
+        total += len(batch)
+
+        self.stdout.write(
+            f"Jeu de données   : {len(user_ids)} utilisateurs, {total} tâches "
+            f"({time.perf_counter() - start:.1f} s)"
+        )
+        return user_ids
+
+    def _explain(self, user_id):
+        """Plans d'exécution des requêtes de la liste : toutes doivent partir d'un index user_id"""
+        queries = {
+            'liste': Task.objects.filter(user_id=user_id).order_by('-created_at')[:10],
+            'filtre statut': Task.objects.filter(user_id=user_id, status='todo').order_by('-created_at')[:10],
+            'filtre priorité': Task.objects.filter(user_id=user_id, priority='high').order_by('-created_at')[:10],
+            'statistiques': Task.objects.filter(user_id=user_id).values('user').annotate(
+                todo=Count('pk', filter=Q(status='todo')),
+                overdue=Count('pk', filter=Q(due_date__lt=timezone.now()) & ~Q(status='done')),
+            ),
+        }
+        for label, queryset in queries.items():
+            plan = queryset.explain()
+            self.stdout.write(f"Plan ({label}) : {' | '.join(plan.splitlines())}")
+
+    def _measure(self, rng, user_ids, samples):
+        User = get_user_model()
+        durations, queries, errors = [], [], 0
+        for user in User.objects.filter(pk__in=rng.sample(user_ids, min(samples, len(user_ids)))):
+            client = Client()
+            client.force_login(user)
+            for path in ('/', '/?status=todo', '/?priority=high'):
+                executed = [0]
+
+                def count_queries(execute, sql, params, many, context):
+                    executed[0] += 1
+                    return execute(sql, params, many, context)
+
+                start = time.perf_counter()
+                with connection.execute_wrapper(count_queries):
+                    response = client.get(path)
+                durations.append(time.perf_counter() - start)
+                queries.append(executed[0])
+                if response.status_code != 200:
+                    errors += 1
+
+        durations.sort()
+
+        def percentile(p):
+            return durations[min(len(durations) - 1, int(len(durations) * p))] * 1000
+
+        self.stdout.write(f"Requêtes         : {len(durations)} ({errors} en erreur)")
+        self.stdout.write(
+            f"Latence          : médiane {statistics.median(durations) * 1000:.1f} ms, "
+            f"p95 {percentile(0.95):.1f} ms, p99 {percentile(0.99):.1f} ms"
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Requêtes SQL     : {max(queries)} au plus par page (indépendant du nombre d'utilisateurs)"
+        ))
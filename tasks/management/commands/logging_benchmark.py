@@ -0,0 +1,135 @@
+import logging
+import statistics
+import tempfile
+import threading
+import time
+from logging.handlers import RotatingFileHandler
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.core.signals import request_started
+from django.db import connection
+from django.test import Client
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+
+from tasks.log import AsyncHandler, JsonFormatter
+from tasks.models import Task
+
+LOGGER_NAME = 'tasks.benchmark'
+
+
+class SlowRotatingFileHandler(RotatingFileHandler):
+    """Fichier journal sur un disque lent (NFS, disque saturé...) : chaque écriture attend `delay`"""
+
+    delay_seconds = 0.0
+
+    def emit(self, record):
+        super().emit(record)
+        if self.delay_seconds:
+            time.sleep(self.delay_seconds)
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare la latence des requêtes sans journal, avec un FileHandler "
+        "synchrone et avec la journalisation asynchrone (base de test jetable)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8,
+                            help="Nombre de clients simultanés")
+        parser.add_argument('--requests', type=int, default=50,
+                            help="Requêtes par client")
+        parser.add_argument('--lines', type=int, default=10,
+                            help="Lignes de journal écrites par requête")
+        parser.add_argument('--disk-delay', type=float, default=0.0005,
+                            help="Durée simulée d'une écriture sur disque (secondes)")
+
+    def handle(self, *args, **options):
+        SlowRotatingFileHandler.delay_seconds = options['disk_delay']
+        logger = logging.getLogger(LOGGER_NAME)
+        logger.propagate = False
+        logger.setLevel(logging.INFO)
+        lines = options['lines']
+
+        def log_request(sender, **kwargs):
+            for i in range(lines):
+                logger.info("Ligne de journal %d de la requête", i)
+
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        directory = tempfile.mkdtemp(prefix='logging-benchmark-')
+        request_started.connect(log_request)
+        try:
+            user = get_user_model().objects.create_user('journal')
+            Task.objects.bulk_create(Task(title=f"Tâche {i}", user=user) for i in range(30))
+
+            scenarios = {
+                'sans journal': lambda: logging.NullHandler(),
+                'FileHandler synchrone': lambda: self._file_handler(
+                    SlowRotatingFileHandler, directory, 'sync.log'),
+                'AsyncHandler (file)': lambda: AsyncHandler(
+                    target='tasks.management.commands.logging_benchmark.SlowRotatingFileHandler',
+                    filename=f"{directory}/async.log", maxBytes=10 * 1024 * 1024, backupCount=1,
+                ),
+            }
+            with override_settings(ALLOWED_HOSTS=['*']):
+                for label, factory in scenarios.items():
+                    handler = factory()
+                    handler.setFormatter(JsonFormatter())
+                    logger.addHandler(handler)
+                    try:
+                        durations, elapsed = self._run(user, options['threads'], options['requests'])
+                    finally:
+                        logger.removeHandler(handler)
+                        handler.close()
+                    self._report(label, durations, elapsed, handler)
+        finally:
+            request_started.disconnect(log_request)
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+    def _file_handler(self, cls, directory, name):
+        return cls(f"{directory}/{name}", maxBytes=10 * 1024 * 1024, backupCount=1)
+
+    def _run(self, user, threads, requests):
+        durations = []
+        lock = threading.Lock()
+
+        # Sessions créées avant la mesure : pendant la charge, les requêtes ne font que lire
+        clients = []
+        for _ in range(threads):
+            client = Client()
+            client.force_login(user)
+            clients.append(client)
+
+        def worker(client):
+            local = []
+            for _ in range(requests):
+                start = time.perf_counter()
+                client.get('/')
+                local.append(time.perf_counter() - start)
+            with lock:
+                durations.extend(local)
+            connection.close()
+
+        start = time.perf_counter()
+        pool = [threading.Thread(target=worker, args=(client,)) for client in clients]
+        for thread in pool:
+            thread.start()
+        for thread in pool:
+            thread.join()
+        return sorted(durations), time.perf_counter() - start
+
+    def _report(self, label, durations, elapsed, handler):
+        def percentile(p):
+            return durations[min(len(durations) - 1, int(len(durations) * p))] * 1000
+
+        dropped = getattr(handler, 'dropped', 0)
+        self.stdout.write(self.style.MIGRATE_HEADING(label))
+        self.stdout.write(
+            f"  {len(durations)} requêtes en {elapsed:.2f} s ({len(durations) / elapsed:.0f} req/s) : "
+            f"médiane {statistics.median(durations) * 1000:.1f} ms, "
+            f"p95 {percentile(0.95):.1f} ms, p99 {percentile(0.99):.1f} ms"
+            + (f", {dropped} message(s) abandonné(s)" if dropped else "")
+        )
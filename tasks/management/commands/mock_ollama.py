@@ -0,0 +1,53 @@
+from django.core.management.base import BaseCommand
+
+from tasks.mock_ollama import MockOllamaServer
+
+
+class Command(BaseCommand):
+    help = (
+        "Lance un serveur Ollama factice (tags, ps, chat, generate, embeddings) pour tester "
+        "l'application sans modèle : OLLAMA_URL=http://127.0.0.1:<port>."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=11434)
+        parser.add_argument('--latency', type=float, default=0.5,
+                            help="Traitement du prompt avant le premier token (secondes)")
+        parser.add_argument('--tokens-per-second', type=float, default=30.0,
+                            help="Vitesse de génération simulée (0 = instantanée)")
+        parser.add_argument('--load-time', type=float, default=0.0,
+                            help="Chargement d'un modèle absent de la mémoire (secondes)")
+        parser.add_argument('--embedding-latency', type=float, default=0.0,
+                            help="Durée d'un calcul d'embedding (secondes)")
+        parser.add_argument('--error-rate', type=float, default=0.0,
+                            help="Proportion de requêtes en erreur HTTP")
+        parser.add_argument('--error-status', type=int, default=500,
+                            help="Code HTTP des erreurs injectées")
+        parser.add_argument('--drop-rate', type=float, default=0.0,
+                            help="Proportion de connexions fermées sans réponse")
+        parser.add_argument('--seed', type=int, default=0,
+                            help="Graine du tirage des pannes (reproductible)")
+        parser.add_argument('--model', action='append', dest='models',
+                            help="Modèle exposé (option répétable)")
+
+    def handle(self, *args, **options):
+        server = MockOllamaServer(
+            (options['host'], options['port']),
+            latency=options['latency'],
+            models=options['models'],
+            tokens_per_second=options['tokens_per_second'],
+            embedding_latency=options['embedding_latency'],
+            load_time=options['load_time'],
+            error_rate=options['error_rate'],
+            error_status=options['error_status'],
+            drop_rate=options['drop_rate'],
+            seed=options['seed'],
+        )
+        self.stdout.write(self.style.SUCCESS(f"Ollama factice à l'écoute sur {server.url} (Ctrl+C pour arrêter)"))
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
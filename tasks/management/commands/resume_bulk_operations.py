@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand
+
+from tasks.bulk import OperationClaimed, pending_operations, run_bulk_operation
+
+
+class Command(BaseCommand):
+    help = (
+        "Reprend les opérations de masse en attente ou interrompues "
+        "(à lancer au démarrage ou depuis une tâche planifiée)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None,
+                            help="Nombre de tâches par lot")
+        parser.add_argument('--pause', type=float, default=None,
+                            help="Pause entre deux lots (secondes)")
+
+    def handle(self, *args, **options):
+        operations = list(pending_operations())
+        if not operations:
+            self.stdout.write("Aucune opération à reprendre.")
+            return
+
+        for operation in operations:
+            self.stdout.write(f"Reprise de l'opération #{operation.pk} : {operation.action}")
+
+            def report(op):
+                self.stdout.write(f"  {op.processed}/{op.total} ({op.progress} %)", ending='\r')
+
+            try:
+                run_bulk_operation(
+                    operation,
+                    batch_size=options['batch_size'],
+                    pause=options['pause'],
+                    progress=report,
+                )
+            except OperationClaimed:
+                self.stdout.write(f"Opération #{operation.pk} : déjà traitée par un autre exécutant, ignorée")
+                continue
+            style = self.style.SUCCESS if operation.status == 'done' else self.style.ERROR
+            self.stdout.write(style(
+                f"\nOpération #{operation.pk} : {operation.get_status_display()} "
+                f"({operation.processed} tâche(s))"
+            ))
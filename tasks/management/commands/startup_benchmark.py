@@ -0,0 +1,85 @@
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+IMPORTTIME_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$')
+
+# Dépendances lourdes qui ne doivent pas être chargées au démarrage
+WATCHED_MODULES = ('ollama', 'httpx', 'requests', 'numpy', 'tasks.ai', 'tasks.semantic', 'tasks.analytics')
+
+SCENARIOS = {
+    'manage.py check': ['manage.py', 'check'],
+    'chargement WSGI': ['-c', 'import task_project.wsgi'],
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Mesure le démarrage à froid (`python -X importtime`) de "
+        "`manage.py check` et du chargement de l'application WSGI."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=5,
+                            help="Nombre d'exécutions par scénario (médiane retenue)")
+        parser.add_argument('--top', type=int, default=10,
+                            help="Nombre de modules les plus coûteux affichés")
+
+    def handle(self, *args, **options):
+        env = {
+            **os.environ,
+            'DJANGO_SETTINGS_MODULE': os.environ.get('DJANGO_SETTINGS_MODULE', 'task_project.settings'),
+            # Le thread de préchauffage importerait tasks.ai pendant la mesure
+            'OLLAMA_WARMUP': 'False',
+        }
+        for label, arguments in SCENARIOS.items():
+            walls, imports, modules = [], [], {}
+            for _ in range(options['runs']):
+                start = time.perf_counter()
+                result = subprocess.run(
+                    [sys.executable, '-X', 'importtime', *arguments],
+                    cwd=settings.BASE_DIR, env=env, capture_output=True, text=True,
+                )
+                walls.append(time.perf_counter() - start)
+                if result.returncode:
+                    self.stderr.write(result.stderr[-2000:])
+                    return
+                total, modules = self._parse(result.stderr)
+                imports.append(total)
+
+            self.stdout.write(self.style.MIGRATE_HEADING(label))
+            self.stdout.write(
+                f"  Durée totale : {statistics.median(walls) * 1000:.0f} ms (médiane sur {len(walls)}), "
+                f"dont imports {statistics.median(imports) / 1000:.0f} ms"
+            )
+            # Modules de premier et deuxième niveau (les imports faits par le
+            # module WSGI sont au deuxième niveau)
+            top = sorted(
+                ((cumulative, level, name) for name, (cumulative, level) in modules.items() if level <= 1),
+                reverse=True,
+            )[:options['top']]
+            for cumulative, level, name in top:
+                self.stdout.write(f"  {cumulative / 1000:8.1f} ms  {'  ' * level}{name}")
+            loaded = [name for name in WATCHED_MODULES if name in modules]
+            if loaded:
+                self.stdout.write(self.style.WARNING(f"  Modules lourds chargés : {', '.join(loaded)}"))
+            else:
+                self.stdout.write(self.style.SUCCESS("  Aucun module lourd chargé au démarrage"))
+
+    def _parse(self, stderr):
+        """Retourne (somme des temps propres en µs, {module: (cumulé µs, niveau)})"""
+        total, modules = 0, {}
+        for line in stderr.splitlines():
+            match = IMPORTTIME_LINE.match(line)
+            if not match:
+                continue
+            own, cumulative, indent, name = match.groups()
+            total += int(own)
+            modules[name] = (int(cumulative), (len(indent) - 1) // 2)
+        return total, modules
@@ -0,0 +1,92 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import F
+
+from tasks.models import Task
+from tasks.triage import run_triage, triage_candidates
+
+
+class Command(BaseCommand):
+    help = (
+        "Tri automatique par l'IA : suggère une priorité et une échéance pour "
+        "les tâches non triées, par lots (reprenable après interruption)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None,
+                            help="Tâches par prompt (défaut : TRIAGE_BATCH_SIZE)")
+        parser.add_argument('--workers', type=int, default=None,
+                            help="Appels simultanés (défaut : OLLAMA_CONCURRENCY)")
+        parser.add_argument('--limit', type=int, default=None,
+                            help="Nombre maximal de tâches traitées")
+        parser.add_argument('--user', help="Limiter aux tâches de cet utilisateur")
+        parser.add_argument('--overwrite-due', action='store_true',
+                            help="Remplacer aussi les échéances déjà fixées")
+        parser.add_argument('--dry-run', action='store_true',
+                            help="Afficher les suggestions sans les appliquer")
+        parser.add_argument('--reset', action='store_true',
+                            help="Marquer toutes les tâches (de l'utilisateur) comme non triées puis quitter")
+
+    def handle(self, *args, **options):
+        queryset = triage_candidates()
+        if options['user']:
+            try:
+                user = get_user_model().objects.get(username=options['user'])
+            except get_user_model().DoesNotExist:
+                raise CommandError(f"Utilisateur inconnu : {options['user']}")
+            queryset = queryset.filter(user=user)
+
+        if options['reset']:
+            tasks = Task.objects.exclude(triaged_at=None)
+            if options['user']:
+                tasks = tasks.filter(user=user)
+            # Métadonnée du tri : date de modification (archivage, flux) inchangée
+            reset = tasks.update(triaged_at=None, updated_at=F('updated_at'))
+            self.stdout.write(f"{reset} tâche(s) à trier de nouveau")
+            return
+
+        # Modèle résolu avant tout traitement : Ollama arrêté ou sans modèle
+        # installé arrête la commande avec un message plutôt qu'une trace
+        from tasks.ai import model_manager
+
+        try:
+            model_manager.resolve()
+        except Exception as e:
+            raise CommandError(f"Tri automatique impossible : {e}")
+
+        total = queryset.count()
+        if options['limit'] is not None:
+            total = min(total, options['limit'])
+        self.stdout.write(f"{total} tâche(s) à trier")
+        if not total:
+            return
+
+        def progress(stats, batch, suggestions):
+            if options['dry_run']:
+                for task in batch:
+                    priority, due_date = suggestions.get(task.pk, ('—', None))
+                    self.stdout.write(f"  #{task.pk} {task.title[:50]} : {priority}, {due_date or 'sans échéance'}")
+            rate = stats['tasks'] / (stats['elapsed'] or 1)
+            self.stdout.write(f"{stats['tasks']}/{total} tâche(s), {rate:.1f} tâches/s")
+
+        try:
+            stats = run_triage(
+                queryset,
+                batch_size=options['batch_size'],
+                workers=options['workers'],
+                limit=options['limit'],
+                overwrite_due=options['overwrite_due'],
+                dry_run=options['dry_run'],
+                progress=progress,
+            )
+        except KeyboardInterrupt:
+            self.stderr.write("Interrompu : les lots déjà appliqués sont conservés, relancer pour reprendre")
+            return
+
+        verb = "proposées" if options['dry_run'] else "appliquées"
+        style = self.style.WARNING if stats['failed_batches'] or stats['rejected'] else self.style.SUCCESS
+        self.stdout.write(style(
+            f"Modèle {stats['model']} : {stats['triaged']} suggestion(s) {verb} sur {stats['tasks']} tâche(s), "
+            f"{stats['rejected']} sans suggestion valide, {stats['failed_batches']} lot(s) en échec, "
+            f"{stats['elapsed']:.1f} s ({stats['tasks'] / (stats['elapsed'] or 1):.1f} tâches/s)"
+        ))
@@ -0,0 +1,428 @@
+"""
+Métriques applicatives au format texte Prometheus.
+
+Chaque processus (worker gunicorn, runserver...) accumule ses compteurs,
+histogrammes et jauges en mémoire, puis les écrit périodiquement (au plus
+toutes les `METRICS_FLUSH_INTERVAL` secondes) dans un fichier JSON propre
+à son pid sous `METRICS_DIR`. L'endpoint `/metrics` fusionne tous ces
+fichiers : les compteurs et histogrammes sont additionnés, les jauges des
+processus disparus sont ignorées. Les fichiers des processus disparus sont
+ensuite cumulés dans `metrics_archive.json` puis supprimés : le nombre de
+fichiers reste borné et les compteurs ne reculent jamais (pas de fausse
+remise à zéro vue par Prometheus).
+
+L'endpoint exige le jeton `METRICS_TOKEN` (en-tête `Authorization: Bearer`)
+ou, sans jeton configuré, un membre de l'équipe connecté.
+
+Mesures disponibles :
+- `http_request_duration_seconds{view}` et `http_db_queries{view}` (middleware) ;
+- `ollama_request_seconds{model}`, `ollama_*_tokens_total{model}`,
+  `ollama_tokens_per_second{model}`, `ollama_load_seconds{model}` et
+  `ollama_generation_seconds{model}` (métadonnées des réponses `chat`) ;
+- `cache_requests_total{cache, result}` pour les taux de succès des caches ;
+- jauges de profondeur de file et d'état des sondes de disponibilité,
+  calculées à la lecture par des collecteurs.
+"""
+
+import atexit
+import bisect
+import fcntl
+import hmac
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+import uuid
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+RATE_BUCKETS = (1, 2, 5, 10, 20, 30, 50, 75, 100, 200)
+
+HELP = {
+    'http_request_duration_seconds': "Durée de traitement des requêtes par vue",
+    'http_db_queries': "Nombre de requêtes SQL par requête HTTP",
+    'ollama_request_seconds': "Durée des appels à Ollama",
+    'ollama_requests_total': "Appels à Ollama par résultat",
+    'ollama_prompt_tokens_total': "Tokens de prompt traités par Ollama",
+    'ollama_completion_tokens_total': "Tokens générés par Ollama",
+    'ollama_tokens_per_second': "Vitesse de génération d'Ollama",
+    'ollama_load_seconds': "Chargement du modèle en mémoire avant l'appel (0 si déjà chargé)",
+    'ollama_generation_seconds': "Génération des tokens de la réponse",
+    'cache_requests_total': "Accès aux caches applicatifs par résultat (hit/miss)",
+    'health_check_up': "Dernier résultat de chaque sonde de disponibilité (1 = ok)",
+    'health_check_age_seconds': "Ancienneté du dernier résultat de chaque sonde",
+}
+
+
+# Cumul des compteurs et histogrammes des processus disparus
+ARCHIVE_FILE = 'metrics_archive.json'
+
+
+def _key(name, labels):
+    return name, tuple(sorted(labels.items()))
+
+
+class Registry:
+    """Métriques du processus courant"""
+
+    def __init__(self):
+        self._collectors = []
+        self._reset()
+
+    def _reset(self):
+        """État vierge (au démarrage, et dans un processus fils après un fork :
+        les mesures du parent ne sont pas comptées deux fois)"""
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self.counters = {}
+        self.histograms = {}
+        self.gauges = {}
+        self._last_flush = 0.0
+        # Fichier propre à cette instance : un pid réattribué n'écrase pas
+        # le fichier d'un processus disparu avant son archivage
+        self._filename = f"metrics_{os.getpid()}_{uuid.uuid4().hex[:8]}.json"
+
+    # --- Enregistrement -------------------------------------------------
+
+    def inc(self, name, value=1, **labels):
+        key = _key(name, labels)
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+        self._maybe_flush()
+
+    def observe(self, name, value, buckets=LATENCY_BUCKETS, **labels):
+        key = _key(name, labels)
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = {
+                    'buckets': list(buckets), 'counts': [0] * len(buckets), 'sum': 0.0, 'count': 0,
+                }
+            index = bisect.bisect_left(histogram['buckets'], value)
+            if index < len(histogram['counts']):
+                histogram['counts'][index] += 1
+            histogram['sum'] += value
+            histogram['count'] += 1
+        self._maybe_flush()
+
+    def set_gauge(self, name, value, **labels):
+        with self._lock:
+            self.gauges[_key(name, labels)] = value
+        self._maybe_flush()
+
+    def register_collector(self, collector):
+        """`collector()` retourne [(nom, labels, valeur)] de jauges calculées à la lecture"""
+        self._collectors.append(collector)
+
+    # --- Agrégation multi-processus -------------------------------------
+
+    def _snapshot(self):
+        with self._lock:
+            return {
+                'pid': os.getpid(),
+                'counters': [[n, dict(l), v] for (n, l), v in self.counters.items()],
+                'histograms': [[n, dict(l), h] for (n, l), h in self.histograms.items()],
+                'gauges': [[n, dict(l), v] for (n, l), v in self.gauges.items()],
+            }
+
+    def _maybe_flush(self):
+        if time.monotonic() - self._last_flush >= settings.METRICS_FLUSH_INTERVAL:
+            # Une écriture déjà en cours dans un autre thread suffit
+            if self._flush_lock.acquire(blocking=False):
+                try:
+                    self._flush()
+                finally:
+                    self._flush_lock.release()
+
+    def flush(self):
+        """Écrit l'état du processus dans son fichier (écriture atomique)"""
+        with self._flush_lock:
+            self._flush()
+
+    def _flush(self):
+        self._last_flush = time.monotonic()
+        try:
+            os.makedirs(settings.METRICS_DIR, exist_ok=True)
+            _write_json(os.path.join(settings.METRICS_DIR, self._filename), self._snapshot())
+        except OSError as e:
+            logger.warning(f"Écriture des métriques impossible : {e}")
+
+    def collect(self):
+        """Fusionne les métriques de tous les processus"""
+        self.flush()
+        _archive_dead_processes()
+        counters, histograms, gauges = {}, {}, {}
+        for data in _read_files():
+            _merge(counters, histograms, data)
+            if data['pid'] is not None and _pid_alive(data['pid']):
+                for name, labels, value in data['gauges']:
+                    key = _key(name, labels)
+                    gauges[key] = gauges.get(key, 0) + value
+        for collector in self._collectors:
+            try:
+                for name, labels, value in collector():
+                    gauges[_key(name, labels)] = value
+            except Exception as e:
+                logger.warning(f"Collecteur de métriques en erreur : {e}")
+        return counters, histograms, gauges
+
+    def render(self):
+        """Exposition au format texte Prometheus"""
+        counters, histograms, gauges = self.collect()
+        lines = []
+        for kind, metrics in (('counter', counters), ('gauge', gauges)):
+            for name in sorted({name for name, _ in metrics}):
+                if name in HELP:
+                    lines.append(f"# HELP {name} {HELP[name]}")
+                lines.append(f"# TYPE {name} {kind}")
+                for (metric, labels), value in sorted(metrics.items()):
+                    if metric == name:
+                        lines.append(f"{name}{_labels(labels)} {value}")
+        for name in sorted({name for name, _ in histograms}):
+            if name in HELP:
+                lines.append(f"# HELP {name} {HELP[name]}")
+            lines.append(f"# TYPE {name} histogram")
+            for (metric, labels), histogram in sorted(histograms.items()):
+                if metric != name:
+                    continue
+                cumulative = 0
+                for bound, count in zip(histogram['buckets'], histogram['counts']):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{_labels(labels + (('le', bound),))} {cumulative}")
+                lines.append(f"{name}_bucket{_labels(labels + (('le', '+Inf'),))} {histogram['count']}")
+                lines.append(f"{name}_sum{_labels(labels)} {histogram['sum']}")
+                lines.append(f"{name}_count{_labels(labels)} {histogram['count']}")
+        return '\n'.join(lines) + '\n'
+
+
+def _labels(labels):
+    if not labels:
+        return ''
+    escaped = (
+        '{}="{}"'.format(k, str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for k, v in labels
+    )
+    return '{' + ','.join(escaped) + '}'
+
+
+def _write_json(path, data):
+    """Écriture atomique, par un fichier temporaire au nom unique"""
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.tmp_', suffix='.json')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def _metric_files():
+    try:
+        filenames = os.listdir(settings.METRICS_DIR)
+    except FileNotFoundError:
+        return []
+    return [
+        os.path.join(settings.METRICS_DIR, filename) for filename in filenames
+        if filename.startswith('metrics_') and filename.endswith('.json')
+    ]
+
+
+def _read_files():
+    for path in _metric_files():
+        try:
+            with open(path, encoding='utf-8') as f:
+                yield json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Fichier de métriques illisible ({path}) : {e}")
+
+
+def _merge(counters, histograms, data):
+    """Ajoute les compteurs et histogrammes de `data` aux cumuls"""
+    for name, labels, value in data['counters']:
+        key = _key(name, labels)
+        counters[key] = counters.get(key, 0) + value
+    for name, labels, histogram in data['histograms']:
+        key = _key(name, labels)
+        merged = histograms.get(key)
+        if merged is None:
+            histograms[key] = {**histogram, 'counts': list(histogram['counts'])}
+        else:
+            merged['counts'] = [a + b for a, b in zip(merged['counts'], histogram['counts'])]
+            merged['sum'] += histogram['sum']
+            merged['count'] += histogram['count']
+
+
+def _archive_dead_processes():
+    """Cumule les fichiers des processus disparus dans l'archive, puis les supprime"""
+    try:
+        os.makedirs(settings.METRICS_DIR, exist_ok=True)
+        lock = open(os.path.join(settings.METRICS_DIR, '.archive.lock'), 'w')
+    except OSError as e:
+        logger.warning(f"Archivage des métriques impossible : {e}")
+        return
+    # Un seul processus à la fois : un fichier n'est jamais cumulé deux fois
+    with lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            _archive(_metric_files())
+        except OSError as e:
+            logger.warning(f"Archivage des métriques impossible : {e}")
+
+
+def _archive(paths):
+    """Fusionne dans l'archive les fichiers des processus disparus parmi `paths`"""
+    archive_path = os.path.join(settings.METRICS_DIR, ARCHIVE_FILE)
+    dead = []
+    for path in paths:
+        if os.path.basename(path) == ARCHIVE_FILE:
+            continue
+        try:
+            with open(path, encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            continue
+        if not _pid_alive(data['pid']):
+            dead.append((path, data))
+    if not dead:
+        return
+    counters, histograms = {}, {}
+    try:
+        with open(archive_path, encoding='utf-8') as f:
+            _merge(counters, histograms, json.load(f))
+    except FileNotFoundError:
+        pass
+    for _, data in dead:
+        _merge(counters, histograms, data)
+    _write_json(archive_path, {
+        'pid': None,
+        'counters': [[n, dict(l), v] for (n, l), v in counters.items()],
+        'histograms': [[n, dict(l), h] for (n, l), h in histograms.items()],
+        'gauges': [],
+    })
+    for path, _ in dead:
+        os.unlink(path)
+
+
+def _pid_alive(pid):
+    if pid == os.getpid():
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+registry = Registry()
+os.register_at_fork(after_in_child=registry._reset)
+
+
+@atexit.register
+def _flush_at_exit():
+    # Les commandes de gestion sans mesure ne laissent pas de fichier vide
+    if registry.counters or registry.histograms or registry.gauges:
+        registry.flush()
+
+
+def is_authorized(request):
+    """Accès à /metrics : jeton `METRICS_TOKEN`, ou membre de l'équipe connecté"""
+    if settings.METRICS_TOKEN:
+        header = request.headers.get('Authorization', '')
+        return hmac.compare_digest(header.encode(), f"Bearer {settings.METRICS_TOKEN}".encode())
+    return request.user.is_active and request.user.is_staff
+
+
+inc = registry.inc
+observe = registry.observe
+set_gauge = registry.set_gauge
+register_collector = registry.register_collector
+
+
+def cache_hit(cache):
+    registry.inc('cache_requests_total', cache=cache, result='hit')
+
+
+def cache_miss(cache):
+    registry.inc('cache_requests_total', cache=cache, result='miss')
+
+
+def record_ollama_call(model, duration, response=None, error=False):
+    """Enregistre un appel à Ollama à partir des métadonnées de la réponse `chat`"""
+    registry.observe('ollama_request_seconds', duration, model=model)
+    registry.inc('ollama_requests_total', model=model, result='error' if error else 'ok')
+    if not response:
+        return
+    prompt_tokens = response.get('prompt_eval_count') or 0
+    completion_tokens = response.get('eval_count') or 0
+    registry.inc('ollama_prompt_tokens_total', prompt_tokens, model=model)
+    registry.inc('ollama_completion_tokens_total', completion_tokens, model=model)
+    # Temps de chargement du modèle et temps de génération (nanosecondes)
+    registry.observe('ollama_load_seconds', (response.get('load_duration') or 0) / 1e9, model=model)
+    eval_duration = response.get('eval_duration') or 0
+    registry.observe('ollama_generation_seconds', eval_duration / 1e9, model=model)
+    if completion_tokens and eval_duration:
+        registry.observe(
+            'ollama_tokens_per_second', completion_tokens / (eval_duration / 1e9),
+            buckets=RATE_BUCKETS, model=model,
+        )
+
+
+class MetricsMiddleware:
+    """Mesure la durée et le nombre de requêtes SQL de chaque requête, par nom d'URL.
+
+    Compatible synchrone et asynchrone : un middleware uniquement synchrone
+    ferait exécuter les vues asynchrones une par une dans son thread.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+
+        queries = [0]
+
+        def count_queries(execute, sql, params, many, context):
+            queries[0] += 1
+            return execute(sql, params, many, context)
+
+        start = time.perf_counter()
+        with connection.execute_wrapper(count_queries):
+            response = self.get_response(request)
+        self._record(request, time.perf_counter() - start, queries[0])
+        return response
+
+    async def __acall__(self, request):
+        # En asynchrone, la connexion est partagée par les requêtes concurrentes :
+        # le nombre de requêtes SQL ne serait pas attribuable, seule la durée est mesurée
+        start = time.perf_counter()
+        response = await self.get_response(request)
+        self._record(request, time.perf_counter() - start)
+        return response
+
+    def _record(self, request, duration, queries=None):
+        match = request.resolver_match
+        view = match.view_name if match else 'unresolved'
+        if view == 'tasks:metrics':
+            return
+        registry.observe('http_request_duration_seconds', duration, view=view)
+        if queries is not None:
+            registry.observe('http_db_queries', queries, buckets=COUNT_BUCKETS, view=view)
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.4 on 2026-10-19 09:05
+
+from django.db import migrations, models
+
+import tasks.search
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['status', 'due_date'], name='task_status_due_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['priority'], name='task_priority_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['-created_at'], name='task_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['due_date'], name='task_due_idx'),
+        ),
+        migrations.RunPython(
+            code=tasks.search.create_fts_index,
+            reverse_code=tasks.search.drop_fts_index,
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.4 on 2026-10-19 09:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0002_task_indexes_fts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BulkOperation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('action', models.CharField(max_length=100, verbose_name='Action')),
+                ('values', models.JSONField(verbose_name='Valeurs appliquées')),
+                ('selection', models.JSONField(default=list, verbose_name='Sélection')),
+                ('status', models.CharField(choices=[('pending', 'En attente'), ('running', 'En cours'), ('done', 'Terminée'), ('failed', 'Échouée')], default='pending', max_length=10, verbose_name='Statut')),
+                ('last_pk', models.BigIntegerField(default=0, verbose_name='Dernière clé traitée')),
+                ('processed', models.PositiveIntegerField(default=0, verbose_name='Tâches traitées')),
+                ('total', models.PositiveIntegerField(default=0, verbose_name='Total estimé')),
+                ('error', models.TextField(blank=True, verbose_name='Erreur')),
+                ('worker', models.CharField(blank=True, max_length=32, verbose_name='Exécutant')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Date de création')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Dernière progression')),
+            ],
+            options={
+                'verbose_name': 'Opération de masse',
+                'verbose_name_plural': 'Opérations de masse',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
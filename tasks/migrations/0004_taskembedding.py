@@ -0,0 +1,28 @@
+# Generated by Django 5.2.4 on 2026-10-19 09:07
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0003_bulkoperation'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskEmbedding',
+            fields=[
+                ('task', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='embedding', serialize=False, to='tasks.task', verbose_name='Tâche')),
+                ('model', models.CharField(max_length=100, verbose_name="Modèle d'embedding")),
+                ('content_hash', models.CharField(max_length=40, verbose_name='Empreinte du contenu')),
+                ('vector', models.BinaryField(verbose_name='Vecteur (float32)')),
+                ('updated_at', models.DateTimeField(auto_now=True, db_index=True, verbose_name='Dernière mise à jour')),
+            ],
+            options={
+                'verbose_name': 'Embedding de tâche',
+                'verbose_name_plural': 'Embeddings de tâches',
+            },
+        ),
+    ]
@@ -0,0 +1,69 @@
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+import tasks.search
+
+
+def backfill_task_owner(apps, schema_editor):
+    """Attribue les tâches existantes (sans propriétaire) au premier superutilisateur,
+    ou à défaut à un compte « proprietaire » créé sans mot de passe utilisable."""
+    Task = apps.get_model('tasks', 'Task')
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+
+    orphans = Task.objects.filter(user__isnull=True)
+    if not orphans.exists():
+        return
+
+    owner = (
+        User.objects.filter(is_superuser=True).order_by('pk').first()
+        or User.objects.order_by('pk').first()
+    )
+    if owner is None:
+        # Équivalent de set_unusable_password() (indisponible sur le modèle historique)
+        owner = User.objects.create(username='proprietaire', password='!')
+
+    orphans.update(user=owner)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0004_taskembedding'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='task',
+            name='user',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='tasks', to=settings.AUTH_USER_MODEL, verbose_name='Propriétaire'),
+        ),
+        migrations.RunPython(
+            code=backfill_task_owner,
+            reverse_code=migrations.RunPython.noop,
+        ),
+        migrations.AlterField(
+            model_name='task',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tasks', to=settings.AUTH_USER_MODEL, verbose_name='Propriétaire'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['user', '-created_at'], name='task_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['user', 'status', 'due_date'], name='task_user_status_due_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['user', 'priority', '-created_at'], name='task_user_priority_idx'),
+        ),
+        # SQLite reconstruit la table pour le NOT NULL, ce qui supprime les
+        # triggers de l'index plein texte : on les recrée
+        migrations.RunPython(
+            code=tasks.search.create_fts_index,
+            reverse_code=migrations.RunPython.noop,
+        ),
+    ]
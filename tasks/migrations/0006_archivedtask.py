@@ -0,0 +1,37 @@
+# Generated by Django 5.2.4 on 2026-10-19 09:22
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0005_task_user'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedTask',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False, verbose_name="Identifiant d'origine")),
+                ('title', models.CharField(max_length=200, verbose_name='Titre de la tâche')),
+                ('description', models.TextField(blank=True, null=True, verbose_name='Description détaillée')),
+                ('priority', models.CharField(choices=[('low', 'Basse'), ('medium', 'Moyenne'), ('high', 'Haute'), ('urgent', 'Urgente')], default='medium', max_length=10, verbose_name='Priorité')),
+                ('due_date', models.DateTimeField(blank=True, null=True, verbose_name="Date d'échéance")),
+                ('created_at', models.DateTimeField(verbose_name='Date de création')),
+                ('updated_at', models.DateTimeField(verbose_name='Dernière modification')),
+                ('triaged_at', models.DateTimeField(blank=True, editable=False, null=True, verbose_name="Triée par l'IA le")),
+                ('archived_at', models.DateTimeField(auto_now_add=True, verbose_name="Date d'archivage")),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_tasks', to=settings.AUTH_USER_MODEL, verbose_name='Propriétaire')),
+            ],
+            options={
+                'verbose_name': 'Tâche archivée',
+                'verbose_name_plural': 'Tâches archivées',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['user', '-created_at'], name='archived_user_created_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 5.2.4 on 2026-10-19 09:38
+
+from django.conf import settings
+from django.db import migrations, models
+
+import tasks.search
+
+# Rangs à la date de la migration, recopiés plutôt qu'importés de
+# tasks.models : la migration ne doit pas changer si le modèle évolue
+PRIORITY_RANKS = {'low': 0, 'medium': 1, 'high': 2, 'urgent': 3}
+
+
+def backfill_priority_rank(apps, schema_editor):
+    """Calcule le rang des tâches existantes en une seule requête UPDATE"""
+    Task = apps.get_model('tasks', 'Task')
+    Task.objects.update(priority_rank=models.Case(
+        *[models.When(priority=key, then=models.Value(rank)) for key, rank in PRIORITY_RANKS.items()],
+        default=models.Value(PRIORITY_RANKS['medium']),
+        output_field=models.PositiveSmallIntegerField(),
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0006_archivedtask'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='task',
+            name='priority_rank',
+            field=models.PositiveSmallIntegerField(default=1, editable=False, verbose_name='Rang de priorité'),
+        ),
+        migrations.RunPython(
+            code=backfill_priority_rank,
+            reverse_code=migrations.RunPython.noop,
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(models.F('user'), models.OrderBy(models.F('priority_rank'), descending=True), models.ExpressionWrapper(models.Q(('due_date__isnull', True)), output_field=models.BooleanField()), models.F('due_date'), name='task_user_rank_due_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['user', 'due_date'], name='task_user_due_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['user', '-updated_at'], name='task_user_updated_idx'),
+        ),
+        # SQLite reconstruit la table pour ajouter la colonne, ce qui supprime
+        # les triggers de l'index plein texte : on les recrée
+        migrations.RunPython(
+            code=tasks.search.create_fts_index,
+            reverse_code=migrations.RunPython.noop,
+        ),
+    ]
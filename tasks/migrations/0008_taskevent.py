@@ -0,0 +1,61 @@
+# Generated by Django 5.2.4 on 2026-10-19 09:40
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+# Codes des statuts (TaskEvent.STATUS_CODES au moment de la migration)
+STATUS_CODES = {'todo': 0, 'doing': 1, 'done': 2}
+
+
+def seed_task_events(apps, schema_editor):
+    """Historique de départ des tâches existantes, reconstitué au mieux :
+    création à `created_at`, puis passage au statut actuel à `updated_at`"""
+    Task = apps.get_model('tasks', 'Task')
+    TaskEvent = apps.get_model('tasks', 'TaskEvent')
+
+    batch = []
+    rows = Task.objects.values_list('pk', 'user_id', 'status', 'created_at', 'updated_at')
+    for pk, user_id, status, created_at, updated_at in rows.iterator(chunk_size=2000):
+        batch.append(TaskEvent(task_id=pk, user_id=user_id, to_status=STATUS_CODES['todo'], at=created_at))
+        if status != 'todo':
+            batch.append(TaskEvent(
+                task_id=pk, user_id=user_id, from_status=STATUS_CODES['todo'],
+                to_status=STATUS_CODES[status], at=updated_at,
+            ))
+        if len(batch) >= 2000:
+            TaskEvent.objects.bulk_create(batch)
+            batch = []
+    TaskEvent.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0007_task_priority_rank'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('task_id', models.BigIntegerField(verbose_name='Tâche')),
+                ('from_status', models.PositiveSmallIntegerField(blank=True, choices=[(0, 'À faire'), (1, 'En cours'), (2, 'Terminé'), (3, 'Supprimée')], null=True, verbose_name='Ancien statut')),
+                ('to_status', models.PositiveSmallIntegerField(choices=[(0, 'À faire'), (1, 'En cours'), (2, 'Terminé'), (3, 'Supprimée')], verbose_name='Nouveau statut')),
+                ('at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Date')),
+                ('user', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='task_events', to=settings.AUTH_USER_MODEL, verbose_name='Propriétaire')),
+            ],
+            options={
+                'verbose_name': 'Changement de statut',
+                'verbose_name_plural': 'Changements de statut',
+                'indexes': [models.Index(fields=['user', 'at'], name='event_user_at_idx'), models.Index(fields=['task_id', 'at'], name='event_task_at_idx')],
+            },
+        ),
+        migrations.RunPython(
+            code=seed_task_events,
+            reverse_code=migrations.RunPython.noop,
+        ),
+    ]
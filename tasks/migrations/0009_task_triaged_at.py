@@ -0,0 +1,24 @@
+# Generated by Django 5.2.4 on 2026-10-19 09:41
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0008_taskevent'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='task',
+            name='triaged_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name="Triée par l'IA le"),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(condition=models.Q(('triaged_at__isnull', True)), fields=['id'], name='task_untriaged_idx'),
+        ),
+    ]
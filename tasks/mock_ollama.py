@@ -0,0 +1,319 @@
+"""
+Serveur Ollama factice pour les tests de charge et les tests sans modèle.
+
+Implémente le sous-ensemble de l'API d'Ollama utilisé par l'application :
+- `GET /api/tags` : modèles disponibles ;
+- `GET /api/ps` : modèles chargés en mémoire ;
+- `POST /api/chat` : réponse complète ou en flux NDJSON (`"stream": true`,
+  comportement par défaut de l'API) ;
+- `POST /api/generate` sans prompt : chargement du modèle seul ;
+- `POST /api/embeddings` : vecteur déterministe dérivé du texte.
+
+Un modèle qui n'est pas en mémoire coûte `load_time` secondes au premier
+appel (reporté dans `load_duration`) puis reste chargé pendant la durée
+`keep_alive` de la requête (5 minutes par défaut, comme Ollama).
+
+Le temps de réponse d'un chat est `latency` (traitement du prompt) plus la
+génération des tokens au rythme de `tokens_per_second`. Les pannes sont
+injectées avec une probabilité `error_rate` (réponse `error_status`) ou
+`drop_rate` (connexion fermée sans réponse), tirées d'un générateur
+initialisé par `seed` : deux exécutions avec les mêmes paramètres voient
+les mêmes pannes dans le même ordre.
+
+`responder(payload)` permet de fournir la réponse du modèle en fonction de
+la requête (ex. JSON attendu par un test).
+"""
+
+import hashlib
+import json
+import math
+import random
+import re
+import struct
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_MODELS = ['llama3.1:latest', 'nomic-embed-text:latest']
+DEFAULT_REPLY = "Analyse factice générée par le serveur Ollama de test."
+DEFAULT_KEEP_ALIVE = 300
+DURATION_PART = re.compile(r'(\d+(?:\.\d+)?)(ms|s|m|h)')
+UNITS = {'ms': 0.001, 's': 1, 'm': 60, 'h': 3600}
+
+
+def parse_keep_alive(value):
+    """Durée `keep_alive` en secondes (nombre ou "5m", "1h30m"...) ; None = pour toujours"""
+    if value is None or value == '':
+        return DEFAULT_KEEP_ALIVE
+    if isinstance(value, (int, float)):
+        seconds = float(value)
+    else:
+        value = value.strip()
+        try:
+            seconds = float(value)
+        except ValueError:
+            sign = -1 if value.startswith('-') else 1
+            seconds = sign * sum(float(n) * UNITS[unit] for n, unit in DURATION_PART.findall(value))
+    return None if seconds < 0 else seconds
+
+
+class MockOllamaHandler(BaseHTTPRequestHandler):
+    """Gestionnaire HTTP imitant les réponses d'Ollama"""
+
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        # Silencieux : les tests de charge génèrent beaucoup de requêtes
+        pass
+
+    def _send_json(self, payload, status=200):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_chunk(self, payload):
+        data = json.dumps(payload).encode('utf-8') + b'\n'
+        self.wfile.write(f"{len(data):x}\r\n".encode('ascii') + data + b'\r\n')
+        self.wfile.flush()
+
+    def _read_json(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        if not length:
+            return {}
+        return json.loads(self.rfile.read(length) or b'{}')
+
+    def _inject_failure(self):
+        """Applique la panne tirée pour cette requête ; True si la requête s'arrête là"""
+        failure = self.server.draw_failure()
+        if failure == 'error':
+            self._send_json({'error': 'panne injectée'}, status=self.server.error_status)
+            return True
+        if failure == 'drop':
+            self.close_connection = True
+            return True
+        return False
+
+    def do_GET(self):
+        if self.path == '/api/tags':
+            self._send_json({
+                'models': [{'name': name, 'model': name} for name in self.server.models]
+            })
+        elif self.path == '/api/ps':
+            self._send_json({
+                'models': [
+                    {'name': name, 'model': name, 'expires_at': expires_at}
+                    for name, expires_at in self.server.loaded_models()
+                ]
+            })
+        else:
+            self._send_json({'error': 'not found'}, status=404)
+
+    def do_POST(self):
+        routes = {
+            '/api/chat': self._chat,
+            '/api/generate': self._generate,
+            '/api/embeddings': self._embeddings,
+        }
+        route = routes.get(self.path)
+        if route is None:
+            self._send_json({'error': 'not found'}, status=404)
+            return
+        payload = self._read_json()
+        if self._inject_failure():
+            return
+        route(payload)
+
+    def _chat(self, payload):
+        model = payload.get('model', '')
+        if model not in self.server.models:
+            self._send_json({'error': f'model "{model}" not found, try pulling it first'}, status=404)
+            return
+
+        server = self.server
+        load_time = server.load(model, payload.get('keep_alive'))
+        tokens = server.reply_tokens(payload)
+        limit = (payload.get('options') or {}).get('num_predict')
+        if limit and limit > 0:
+            tokens = tokens[:limit]
+        metadata = {
+            'model': model,
+            'created_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+            'done': True,
+            'done_reason': 'stop',
+            # Métadonnées imitant celles d'Ollama (durées en nanosecondes)
+            'prompt_eval_count': len(json.dumps(payload.get('messages', []))) // 4,
+            'prompt_eval_duration': int(server.latency * 1e9),
+            'eval_count': len(tokens),
+            'eval_duration': int(server.generation_time(len(tokens)) * 1e9),
+            'load_duration': int(load_time * 1e9),
+        }
+        metadata['total_duration'] = (metadata['load_duration'] + metadata['prompt_eval_duration']
+                                      + metadata['eval_duration'])
+
+        time.sleep(server.latency)
+        if payload.get('stream', True):
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/x-ndjson')
+            self.send_header('Transfer-Encoding', 'chunked')
+            self.end_headers()
+            delay = server.generation_time(1)
+            for token in tokens:
+                if delay:
+                    time.sleep(delay)
+                self._send_chunk({
+                    'model': model,
+                    'created_at': metadata['created_at'],
+                    'message': {'role': 'assistant', 'content': token},
+                    'done': False,
+                })
+            self._send_chunk({**metadata, 'message': {'role': 'assistant', 'content': ''}})
+            self.wfile.write(b'0\r\n\r\n')
+            return
+
+        time.sleep(server.generation_time(len(tokens)))
+        self._send_json({
+            **metadata,
+            'message': {'role': 'assistant', 'content': ''.join(tokens)},
+        })
+
+    def _generate(self, payload):
+        """Chargement seul (requête sans prompt), utilisé pour garder un modèle en mémoire"""
+        model = payload.get('model', '')
+        if model not in self.server.models:
+            self._send_json({'error': f'model "{model}" not found, try pulling it first'}, status=404)
+            return
+        if payload.get('prompt'):
+            self._send_json({'error': 'génération non simulée : utiliser /api/chat'}, status=400)
+            return
+        load_time = self.server.load(model, payload.get('keep_alive'))
+        self._send_json({
+            'model': model,
+            'created_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+            'response': '',
+            'done': True,
+            'done_reason': 'load',
+            'load_duration': int(load_time * 1e9),
+            'total_duration': int(load_time * 1e9),
+        })
+
+    def _embeddings(self, payload):
+        time.sleep(self.server.embedding_latency)
+        self._send_json({'embedding': self.server.embed(payload.get('prompt', ''))})
+
+
+class MockOllamaServer(ThreadingHTTPServer):
+    """Serveur HTTP multi-thread : chaque requête simule un appel lent au LLM"""
+
+    daemon_threads = True
+    # Beaucoup de connexions simultanées pendant les tests de charge
+    request_queue_size = 1024
+
+    def __init__(self, address, latency=1.0, models=None, reply=None, responder=None,
+                 tokens_per_second=0.0, embedding_latency=0.0, embedding_dim=768,
+                 error_rate=0.0, error_status=500, drop_rate=0.0, seed=0, load_time=0.0):
+        super().__init__(address, MockOllamaHandler)
+        self.latency = latency
+        self.models = models or DEFAULT_MODELS
+        self.reply = reply or DEFAULT_REPLY
+        self.responder = responder
+        self.tokens_per_second = tokens_per_second
+        self.embedding_latency = embedding_latency
+        self.embedding_dim = embedding_dim
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.drop_rate = drop_rate
+        self.load_time = load_time
+        self._random = random.Random(seed)
+        self._random_lock = threading.Lock()
+        self._loaded = {}  # modèle -> fin du maintien en mémoire (monotonic, None = toujours)
+        self._loaded_lock = threading.Lock()
+        self._loading = {}  # modèle -> verrou de chargement
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def draw_failure(self):
+        """'error', 'drop' ou None, selon les probabilités configurées"""
+        if not (self.error_rate or self.drop_rate):
+            return None
+        with self._random_lock:
+            draw = self._random.random()
+        if draw < self.error_rate:
+            return 'error'
+        if draw < self.error_rate + self.drop_rate:
+            return 'drop'
+        return None
+
+    def _is_loaded(self, model, now):
+        if model not in self._loaded:
+            return False
+        expires_at = self._loaded[model]
+        return expires_at is None or expires_at > now
+
+    def load(self, model, keep_alive=None):
+        """Charge `model` s'il n'est pas en mémoire ; renvoie la durée de chargement.
+
+        Les requêtes simultanées sur un modèle froid attendent le même chargement.
+        """
+        with self._loaded_lock:
+            loading = self._loading.setdefault(model, threading.Lock())
+        with loading:
+            with self._loaded_lock:
+                load_time = 0.0 if self._is_loaded(model, time.monotonic()) else self.load_time
+            if load_time:
+                time.sleep(load_time)
+            seconds = parse_keep_alive(keep_alive)
+            with self._loaded_lock:
+                if seconds == 0:
+                    self._loaded.pop(model, None)
+                else:
+                    self._loaded[model] = None if seconds is None else time.monotonic() + seconds
+        return load_time
+
+    def loaded_models(self):
+        """[(modèle, fin du maintien en mémoire au format ISO 8601)] des modèles chargés"""
+        with self._loaded_lock:
+            now = time.monotonic()
+            loaded = [(m, e) for m, e in self._loaded.items() if self._is_loaded(m, now)]
+        result = []
+        for model, expires_at in loaded:
+            if expires_at is None:
+                expires = '2318-08-25T00:00:00Z'  # « pour toujours », comme Ollama
+            else:
+                expires = time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(time.time() + expires_at - now))
+            result.append((model, expires))
+        return result
+
+    def reply_tokens(self, payload):
+        """Réponse découpée en tokens (un mot et son espace par token)"""
+        reply = self.responder(payload) if self.responder else self.reply
+        words = reply.split(' ')
+        return [word + ' ' for word in words[:-1]] + words[-1:]
+
+    def generation_time(self, tokens):
+        return tokens / self.tokens_per_second if self.tokens_per_second else 0.0
+
+    def embed(self, text):
+        """Vecteur unitaire déterministe : même texte, même vecteur"""
+        values = []
+        counter = 0
+        while len(values) < self.embedding_dim:
+            digest = hashlib.sha256(f"{counter}:{text}".encode('utf-8')).digest()
+            values.extend(v / 2**31 for v in struct.unpack('<8i', digest))
+            counter += 1
+        values = values[:self.embedding_dim]
+        norm = math.sqrt(sum(v * v for v in values)) or 1.0
+        return [v / norm for v in values]
+
+
+def start_mock_server(host='127.0.0.1', port=0, **kwargs):
+    """Démarre le serveur factice dans un thread et le retourne (port 0 = port libre)"""
+    server = MockOllamaServer((host, port), **kwargs)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
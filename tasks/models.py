@@ -1,12 +1,125 @@
-from django.db import models
+import contextvars
+from contextlib import contextmanager
+
+from django.db import models, transaction
+from django.db.models import Case, ExpressionWrapper, F, Q, Value, When
+from django.db.models.lookups import Exact
 from django.utils import timezone
 from django.contrib.auth.models import User
 
+# Rang numérique de chaque priorité (colonne `priority_rank`, triable par index)
+PRIORITY_RANKS = {'low': 0, 'medium': 1, 'high': 2, 'urgent': 3}
+
+def priority_rank_expression(priority):
+    """Rang calculé en SQL à partir d'une expression de priorité (F(), Case...)"""
+    return Case(
+        *[When(Exact(priority, Value(key)), then=Value(rank)) for key, rank in PRIORITY_RANKS.items()],
+        default=Value(PRIORITY_RANKS['medium']),
+        output_field=models.PositiveSmallIntegerField(),
+    )
+
+def due_date_missing():
+    """Vrai pour une tâche sans échéance : triée après les tâches datées
+    (SQLite place sinon les NULL en tête d'un tri croissant)"""
+    return ExpressionWrapper(Q(due_date__isnull=True), output_field=models.BooleanField())
+
+class TaskQuerySet(models.QuerySet):
+    """Requêtes sur les tâches, toujours restreintes à un propriétaire côté interface.
+    
+    Les écritures de masse (`update`, `bulk_create`, `bulk_update`) tiennent
+    à jour `priority_rank` et `updated_at` (sauf valeur fournie) et
+    journalisent les changements de statut (`TaskEvent`) comme le fait
+    `Task.save()` ; `delete` journalise la suppression comme `Task.delete()`.
+    """
+    
+    def for_user(self, user):
+        """Tâches appartenant à l'utilisateur (servi par les index commençant par user_id)"""
+        return self.filter(user=user)
+    
+    def update(self, **kwargs):
+        # auto_now n'est appliqué que par save() : l'ETag du flux iCalendar
+        # et l'archivage reposent sur `updated_at`
+        kwargs.setdefault('updated_at', timezone.now())
+        if 'priority' in kwargs and 'priority_rank' not in kwargs:
+            priority = kwargs['priority']
+            if isinstance(priority, str):
+                kwargs['priority_rank'] = PRIORITY_RANKS.get(priority, PRIORITY_RANKS['medium'])
+            else:
+                # Évalué dans le même UPDATE, sur la même expression que la priorité
+                kwargs['priority_rank'] = priority_rank_expression(priority)
+        if 'status' not in kwargs:
+            return super().update(**kwargs)
+        
+        # Statuts avant et après, relus dans la même transaction que l'UPDATE
+        with transaction.atomic(using=self.db, savepoint=False):
+            before = list(self.values_list('pk', 'user_id', 'status'))
+            updated = super().update(**kwargs)
+            status = kwargs['status']
+            if isinstance(status, str):
+                after = dict.fromkeys((pk for pk, _, _ in before), status)
+            else:
+                after = dict(
+                    self.model.objects.filter(pk__in=[pk for pk, _, _ in before]).values_list('pk', 'status')
+                )
+            log_task_events(
+                TaskEvent.transition(pk, user_id, old, after[pk])
+                for pk, user_id, old in before if after.get(pk, old) != old
+            )
+        return updated
+    
+    update.alters_data = True
+    
+    def bulk_create(self, objs, *args, record_events=True, **kwargs):
+        """`record_events=False` : pas d'événement de création (ex. restauration d'archive)"""
+        objs = list(objs)
+        for obj in objs:
+            obj.sync_priority_rank()
+        with transaction.atomic(using=self.db, savepoint=False):
+            created = super().bulk_create(objs, *args, **kwargs)
+            if record_events:
+                # Clés renvoyées par la base (absentes avec ignore_conflicts)
+                log_task_events(
+                    TaskEvent.transition(obj.pk, obj.user_id, None, obj.status)
+                    for obj in created if obj.pk is not None
+                )
+        return created
+    
+    def delete(self, record_events=True):
+        """`record_events=False` : pas d'événement de suppression (ex. archivage)"""
+        if not record_events:
+            return super().delete()
+        with transaction.atomic(using=self.db, savepoint=False):
+            before = list(self.values_list('pk', 'user_id', 'status'))
+            deleted = super().delete()
+            log_task_events(
+                TaskEvent.transition(pk, user_id, old, 'deleted') for pk, user_id, old in before
+            )
+        return deleted
+    
+    delete.alters_data = True
+    delete.queryset_only = True
+    
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        objs = list(objs)
+        if 'priority' in fields and 'priority_rank' not in fields:
+            fields = [*fields, 'priority_rank']
+            for obj in objs:
+                obj.sync_priority_rank()
+        if 'updated_at' not in fields:
+            fields = [*fields, 'updated_at']
+            now = timezone.now()
+            for obj in objs:
+                obj.updated_at = now
+        return super().bulk_update(objs, fields, *args, **kwargs)
+
+
 class Task(models.Model):
     """
     Modèle représentant une tâche dans notre application.
     """
     
+    objects = TaskQuerySet.as_manager()
+    
     # Choix pour le statut de la tâche
     STATUS_CHOICES = [
         ('todo', 'À faire'),
@@ -50,6 +163,14 @@ class Task(models.Model):
         verbose_name="Priorité"
     )
     
+    # Copie numérique de `priority` (voir PRIORITY_RANKS) : le tri par urgence
+    # parcourt un index au lieu d'évaluer un CASE sur chaque ligne
+    priority_rank = models.PositiveSmallIntegerField(
+        default=PRIORITY_RANKS['medium'],
+        editable=False,
+        verbose_name="Rang de priorité"
+    )
+    
     due_date = models.DateTimeField(
         blank=True,
         null=True,
@@ -66,18 +187,94 @@ class Task(models.Model):
         verbose_name="Dernière modification"
     )
     
-    # Optionnel : associer les tâches à un utilisateur
-    # user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True)
+    # Dernier tri automatique par l'IA (priorité et échéance suggérées) ;
+    # vide tant que la tâche n'a pas été triée (voir tasks/triage.py)
+    triaged_at = models.DateTimeField(
+        blank=True,
+        null=True,
+        editable=False,
+        verbose_name="Triée par l'IA le"
+    )
+    
+    # Propriétaire de la tâche : toutes les requêtes de l'interface sont filtrées dessus
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='tasks',
+        verbose_name="Propriétaire"
+    )
     
     class Meta:
         verbose_name = "Tâche"
         verbose_name_plural = "Tâches"
         ordering = ['-created_at']  # Tri par date de création décroissante
+        indexes = [
+            # Requêtes par utilisateur : liste, filtres, statistiques et retards
+            models.Index(fields=['user', '-created_at'], name='task_user_created_idx'),
+            models.Index(fields=['user', 'status', 'due_date'], name='task_user_status_due_idx'),
+            models.Index(fields=['user', 'priority', '-created_at'], name='task_user_priority_idx'),
+            # Tris proposés dans la liste : urgence puis échéance, échéance, modification
+            models.Index(
+                F('user'), F('priority_rank').desc(), due_date_missing(), F('due_date'),
+                name='task_user_rank_due_idx',
+            ),
+            models.Index(fields=['user', 'due_date'], name='task_user_due_idx'),
+            models.Index(fields=['user', '-updated_at'], name='task_user_updated_idx'),
+            # File du tri automatique : tâches pas encore triées, par clé
+            models.Index(fields=['id'], condition=Q(triaged_at__isnull=True), name='task_untriaged_idx'),
+            # Filtres globaux de l'admin (statut, priorité, dates)
+            models.Index(fields=['status', 'due_date'], name='task_status_due_idx'),
+            models.Index(fields=['priority'], name='task_priority_idx'),
+            models.Index(fields=['-created_at'], name='task_created_idx'),
+            models.Index(fields=['due_date'], name='task_due_idx'),
+        ]
     
     def __str__(self):
         """Représentation textuelle de la tâche"""
         return f"{self.title} ({self.get_status_display()})"
     
+    def sync_priority_rank(self):
+        """Aligne `priority_rank` sur `priority`"""
+        self.priority_rank = PRIORITY_RANKS.get(self.priority, PRIORITY_RANKS['medium'])
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Statut lu en base : sert à détecter les transitions à l'enregistrement
+        instance._loaded_status = instance.__dict__.get('status')
+        return instance
+    
+    def save(self, *args, **kwargs):
+        self.sync_priority_rank()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'priority' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'priority_rank'}
+        
+        adding = self._state.adding
+        previous = getattr(self, '_loaded_status', None)
+        changed = (
+            adding or (previous is not None and previous != self.status
+                       and (update_fields is None or 'status' in update_fields))
+        )
+        if not changed:
+            super().save(*args, **kwargs)
+            return
+        
+        with transaction.atomic(using=kwargs.get('using'), savepoint=False):
+            super().save(*args, **kwargs)
+            log_task_events([TaskEvent.transition(
+                self.pk, self.user_id, None if adding else previous, self.status
+            )])
+        self._loaded_status = self.status
+    
+    def delete(self, *args, **kwargs):
+        # Événement terminal : une tâche supprimée « En cours » sort du WIP
+        pk, status = self.pk, getattr(self, '_loaded_status', None) or self.status
+        with transaction.atomic(using=kwargs.get('using'), savepoint=False):
+            deleted = super().delete(*args, **kwargs)
+            log_task_events([TaskEvent.transition(pk, self.user_id, status, 'deleted')])
+        return deleted
+    
     def is_overdue(self):
         """Vérifie si la tâche est en retard"""
         if self.due_date and self.status != 'done':
@@ -93,3 +290,337 @@ class Task(models.Model):
             'urgent': 'priority-urgent'
         }
         return priority_classes.get(self.priority, 'priority-medium')
+
+
+class BulkOperation(models.Model):
+    """
+    Opération de masse sur les tâches (actions de l'admin), exécutée par
+    lots de clés primaires dans des transactions courtes et reprenable
+    après interruption grâce au curseur `last_pk`.
+    """
+    
+    STATUS_CHOICES = [
+        ('pending', 'En attente'),
+        ('running', 'En cours'),
+        ('done', 'Terminée'),
+        ('failed', 'Échouée'),
+    ]
+    
+    action = models.CharField(
+        max_length=100,
+        verbose_name="Action"
+    )
+    
+    values = models.JSONField(
+        verbose_name="Valeurs appliquées"
+    )
+    
+    # Clés primaires sélectionnées, figées à la création de l'opération et
+    # stockées en plages contiguës [début, fin] (voir tasks/bulk.py)
+    selection = models.JSONField(
+        default=list,
+        verbose_name="Sélection"
+    )
+    
+    status = models.CharField(
+        max_length=10,
+        choices=STATUS_CHOICES,
+        default='pending',
+        verbose_name="Statut"
+    )
+    
+    last_pk = models.BigIntegerField(
+        default=0,
+        verbose_name="Dernière clé traitée"
+    )
+    
+    processed = models.PositiveIntegerField(
+        default=0,
+        verbose_name="Tâches traitées"
+    )
+    
+    total = models.PositiveIntegerField(
+        default=0,
+        verbose_name="Total estimé"
+    )
+    
+    error = models.TextField(
+        blank=True,
+        verbose_name="Erreur"
+    )
+    
+    # Jeton de l'exécutant qui détient l'opération ; `updated_at`, avancé à
+    # chaque lot, sert de bail : une opération « En cours » sans progression
+    # depuis BULK_LEASE_SECONDS peut être reprise par un autre exécutant
+    worker = models.CharField(
+        max_length=32,
+        blank=True,
+        verbose_name="Exécutant"
+    )
+    
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name="Date de création"
+    )
+    
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name="Dernière progression"
+    )
+    
+    class Meta:
+        verbose_name = "Opération de masse"
+        verbose_name_plural = "Opérations de masse"
+        ordering = ['-created_at']
+    
+    def __str__(self):
+        return f"{self.action} ({self.get_status_display()}, {self.progress} %)"
+    
+    @property
+    def progress(self):
+        """Avancement en pourcentage"""
+        if self.status == 'done':
+            return 100
+        if not self.total:
+            return 0
+        return min(100, int(self.processed * 100 / self.total))
+
+
+class TaskEmbedding(models.Model):
+    """
+    Vecteur sémantique (titre + description) d'une tâche, stocké en float32
+    brut. Sert à reconstruire la matrice mémoire de l'index sémantique.
+    """
+    
+    task = models.OneToOneField(
+        Task,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='embedding',
+        verbose_name="Tâche"
+    )
+    
+    model = models.CharField(
+        max_length=100,
+        verbose_name="Modèle d'embedding"
+    )
+    
+    # Empreinte du texte indexé : évite de recalculer un vecteur inchangé
+    content_hash = models.CharField(
+        max_length=40,
+        verbose_name="Empreinte du contenu"
+    )
+    
+    vector = models.BinaryField(
+        verbose_name="Vecteur (float32)"
+    )
+    
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        db_index=True,
+        verbose_name="Dernière mise à jour"
+    )
+    
+    class Meta:
+        verbose_name = "Embedding de tâche"
+        verbose_name_plural = "Embeddings de tâches"
+    
+    def __str__(self):
+        return f"Embedding de la tâche #{self.task_id} ({self.model})"
+
+
+class ArchivedTask(models.Model):
+    """
+    Tâche terminée déplacée hors de la table active (`manage.py archive_tasks`).
+    
+    Table compacte : pas de statut (toujours « Terminé »), pas de vecteur
+    sémantique, un seul index. La clé primaire est celle de la tâche
+    d'origine, jamais réattribuée : la restauration la conserve.
+    """
+    
+    id = models.BigIntegerField(
+        primary_key=True,
+        verbose_name="Identifiant d'origine"
+    )
+    
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='archived_tasks',
+        verbose_name="Propriétaire"
+    )
+    
+    title = models.CharField(
+        max_length=200,
+        verbose_name="Titre de la tâche"
+    )
+    
+    description = models.TextField(
+        blank=True,
+        null=True,
+        verbose_name="Description détaillée"
+    )
+    
+    priority = models.CharField(
+        max_length=10,
+        choices=Task.PRIORITY_CHOICES,
+        default='medium',
+        verbose_name="Priorité"
+    )
+    
+    due_date = models.DateTimeField(
+        blank=True,
+        null=True,
+        verbose_name="Date d'échéance"
+    )
+    
+    # Dates d'origine, recopiées telles quelles (ni auto_now ni auto_now_add)
+    created_at = models.DateTimeField(
+        verbose_name="Date de création"
+    )
+    
+    updated_at = models.DateTimeField(
+        verbose_name="Dernière modification"
+    )
+    
+    # Date du dernier tri par l'IA : une tâche restaurée n'est pas retriée
+    triaged_at = models.DateTimeField(
+        blank=True,
+        null=True,
+        editable=False,
+        verbose_name="Triée par l'IA le"
+    )
+    
+    archived_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name="Date d'archivage"
+    )
+    
+    # Compatibilité d'affichage avec Task dans la liste
+    status = 'done'
+    archived = True
+    
+    class Meta:
+        verbose_name = "Tâche archivée"
+        verbose_name_plural = "Tâches archivées"
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', '-created_at'], name='archived_user_created_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.title} (archivée)"
+    
+    def get_status_display(self):
+        return dict(Task.STATUS_CHOICES)['done']
+    
+    def is_overdue(self):
+        return False
+    
+    def get_priority_class(self):
+        return Task.get_priority_class(self)
+
+
+class TaskEvent(models.Model):
+    """
+    Journal des changements de statut, en ajout seul : une ligne par
+    transition (création et suppression comprises), écrite par `Task.save()`,
+    `Task.delete()` et par les écritures de masse du `TaskQuerySet`.
+    
+    Lignes compactes (statuts codés sur un petit entier) et sans clé
+    étrangère vers la tâche : l'historique survit à l'archivage et à la
+    suppression des tâches. Exploité par `tasks/analytics.py`.
+    """
+    
+    # Codes des statuts, dans l'ordre de Task.STATUS_CHOICES, puis l'état
+    # terminal « supprimée » (jamais un statut de départ)
+    STATUS_CODES = {status: code for code, (status, _) in enumerate(Task.STATUS_CHOICES)}
+    STATUS_CODES['deleted'] = len(Task.STATUS_CHOICES)
+    CODE_CHOICES = [(code, label) for code, (_, label) in enumerate(Task.STATUS_CHOICES)] + [
+        (STATUS_CODES['deleted'], "Supprimée"),
+    ]
+    
+    task_id = models.BigIntegerField(
+        verbose_name="Tâche"
+    )
+    
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='task_events',
+        db_index=False,  # couvert par l'index (user, at)
+        verbose_name="Propriétaire"
+    )
+    
+    # Statut de départ : vide pour la création de la tâche
+    from_status = models.PositiveSmallIntegerField(
+        choices=CODE_CHOICES,
+        null=True,
+        blank=True,
+        verbose_name="Ancien statut"
+    )
+    
+    to_status = models.PositiveSmallIntegerField(
+        choices=CODE_CHOICES,
+        verbose_name="Nouveau statut"
+    )
+    
+    at = models.DateTimeField(
+        default=timezone.now,
+        verbose_name="Date"
+    )
+    
+    class Meta:
+        verbose_name = "Changement de statut"
+        verbose_name_plural = "Changements de statut"
+        indexes = [
+            # Analyses par utilisateur et période ; historique d'une tâche
+            models.Index(fields=['user', 'at'], name='event_user_at_idx'),
+            models.Index(fields=['task_id', 'at'], name='event_task_at_idx'),
+        ]
+    
+    def __str__(self):
+        return f"Tâche #{self.task_id} : {self.get_from_status_display() or 'création'} → {self.get_to_status_display()}"
+    
+    @classmethod
+    def transition(cls, task_id, user_id, old, new, at=None):
+        """Événement (non enregistré) pour le passage de `old` à `new` (None = création)"""
+        return cls(
+            task_id=task_id,
+            user_id=user_id,
+            from_status=None if old is None else cls.STATUS_CODES[old],
+            to_status=cls.STATUS_CODES[new],
+            at=at or timezone.now(),
+        )
+
+
+# Événements en attente dans un bloc `batch_task_events()` (None hors d'un bloc)
+_pending_events = contextvars.ContextVar('pending_task_events', default=None)
+
+def log_task_events(events):
+    """Enregistre des événements en un seul INSERT, ou les met en attente
+    dans le bloc `batch_task_events()` en cours"""
+    events = list(events)
+    if not events:
+        return
+    pending = _pending_events.get()
+    if pending is not None:
+        pending.extend(events)
+    else:
+        TaskEvent.objects.bulk_create(events)
+
+@contextmanager
+def batch_task_events():
+    """Regroupe les événements écrits dans le bloc en un seul INSERT à sa sortie
+    (à ouvrir dans la transaction des écritures : rien n'est écrit en cas d'erreur)"""
+    if _pending_events.get() is not None:
+        yield
+        return
+    pending = []
+    token = _pending_events.set(pending)
+    try:
+        yield
+    finally:
+        _pending_events.reset(token)
+    if pending:
+        TaskEvent.objects.bulk_create(pending)
@@ -0,0 +1,91 @@
+"""
+Recherche plein texte des tâches via un index SQLite FTS5.
+
+La table virtuelle `tasks_task_fts` (contenu externe sur `tasks_task`) est
+créée et maintenue par des triggers dans la migration 0002. Sur les autres
+bases de données, `fts_available()` retourne False et l'appelant se rabat
+sur la recherche LIKE classique.
+"""
+
+import re
+
+from django.db.models.expressions import RawSQL
+
+FTS_TABLE = 'tasks_task_fts'
+
+CREATE_FTS_SQL = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        title, description,
+        content='tasks_task', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS tasks_task_fts_ai AFTER INSERT ON tasks_task BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS tasks_task_fts_ad AFTER DELETE ON tasks_task BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS tasks_task_fts_au AFTER UPDATE OF title, description ON tasks_task BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+        INSERT INTO {FTS_TABLE}(rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END
+    """,
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+]
+
+DROP_FTS_SQL = [
+    "DROP TRIGGER IF EXISTS tasks_task_fts_ai",
+    "DROP TRIGGER IF EXISTS tasks_task_fts_ad",
+    "DROP TRIGGER IF EXISTS tasks_task_fts_au",
+    f"DROP TABLE IF EXISTS {FTS_TABLE}",
+]
+
+
+def create_fts_index(apps, schema_editor):
+    """Opération de migration : crée l'index FTS5 (SQLite uniquement)"""
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for sql in CREATE_FTS_SQL:
+        schema_editor.execute(sql)
+
+
+def drop_fts_index(apps, schema_editor):
+    """Opération de migration inverse"""
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for sql in DROP_FTS_SQL:
+        schema_editor.execute(sql)
+
+
+def fts_available(connection):
+    """Indique si l'index plein texte est utilisable sur cette connexion"""
+    if connection.vendor != 'sqlite':
+        return False
+    return FTS_TABLE in connection.introspection.table_names()
+
+
+def fts_match_query(search):
+    """Transforme une saisie libre en requête FTS5 sûre (préfixes, ET implicite)"""
+    terms = re.findall(r'\w+', search)
+    return ' '.join('"{}"*'.format(term.replace('"', '""')) for term in terms)
+
+
+def fts_filter(queryset, search):
+    """Restreint un queryset de tâches aux résultats de l'index plein texte"""
+    match = fts_match_query(search)
+    if not match:
+        return queryset
+    return queryset.filter(pk__in=RawSQL(
+        f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", [match]
+    ))
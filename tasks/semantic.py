@@ -0,0 +1,378 @@
+"""
+Index sémantique des tâches : recherche par similarité et détection de doublons.
+
+Les vecteurs (titre + description) sont calculés par l'endpoint
+`/api/embeddings` d'Ollama, ou par un embedder déterministe à base de
+hachage (`SEMANTIC_EMBEDDER = 'hash'`) pour les tests et le mode hors ligne.
+
+Chaque vecteur est normalisé puis stocké en float32 brut dans
+`TaskEmbedding`. `manage.py build_semantic_index` compacte l'ensemble dans
+une matrice projetée en mémoire (np.memmap) ; une requête est alors un
+simple produit matrice-vecteur (similarité cosinus) suivi d'un
+`argpartition`. Les vecteurs modifiés depuis la dernière construction sont
+lus en base et fusionnés au résultat, l'index reste donc exact entre deux
+reconstructions. Le propriétaire de chaque vecteur est conservé à côté des
+ids (`owners.npy`) : une recherche ne porte que sur les tâches d'un
+utilisateur.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+import unicodedata
+
+import numpy as np
+import requests
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import metrics
+from .limiter import embedding_limiter
+from .models import Task, TaskEmbedding
+
+logger = logging.getLogger(__name__)
+
+
+def task_text(title, description=None):
+    """Texte indexé pour une tâche"""
+    return f"{title or ''}\n{description or ''}".strip()
+
+
+def content_hash(text):
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+def _normalize(vector):
+    vector = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+class HashEmbedder:
+    """Embedder déterministe (hachage de mots et de bigrammes), sans dépendance réseau"""
+
+    def __init__(self, dim=256):
+        self.dim = dim
+        self.name = f"hash-{dim}"
+
+    def _features(self, text):
+        text = unicodedata.normalize('NFKD', text.lower())
+        text = ''.join(c for c in text if not unicodedata.combining(c))
+        words = re.findall(r'\w+', text)
+        return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+    def embed(self, text):
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for feature in self._features(text):
+            digest = hashlib.blake2b(feature.encode('utf-8'), digest_size=8).digest()
+            value = int.from_bytes(digest, 'little')
+            vector[value % self.dim] += 1.0 if value & (1 << 63) else -1.0
+        return _normalize(vector)
+
+
+class OllamaEmbedder:
+    """Embeddings calculés localement par Ollama"""
+
+    def __init__(self, model):
+        self.model = model
+        self.name = f"ollama-{model}"
+
+    def embed(self, text):
+        # Limiteur propre aux embeddings (attente courte) ; voie du contexte
+        # courant : interactive par défaut, batch pour l'indexation
+        with embedding_limiter.slot():
+            response = requests.post(
+                f"{settings.OLLAMA_URL}/api/embeddings",
+                json={'model': self.model, 'prompt': text},
+                timeout=5,
+            )
+        response.raise_for_status()
+        return _normalize(response.json()['embedding'])
+
+
+def get_embedder():
+    """Embedder configuré par `SEMANTIC_EMBEDDER` ('ollama' ou 'hash')"""
+    if settings.SEMANTIC_EMBEDDER == 'hash':
+        return HashEmbedder()
+    return OllamaEmbedder(settings.OLLAMA_EMBED_MODEL)
+
+
+def embed_text(text):
+    """Retourne (nom du modèle, vecteur normalisé)"""
+    embedder = get_embedder()
+    return embedder.name, embedder.embed(text)
+
+
+def index_task(task, vector=None):
+    """Calcule (si le texte a changé) et enregistre le vecteur d'une tâche"""
+    text = task_text(task.title, task.description)
+    digest = content_hash(text)
+    embedder = get_embedder()
+    if TaskEmbedding.objects.filter(task_id=task.pk, model=embedder.name, content_hash=digest).exists():
+        metrics.cache_hit('task_embedding')
+        return
+    metrics.cache_miss('task_embedding')
+    if vector is None:
+        vector = embedder.embed(text)
+    TaskEmbedding.objects.update_or_create(
+        task_id=task.pk,
+        defaults={
+            'model': embedder.name,
+            'content_hash': digest,
+            'vector': np.asarray(vector, dtype=np.float32).tobytes(),
+        },
+    )
+
+
+class SemanticIndex:
+    """Matrice des vecteurs projetée en mémoire, partagée entre les requêtes du processus"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._build_lock = threading.Lock()
+        self._loaded_stamp = None
+        self._delta_checked_at = float('-inf')
+        self.meta = None
+        self.ids = np.empty(0, dtype=np.int64)
+        self.owners = np.empty(0, dtype=np.int64)
+        # Lignes de la matrice de chaque propriétaire : une recherche ne
+        # calcule la similarité que sur les vecteurs de l'utilisateur
+        self.rows_by_owner = {}
+        self.matrix = None
+
+    @property
+    def meta_path(self):
+        return os.path.join(self.directory, 'meta.json')
+
+    def _load(self):
+        """(Re)charge la matrice si elle a été reconstruite depuis le dernier accès"""
+        try:
+            stamp = os.stat(self.meta_path).st_mtime_ns
+        except FileNotFoundError:
+            return
+        if stamp == self._loaded_stamp:
+            return
+        with self._lock:
+            with open(self.meta_path, encoding='utf-8') as f:
+                meta = json.load(f)
+            count, dim = meta['count'], meta['dim']
+            self.ids = np.load(os.path.join(self.directory, 'ids.npy'))
+            try:
+                self.owners = np.load(os.path.join(self.directory, 'owners.npy'))
+            except FileNotFoundError:
+                # Index construit avant l'attribution des tâches : propriétaire inconnu
+                self.owners = np.full(len(self.ids), -1, dtype=np.int64)
+            order = np.argsort(self.owners, kind='stable')
+            owners, starts = np.unique(self.owners[order], return_index=True)
+            self.rows_by_owner = dict(zip(owners.tolist(), np.split(order, starts[1:])))
+            self.matrix = np.memmap(
+                os.path.join(self.directory, 'vectors.f32'),
+                dtype=np.float32, mode='r', shape=(count, dim),
+            ) if count else None
+            self.meta = meta
+            self._loaded_stamp = stamp
+
+    def build(self, chunk_size=5000):
+        """Reconstruit la matrice depuis la base, par blocs, puis la publie atomiquement"""
+        os.makedirs(self.directory, exist_ok=True)
+        model = get_embedder().name
+        built_at = timezone.now()
+        rows = TaskEmbedding.objects.filter(model=model).order_by('task_id')
+        count = rows.count()
+
+        first = rows.values_list('vector', flat=True).first()
+        dim = len(bytes(first)) // 4 if first is not None else 0
+
+        tmp_vectors = os.path.join(self.directory, 'vectors.f32.tmp')
+        ids = np.empty(count, dtype=np.int64)
+        owners = np.empty(count, dtype=np.int64)
+        if count:
+            matrix = np.memmap(tmp_vectors, dtype=np.float32, mode='w+', shape=(count, dim))
+            position = 0
+            iterator = rows.values_list('task_id', 'task__user_id', 'vector').iterator(chunk_size=chunk_size)
+            for task_id, owner_id, blob in iterator:
+                if position >= count:
+                    break
+                ids[position] = task_id
+                owners[position] = owner_id
+                matrix[position] = np.frombuffer(blob, dtype=np.float32)
+                position += 1
+            matrix.flush()
+            del matrix
+            ids = ids[:position]
+            owners = owners[:position]
+            count = position
+            os.replace(tmp_vectors, os.path.join(self.directory, 'vectors.f32'))
+
+        tmp_ids = os.path.join(self.directory, 'ids.npy.tmp')
+        with open(tmp_ids, 'wb') as f:
+            np.save(f, ids)
+        os.replace(tmp_ids, os.path.join(self.directory, 'ids.npy'))
+        tmp_owners = os.path.join(self.directory, 'owners.npy.tmp')
+        with open(tmp_owners, 'wb') as f:
+            np.save(f, owners)
+        os.replace(tmp_owners, os.path.join(self.directory, 'owners.npy'))
+        tmp_meta = self.meta_path + '.tmp'
+        with open(tmp_meta, 'w', encoding='utf-8') as f:
+            json.dump({
+                'model': model,
+                'dim': dim,
+                'count': count,
+                'built_at': built_at.isoformat(),
+            }, f)
+        os.replace(tmp_meta, self.meta_path)
+        return count
+
+    def build_in_background(self):
+        """Reconstruit la matrice dans un thread (une seule reconstruction à la fois)"""
+        if not self._build_lock.acquire(blocking=False):
+            return
+
+        def run():
+            try:
+                self.build()
+            except Exception as e:
+                logger.error(f"Reconstruction de l'index sémantique impossible : {e}")
+            finally:
+                self._build_lock.release()
+                connection.close()
+
+        threading.Thread(target=run, name='semantic-index-build', daemon=True).start()
+
+    def _check_delta(self, model):
+        """Reconstruit si le delta, tous utilisateurs confondus, dépasse le seuil.
+
+        Les recherches portent sur un utilisateur : leur delta reste petit
+        alors que celui de l'ensemble grossit. Compté au plus une fois toutes
+        les SEMANTIC_REBUILD_CHECK_INTERVAL secondes.
+        """
+        now = time.monotonic()
+        if now - self._delta_checked_at < settings.SEMANTIC_REBUILD_CHECK_INTERVAL:
+            return
+        self._delta_checked_at = now
+        delta = TaskEmbedding.objects.filter(model=model)
+        if self.meta and self.meta['model'] == model:
+            delta = delta.filter(updated_at__gte=parse_datetime(self.meta['built_at']))
+        if delta.count() > settings.SEMANTIC_REBUILD_THRESHOLD:
+            self.build_in_background()
+
+    def _rows(self, user_id, candidates):
+        """Lignes de la matrice à évaluer, croissantes (None : toutes)"""
+        rows = None
+        if user_id is not None:
+            rows = self.rows_by_owner.get(user_id, np.empty(0, dtype=np.int64))
+        if candidates is not None:
+            # Ids croissants (construction par task_id) : recherche dichotomique
+            wanted = np.unique(np.fromiter(candidates, dtype=np.int64))
+            positions = np.searchsorted(self.ids, wanted)
+            found = positions < len(self.ids)
+            positions = positions[found]
+            positions = positions[self.ids[positions] == wanted[found]]
+            rows = positions if rows is None else np.intersect1d(rows, positions, assume_unique=True)
+        return rows
+
+    def search(self, vector, k=10, exclude=(), candidates=None, user_id=None):
+        """Retourne [(task_id, score)] par similarité cosinus décroissante.
+
+        `candidates` restreint (optionnellement) la recherche à un ensemble
+        d'ids, `user_id` aux tâches d'un utilisateur.
+        """
+        self._load()
+        query = _normalize(vector)
+        model = get_embedder().name
+        exclude = set(exclude)
+        scores, ids = [], []
+
+        # Vecteurs modifiés depuis la construction de la matrice (delta en base)
+        delta = TaskEmbedding.objects.filter(model=model)
+        if self.meta and self.meta['model'] == model:
+            delta = delta.filter(updated_at__gte=parse_datetime(self.meta['built_at']))
+        if candidates is not None:
+            delta = delta.filter(task_id__in=candidates)
+        if user_id is not None:
+            delta = delta.filter(task__user_id=user_id)
+        delta_rows = list(delta.values_list('task_id', 'vector'))
+        if len(delta_rows) > settings.SEMANTIC_REBUILD_THRESHOLD:
+            self.build_in_background()
+        else:
+            self._check_delta(model)
+        # Tous les ids du delta masquent la matrice ; seuls les non exclus sont évalués
+        delta_ids = np.array([task_id for task_id, _ in delta_rows], dtype=np.int64)
+        excluded = np.fromiter(exclude, dtype=np.int64)
+        scored = [(task_id, blob) for task_id, blob in delta_rows if task_id not in exclude]
+        if scored:
+            delta_matrix = np.vstack([np.frombuffer(blob, dtype=np.float32) for _, blob in scored])
+            if delta_matrix.shape[1] == query.shape[0]:
+                ids.append(np.array([task_id for task_id, _ in scored], dtype=np.int64))
+                scores.append(delta_matrix @ query)
+
+        # Matrice principale : lignes du propriétaire (et des candidats)
+        # sélectionnées d'abord, puis un seul produit matrice-vecteur
+        if (self.matrix is not None and self.meta['model'] == model
+                and self.matrix.shape[1] == query.shape[0]):
+            rows = self._rows(user_id, candidates)
+            row_ids = self.ids if rows is None else self.ids[rows]
+            keep = ~np.isin(row_ids, np.concatenate([delta_ids, excluded]))
+            if rows is None:
+                rows = np.flatnonzero(keep) if not keep.all() else None
+            else:
+                rows = rows[keep]
+            if rows is None:
+                ids.append(self.ids)
+                scores.append(self.matrix @ query)
+            elif len(rows):
+                ids.append(self.ids[rows])
+                scores.append(self.matrix[rows] @ query)
+
+        if not ids:
+            return []
+        ids = np.concatenate(ids)
+        scores = np.concatenate(scores)
+
+        # Marge pour les tâches supprimées depuis la construction
+        limit = min(len(scores), k * 2)
+        if not limit:
+            return []
+        top = np.argpartition(-scores, limit - 1)[:limit]
+        top = top[np.argsort(-scores[top])]
+        # Tâches supprimées ou changées de propriétaire depuis la construction
+        existing = Task.objects.filter(pk__in=ids[top].tolist())
+        if user_id is not None:
+            existing = existing.filter(user_id=user_id)
+        existing = set(existing.values_list('pk', flat=True))
+        return [
+            (int(ids[i]), float(scores[i])) for i in top if int(ids[i]) in existing
+        ][:k]
+
+
+semantic_index = SemanticIndex(settings.SEMANTIC_INDEX_DIR)
+
+
+def semantic_search(query, k=50, candidates=None, user_id=None):
+    """Ids des tâches (d'un utilisateur) les plus proches d'une requête libre"""
+    try:
+        _, vector = embed_text(query)
+    except Exception as e:
+        logger.error(f"Recherche sémantique indisponible : {e}")
+        return []
+    return [task_id for task_id, _ in semantic_index.search(
+        vector, k=k, candidates=candidates, user_id=user_id,
+    )]
+
+
+def find_near_duplicates(vector, exclude=(), candidates=None, threshold=None, k=3, user_id=None):
+    """Tâches dont la similarité avec `vector` dépasse le seuil de doublon"""
+    threshold = settings.SEMANTIC_DUPLICATE_THRESHOLD if threshold is None else threshold
+    matches = semantic_index.search(
+        vector, k=k, exclude=exclude, candidates=candidates, user_id=user_id,
+    )
+    matches = [(task_id, score) for task_id, score in matches if score >= threshold]
+    tasks = Task.objects.in_bulk([task_id for task_id, _ in matches])
+    return [(tasks[task_id], score) for task_id, score in matches if task_id in tasks]
@@ -0,0 +1,24 @@
+import logging
+
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+
+@receiver(post_save, sender=Task)
+def update_task_embedding(sender, instance, raw=False, update_fields=None, **kwargs):
+    """Maintient le vecteur sémantique de la tâche à jour après enregistrement"""
+    if raw:
+        return
+    # Enregistrement partiel sans modification du texte (ex. changement de statut)
+    if update_fields is not None and not {'title', 'description'} & set(update_fields):
+        return
+    from .semantic import index_task
+    try:
+        # Vecteur déjà calculé par le formulaire (détection de doublons)
+        index_task(instance, vector=getattr(instance, '_embedding', None))
+    except Exception as e:
+        logger.warning(f"Embedding de la tâche #{instance.pk} non mis à jour : {e}")
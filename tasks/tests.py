@@ -1,3 +1,1126 @@
-from django.test import TestCase
+import datetime
+import io
+import json
+import logging
+import os
+import re
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import unittest
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management import CommandError, call_command
+from django.core.paginator import EmptyPage
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.backends.sqlite3.base import DatabaseWrapper
+from django.db.models import Case, F, Value, When
+from django.http import QueryDict
+from django.test import AsyncClient, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from . import archive, backup, health, ical, metrics
+from .log import AsyncHandler
+from .mock_ollama import start_mock_server
+from .admin import EstimatedCountPaginator, TaskAdmin
+from .ai import model_manager
+from .archive import archivable_tasks, archive_tasks, restore_tasks
+from .bulk import OperationClaimed, claim_operation, pk_ranges, queue_bulk_update, run_bulk_operation
+from .models import ArchivedTask, BulkOperation, Task, TaskEmbedding, TaskEvent, batch_task_events, due_date_missing
+from .limiter import Limiter, QueueFull, QueueTimeout, embedding_limiter, ollama_limiter
+from .semantic import HashEmbedder, OllamaEmbedder, SemanticIndex, content_hash, task_text
+from .triage import _batches, apply_suggestions, parse_suggestions, run_triage, triage_candidates
+from .views import TaskListView
+from .warmup import warm_up_in_background
+
+# Gabarits rendus sans manifeste (collectstatic n'est pas lancé pour les tests)
+TEST_STORAGES = {
+    **settings.STORAGES,
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+}
+
+
+@override_settings(SEMANTIC_EMBEDDER='hash')
+class BulkOperationTests(TestCase):
+    """Opérations de masse : sélection figée en plages de clés, réservation exclusive"""
+
+    def setUp(self):
+        self.user = User.objects.create_user('alice')
+        self.tasks = Task.objects.bulk_create(
+            Task(title=f"Tâche {i}", user=self.user) for i in range(10)
+        )
+
+    def test_pk_ranges(self):
+        self.assertEqual(pk_ranges([]), [])
+        self.assertEqual(pk_ranges([1, 2, 3, 5, 7, 8]), [[1, 3], [5, 5], [7, 8]])
+
+    def test_selection_is_frozen_and_processed_in_batches(self):
+        selected = [task.pk for task in self.tasks if task.pk % 3]
+        operation = queue_bulk_update(Task.objects.filter(pk__in=selected), {'status': 'done'})
+        self.assertEqual(operation.total, len(selected))
+        # Créée après la mise en file : hors de la sélection
+        late = Task.objects.create(title="Tâche tardive", user=self.user)
+
+        run_bulk_operation(operation, batch_size=2, pause=0)
+
+        operation.refresh_from_db()
+        self.assertEqual(operation.status, 'done')
+        self.assertEqual(operation.processed, len(selected))
+        self.assertEqual(
+            set(Task.objects.filter(status='done').values_list('pk', flat=True)), set(selected)
+        )
+        late.refresh_from_db()
+        self.assertEqual(late.status, 'todo')
+
+    def test_running_operation_is_not_claimed_twice(self):
+        operation = queue_bulk_update(Task.objects.all(), {'priority': 'high'})
+        self.assertTrue(claim_operation(operation))
+        other = BulkOperation.objects.get(pk=operation.pk)
+        self.assertFalse(claim_operation(other))
+        with self.assertRaises(OperationClaimed):
+            run_bulk_operation(other)
+        self.assertFalse(Task.objects.filter(priority='high').exists())
+
+    @override_settings(BULK_LEASE_SECONDS=60)
+    def test_stale_operation_is_taken_over(self):
+        operation = queue_bulk_update(Task.objects.all(), {'priority': 'high'})
+        self.assertTrue(claim_operation(operation))
+        BulkOperation.objects.filter(pk=operation.pk).update(
+            updated_at=timezone.now() - datetime.timedelta(minutes=5)
+        )
+        other = BulkOperation.objects.get(pk=operation.pk)
+        run_bulk_operation(other, pause=0)
+        self.assertEqual(other.status, 'done')
+        self.assertEqual(Task.objects.filter(priority='high').count(), 10)
+
+        # L'ancien exécutant a perdu l'opération : son lot est annulé
+        operation._claimed = True
+        operation.last_pk = 0
+        Task.objects.update(priority='low')
+        run_bulk_operation(operation, pause=0)
+        self.assertFalse(Task.objects.filter(priority='high').exists())
+        operation.refresh_from_db()
+        self.assertEqual(operation.processed, 10)
+
+
+@override_settings(SEMANTIC_EMBEDDER='hash', ARCHIVE_AFTER_DAYS=30)
+class ArchiveTests(TestCase):
+    """Archivage : condition vérifiée dans la transaction, aucune tâche perdue"""
+
+    def setUp(self):
+        self.user = User.objects.create_user('alice')
+        self.tasks = Task.objects.bulk_create(
+            Task(title=f"Tâche {i}", user=self.user, status='done') for i in range(4)
+        )
+        Task.objects.update(updated_at=timezone.now() - datetime.timedelta(days=60))
+
+    def test_archive_and_restore_keep_fields(self):
+        triaged_at = timezone.now() - datetime.timedelta(days=40)
+        Task.objects.filter(pk=self.tasks[0].pk).update(triaged_at=triaged_at, updated_at=F('updated_at'))
+
+        self.assertEqual(archive_tasks(archivable_tasks(), batch_size=3, pause=0), 4)
+        self.assertFalse(Task.objects.exists())
+        self.assertEqual(ArchivedTask.objects.get(pk=self.tasks[0].pk).triaged_at, triaged_at)
+
+        self.assertEqual(restore_tasks(ArchivedTask.objects.all()), 4)
+        self.assertEqual(Task.objects.get(pk=self.tasks[0].pk).triaged_at, triaged_at)
+        self.assertFalse(ArchivedTask.objects.exists())
+        # L'archivage n'est pas une suppression : aucun événement « supprimée »
+        self.assertFalse(TaskEvent.objects.filter(to_status=TaskEvent.STATUS_CODES['deleted']).exists())
+
+    def test_task_reopened_after_selection_stays_active(self):
+        reopened = self.tasks[1]
+        atomic = archive.transaction.atomic
+
+        def reopen_then_atomic(*args, **kwargs):
+            # Modification concurrente entre la lecture des clés et la copie
+            if reopened.status != 'todo':
+                reopened.status = 'todo'
+                Task.objects.filter(pk=reopened.pk).update(status='todo', updated_at=timezone.now())
+            return atomic(*args, **kwargs)
+
+        with mock.patch.object(archive.transaction, 'atomic', side_effect=reopen_then_atomic):
+            self.assertEqual(archive_tasks(archivable_tasks(), pause=0), 3)
+
+        self.assertEqual(list(Task.objects.values_list('pk', flat=True)), [reopened.pk])
+        self.assertFalse(ArchivedTask.objects.filter(pk=reopened.pk).exists())
+
+    def test_conflicting_archive_row_is_not_deleted_from_active_table(self):
+        kept = self.tasks[2]
+        ArchivedTask.objects.create(
+            id=kept.pk, user=self.user, title="Copie existante",
+            created_at=timezone.now(), updated_at=timezone.now(),
+        )
+
+        with self.assertLogs('tasks.archive', 'WARNING'):
+            self.assertEqual(archive_tasks(archivable_tasks(), pause=0), 3)
+
+        self.assertEqual(list(Task.objects.values_list('pk', flat=True)), [kept.pk])
+        self.assertEqual(ArchivedTask.objects.get(pk=kept.pk).title, "Copie existante")
+
+
+@override_settings(SEMANTIC_EMBEDDER='hash')
+class CalendarFeedTests(TestCase):
+    """Flux iCalendar : format RFC 5545, filtres, revalidation par ETag"""
+
+    def setUp(self):
+        self.user = User.objects.create_user('alice')
+        due = timezone.now() + datetime.timedelta(days=3)
+        self.tasks = Task.objects.bulk_create([
+            Task(title="Réunion, budget; suivi", user=self.user, due_date=due, priority='urgent'),
+            Task(title="Rapport", user=self.user, due_date=due, status='done'),
+            Task(title="Sans échéance", user=self.user),
+        ])
+        self.url = reverse('tasks:calendar_feed', args=[ical.feed_token(self.user)])
+
+    def test_fold_limits_lines_to_75_octets_without_splitting_characters(self):
+        self.assertEqual(ical.fold('SUMMARY:court'), 'SUMMARY:court\r\n')
+        line = 'DESCRIPTION:' + 'é' * 100
+        folded = ical.fold(line)
+        parts = folded[:-2].split('\r\n')
+        self.assertTrue(all(len(part.encode('utf-8')) <= 75 for part in parts))
+        self.assertTrue(all(part.startswith(' ') for part in parts[1:]))
+        self.assertEqual(parts[0] + ''.join(part[1:] for part in parts[1:]), line)
+
+    def test_escape_text(self):
+        self.assertEqual(ical.escape_text('a\\b;c,d\r\ne\nf'), 'a\\\\b\\;c\\,d\\ne\\nf')
+
+    def test_parse_filters(self):
+        params = QueryDict('status=todo,doing&status=todo&priority=high')
+        self.assertEqual(ical.parse_filters(params), {
+            'status__in': ['doing', 'todo'], 'priority__in': ['high'],
+        })
+        with self.assertRaises(ValueError):
+            ical.parse_filters(QueryDict('priority=critique'))
+
+    def test_feed_lists_dated_tasks_and_applies_filters(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response['Content-Type'], 'text/calendar; charset=utf-8')
+        body = b''.join(response.streaming_content).decode('utf-8')
+        self.assertTrue(body.startswith('BEGIN:VCALENDAR\r\n') and body.endswith('END:VCALENDAR\r\n'))
+        self.assertEqual(body.count('BEGIN:VEVENT'), 2)
+        self.assertIn('SUMMARY:Réunion\\, budget\\; suivi', body)
+        self.assertIn('PRIORITY:1', body)
+
+        body = b''.join(self.client.get(self.url, {'status': 'done'}).streaming_content).decode('utf-8')
+        self.assertEqual(body.count('BEGIN:VEVENT'), 1)
+        self.assertIn('SUMMARY:✓ Rapport', body)
+        self.assertEqual(self.client.get(self.url, {'status': 'fini'}).status_code, 400)
+        self.assertEqual(self.client.get(reverse('tasks:calendar_feed', args=['faux:jeton'])).status_code, 404)
+
+    def test_etag_revalidation_and_change_after_update(self):
+        etag = self.client.get(self.url)['ETag']
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        Task.objects.filter(pk=self.tasks[0].pk).update(title="Réunion déplacée")
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+        etag = response['ETag']
+        task = Task.objects.get(pk=self.tasks[1].pk)
+        task.title = "Rapport final"
+        Task.objects.bulk_update([task], ['title'])
+        self.assertNotEqual(self.client.get(self.url)['ETag'], etag)
+
+    async def test_feed_is_streamed_asynchronously_under_asgi(self):
+        response = await AsyncClient().get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.is_async)
+        body = b''.join([chunk async for chunk in response.streaming_content]).decode('utf-8')
+        self.assertEqual(body.count('BEGIN:VEVENT'), 2)
+
+
+@override_settings(SEMANTIC_EMBEDDER='hash')
+class TaskEventTests(TestCase):
+    """Historique des statuts écrit par les écritures de masse"""
+
+    def setUp(self):
+        self.user = User.objects.create_user('alice')
+
+    def transitions(self):
+        return list(TaskEvent.objects.order_by('task_id', 'pk').values_list('task_id', 'from_status', 'to_status'))
+
+    def test_bulk_create_records_creation_unless_disabled(self):
+        created = Task.objects.bulk_create([Task(title="Créée", user=self.user)])
+        Task.objects.bulk_create([Task(title="Restaurée", user=self.user, status='done')], record_events=False)
+        self.assertEqual(self.transitions(), [(created[0].pk, None, TaskEvent.STATUS_CODES['todo'])])
+
+    def test_update_with_expression_records_only_actual_changes(self):
+        todo, doing = Task.objects.bulk_create([
+            Task(title="À faire", user=self.user), Task(title="En cours", user=self.user, status='doing'),
+        ])
+        TaskEvent.objects.all().delete()
+
+        Task.objects.update(status=Case(When(status='todo', then=Value('doing')), default=F('status')))
+        Task.objects.update(status=F('status'))
+
+        codes = TaskEvent.STATUS_CODES
+        self.assertEqual(self.transitions(), [(todo.pk, codes['todo'], codes['doing'])])
+        doing.refresh_from_db()
+        self.assertEqual(doing.status, 'doing')
+
+    def test_batched_events_are_discarded_on_rollback(self):
+        with self.assertRaises(RuntimeError):
+            with transaction.atomic(), batch_task_events():
+                Task.objects.create(title="Annulée", user=self.user)
+                Task.objects.update(status='done')
+                self.assertFalse(TaskEvent.objects.exists())
+                raise RuntimeError("annulation")
+        self.assertFalse(TaskEvent.objects.exists())
+
+        with transaction.atomic(), batch_task_events():
+            task = Task.objects.create(title="Validée", user=self.user)
+            Task.objects.update(status='done')
+        self.assertEqual(len(self.transitions()), 2)
+        self.assertEqual({task_id for task_id, _, _ in self.transitions()}, {task.pk})
+
+
+class AnalyticsTests(TestCase):
+    """Indicateurs de flux calculés depuis l'historique"""
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.user = User.objects.create_user('alice')
+        self.client.force_login(self.user)
+        today = timezone.localdate()
+        tz = timezone.get_current_timezone()
+
+        def at(days_ago, hour):
+            return datetime.datetime.combine(today - datetime.timedelta(days=days_ago), datetime.time(hour), tzinfo=tz)
+
+        def event(task_id, old, new, when):
+            return TaskEvent.transition(task_id, self.user.pk, old, new, at=when)
+
+        TaskEvent.objects.bulk_create([
+            # 1 : démarrée à J-2, terminée à J-1 (cycle 24 h, délai 48 h)
+            event(1, None, 'todo', at(3, 9)), event(1, 'todo', 'doing', at(2, 9)), event(1, 'doing', 'done', at(1, 9)),
+            # 2 : démarrée à J-3 au soir, terminée à J-1 (cycle 36 h, délai 48 h)
+            event(2, None, 'todo', at(3, 9)), event(2, 'todo', 'doing', at(3, 21)), event(2, 'doing', 'done', at(1, 9)),
+            # 3 : toujours en cours
+            event(3, None, 'todo', at(3, 9)), event(3, 'todo', 'doing', at(2, 9)),
+        ])
+
+    def test_throughput_wip_and_percentiles(self):
+        response = self.client.get(reverse('tasks:analytics_api'), {'days': 4})
+        analytics = response.json()['analytics']
+        self.assertEqual(analytics['throughput'], [0, 0, 2, 0])
+        self.assertEqual(analytics['wip'], [1, 3, 1, 1])
+        self.assertEqual(analytics['completed'], 2)
+        self.assertEqual(analytics['cycle_time_hours'], {'count': 2, 'mean': 30.0, 'p50': 30.0, 'p85': 34.2, 'p95': 35.4})
+        self.assertEqual(analytics['lead_time_hours'], {'count': 2, 'mean': 48.0, 'p50': 48.0, 'p85': 48.0, 'p95': 48.0})
+
+        # Jours écoulés servis par le cache : même résultat
+        self.assertEqual(self.client.get(reverse('tasks:analytics_api'), {'days': 4}).json()['analytics'], analytics)
+
+    def test_deleted_task_leaves_wip(self):
+        doing = [Task.objects.create(title=f"En cours {i}", user=self.user, status='doing') for i in range(3)]
+
+        def wip_today():
+            return self.client.get(reverse('tasks:analytics_api'), {'days': 1}).json()['analytics']['wip'][-1]
+
+        self.assertEqual(wip_today(), 4)
+        pks = [task.pk for task in doing]
+        doing[0].delete()
+        Task.objects.filter(pk=doing[1].pk).delete()
+        self.assertEqual(wip_today(), 2)
+        deleted = TaskEvent.STATUS_CODES['deleted']
+        self.assertEqual(
+            set(TaskEvent.objects.filter(to_status=deleted).values_list('task_id', 'from_status')),
+            {(pks[0], TaskEvent.STATUS_CODES['doing']), (pks[1], TaskEvent.STATUS_CODES['doing'])},
+        )
+
+
+@override_settings(SEMANTIC_EMBEDDER='hash', STORAGES=TEST_STORAGES)
+class TaskListSortTests(TestCase):
+    """Tris de la liste : ordre total, y compris entre tâches à égalité"""
+
+    def setUp(self):
+        self.user = User.objects.create_user('alice')
+        self.client.force_login(self.user)
+        moment = timezone.now() - datetime.timedelta(days=1)
+        Task.objects.bulk_create(Task(title=f"Tâche {i}", user=self.user, priority='high') for i in range(23))
+        Task.objects.update(created_at=moment, updated_at=moment, due_date=moment)
+        ArchivedTask.objects.bulk_create(
+            ArchivedTask(id=1000 + i, user=self.user, title=f"Archivée {i}", priority='high',
+                         due_date=moment, created_at=moment, updated_at=moment)
+            for i in range(4)
+        )
+
+    def listed_ids(self, **params):
+        ids, page, num_pages = [], 1, 1
+        while page <= num_pages:
+            data = self.client.get(reverse('tasks:task_list'), {**params, 'fragment': 'json', 'page': page}).json()
+            ids += [task['id'] for task in data['tasks']]
+            page, num_pages = page + 1, data['num_pages']
+        return ids
+
+    def test_ties_are_broken_by_primary_key(self):
+        for archived in ('', '1'):
+            expected = list(Task.objects.values_list('pk', flat=True))
+            if archived:
+                expected += list(ArchivedTask.objects.values_list('pk', flat=True))
+            for sort in TaskListView.SORTS:
+                with self.subTest(sort=sort, archived=archived):
+                    self.assertEqual(self.listed_ids(sort=sort, archived=archived), sorted(expected))
+
+    def test_sorts_are_served_by_an_index(self):
+        for sort, (_, ordering) in TaskListView.SORTS.items():
+            for filters in ({}, {'status': 'todo'}):
+                with self.subTest(sort=sort, **filters):
+                    queryset = Task.objects.for_user(self.user).filter(**filters)
+                    plan = queryset.alias(undated=due_date_missing()).order_by(*ordering)[:10].explain()
+                    self.assertIn('USING INDEX', plan)
+                    self.assertNotIn('TEMP B-TREE', plan)
+
+
+@override_settings(SEMANTIC_EMBEDDER='hash', STORAGES=TEST_STORAGES)
+class TaskListFragmentTests(TestCase):
+    """Modes fragment de la liste : grille seule ou lignes JSON, sans statistiques"""
+
+    def setUp(self):
+        self.user = User.objects.create_user('alice')
+        self.client.force_login(self.user)
+        self.urgent = Task.objects.bulk_create(
+            Task(title=f"Urgente {i}", user=self.user, priority='high') for i in range(15)
+        )
+        Task.objects.bulk_create(Task(title=f"Faite {i}", user=self.user, status='done') for i in range(5))
+        Task.objects.create(title="Urgente d'un autre", user=User.objects.create_user('bob'), priority='high')
+
+    def get(self, **params):
+        return self.client.get(reverse('tasks:task_list'), params)
+
+    def test_json_fragment_filters_and_pages(self):
+        # Session, utilisateur, comptage, page : ni statistiques ni autre requête
+        with self.assertNumQueries(4):
+            first = self.get(fragment='json', status='todo', priority='high').json()
+        with self.assertNumQueries(4):
+            second = self.get(fragment='json', status='todo', priority='high', page=2).json()
+        self.assertEqual((first['page'], first['num_pages'], second['page']), (1, 2, 2))
+        rows = first['tasks'] + second['tasks']
+        self.assertEqual(len(first['tasks']), 10)
+        self.assertEqual(sorted(row['id'] for row in rows), sorted(task.pk for task in self.urgent))
+        self.assertEqual(set(rows[0]), {'id', 'title', 'status', 'status_display', 'priority',
+                                         'priority_display', 'due_date', 'overdue', 'archived'})
+        self.assertTrue(all(row['status'] == 'todo' and row['priority'] == 'high' for row in rows))
+
+    def test_html_fragment_returns_only_the_grid(self):
+        with self.assertNumQueries(4):
+            response = self.get(fragment='html', status='todo', page=2)
+        self.assertTemplateUsed(response, 'tasks/task_grid.html')
+        self.assertTemplateNotUsed(response, 'tasks/task_list.html')
+        self.assertNotIn('stats', response.context)
+        content = response.content.decode()
+        self.assertNotIn('<nav class="navbar', content)
+        self.assertEqual(content.count('task-status-badge'), 5)
+        self.assertIn('Page 2 sur 2', content)
+        # Liens de pagination vers la page complète (sans le paramètre fragment)
+        self.assertNotIn('fragment=', content)
+
+        full = self.get(status='todo', page=2)
+        self.assertIn('stats', full.context)
+        self.assertLess(len(response.content) * 2, len(full.content))
+
+
+@override_settings(SEMANTIC_EMBEDDER='hash', STORAGES=TEST_STORAGES)
+class TaskDetailViewTests(TestCase):
+    """Page de détail : changement de statut par l'envoi groupé de main.js"""
+
+    def test_status_toggle_uses_the_shared_script(self):
+        user = User.objects.create_user('alice')
+        self.client.force_login(user)
+        task = Task.objects.create(title="Tâche", user=user, status='doing')
+        response = self.client.get(reverse('tasks:task_detail', args=[task.pk]))
+        self.assertNotContains(response, 'function toggleTaskStatus')
+        self.assertNotContains(response, 'toggle-status/')
+        badges = re.findall(r'class="[^"]*task-status-badge[^"]*" data-task-id="(\d+)"\s+data-status="(\w+)"',
+                            response.content.decode())
+        self.assertEqual(badges, [(str(task.pk), 'doing')] * 2)
+
+
+@override_settings(STORAGES=TEST_STORAGES)
+class AdminPerformanceModeTests(TestCase):
+    """Liste des tâches de l'admin en mode performance : comptage approché"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_superuser('admin')
+        self.client.force_login(self.user)
+        Task.objects.bulk_create(Task(title=f"Tâche {i}", user=self.user) for i in range(60))
+        for name, value in (('performance_mode', True), ('show_full_result_count', False),
+                            ('paginator', EstimatedCountPaginator)):
+            patcher = mock.patch.object(TaskAdmin, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_changelist_queries_do_not_depend_on_page_size(self):
+        url = reverse('admin:tasks_task_changelist')
+        self.client.get(url)
+        # Session, utilisateur, page (avec jointure du propriétaire) ; le
+        # compte vient du cache, sans COUNT(*) complet ni requête par ligne
+        with self.assertNumQueries(3):
+            response = self.client.get(url)
+        self.assertEqual(response.context['cl'].result_count, 60)
+        self.assertEqual(len(response.context['cl'].result_list), 25)
+        with self.assertNumQueries(3):
+            response = self.client.get(url, {'p': 3})
+        self.assertEqual(len(response.context['cl'].result_list), 10)
+
+    def test_count_ignores_primary_key_gaps(self):
+        pks = list(Task.objects.values_list('pk', flat=True))
+        Task.objects.filter(pk__in=pks[10:50]).delete()
+        paginator = EstimatedCountPaginator(Task.objects.all(), 25)
+        self.assertEqual(paginator.count, 20)
+        self.assertEqual(paginator.num_pages, 1)
+
+    def test_stale_count_is_corrected(self):
+        paginator = EstimatedCountPaginator(Task.objects.order_by('pk'), 25)
+        self.assertEqual(paginator.num_pages, 3)
+        Task.objects.filter(pk__in=list(Task.objects.values_list('pk', flat=True)[:30])).delete()
+
+        # Compte en cache périmé : la page 3 n'existe plus
+        paginator = EstimatedCountPaginator(Task.objects.order_by('pk'), 25)
+        self.assertEqual(paginator.num_pages, 3)
+        with self.assertRaises(EmptyPage):
+            paginator.page(3)
+        self.assertEqual((paginator.count, paginator.num_pages), (30, 2))
+
+        # Le compte corrigé est partagé, et la dernière page le confirme
+        paginator = EstimatedCountPaginator(Task.objects.order_by('pk'), 25)
+        self.assertEqual(len(paginator.page(2)), 5)
+        self.assertEqual(paginator.count, 30)
+
+    def test_filtered_count_is_capped(self):
+        paginator = EstimatedCountPaginator(Task.objects.filter(status='todo'), 25)
+        paginator.max_count = 40
+        self.assertEqual(paginator.count, 41)
+
+
+@override_settings(SEMANTIC_EMBEDDER='hash')
+class SemanticIndexTests(TestCase):
+    """Vecteurs tenus à jour par le signal, recherche sur la matrice et le delta"""
+
+    def setUp(self):
+        self.alice = User.objects.create_user('alice')
+        self.bob = User.objects.create_user('bob')
+        self.embedder = HashEmbedder()
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.index = SemanticIndex(tmp.name)
+
+    def search(self, text, **kwargs):
+        return [task_id for task_id, _ in self.index.search(self.embedder.embed(text), **kwargs)]
+
+    def test_signal_embeds_on_save_and_skips_status_only_updates(self):
+        task = Task.objects.create(title="Préparer la réunion budget", user=self.alice)
+        embedding = TaskEmbedding.objects.get(task=task)
+        self.assertEqual(embedding.model, self.embedder.name)
+        self.assertEqual(embedding.content_hash, content_hash(task_text(task.title, task.description)))
+        np.testing.assert_allclose(
+            np.frombuffer(embedding.vector, dtype=np.float32), self.embedder.embed(task.title)
+        )
+
+        stamp = embedding.updated_at
+        task.status = 'doing'
+        task.save(update_fields=['status', 'updated_at'])
+        self.assertEqual(TaskEmbedding.objects.get(task=task).updated_at, stamp)
+
+        task.title = "Envoyer les factures"
+        task.save()
+        self.assertEqual(
+            TaskEmbedding.objects.get(task=task).content_hash, content_hash(task_text(task.title))
+        )
+
+    def test_search_merges_matrix_and_delta(self):
+        budget = Task.objects.create(title="Préparer la réunion budget", user=self.alice)
+        Task.objects.create(title="Arroser les plantes du bureau", user=self.alice)
+        self.assertEqual(self.index.build(), 2)
+
+        # Créée après la construction : trouvée dans le delta lu en base
+        invoices = Task.objects.create(title="Envoyer les factures clients", user=self.alice)
+        self.assertEqual(self.search("factures clients", k=1), [invoices.pk])
+        self.assertEqual(self.search("réunion budget", k=1), [budget.pk])
+
+        # Modifiée après la construction : le vecteur du delta remplace celui de la matrice
+        budget.title = "Relancer les factures clients"
+        budget.save()
+        self.assertEqual(set(self.search("factures clients", k=2)), {budget.pk, invoices.pk})
+        self.assertNotIn(budget.pk, self.search("réunion budget", k=1))
+
+        # Supprimée : écartée des résultats
+        invoices.delete()
+        self.assertNotIn(invoices.pk, self.search("factures clients", k=2))
+
+    def test_rebuild_is_triggered_by_global_delta_in_user_searches(self):
+        for i in range(3):
+            Task.objects.create(title=f"Tâche de Bob {i}", user=self.bob)
+        Task.objects.create(title="Tâche d'Alice", user=self.alice)
+        with override_settings(SEMANTIC_REBUILD_THRESHOLD=2), \
+                mock.patch.object(self.index, 'build_in_background') as build:
+            # Delta d'Alice sous le seuil, delta global au-dessus
+            self.search("tâche", user_id=self.alice.pk)
+            build.assert_called_once()
+            # Comptage global limité à un par intervalle
+            self.search("tâche", user_id=self.alice.pk)
+            build.assert_called_once()
+
+    def test_search_is_scoped_to_owner_and_candidates(self):
+        mine = Task.objects.create(title="Réviser le contrat", user=self.alice)
+        theirs = Task.objects.create(title="Réviser le contrat", user=self.bob)
+        self.index.build()
+        self.assertEqual(self.search("contrat", user_id=self.alice.pk), [mine.pk])
+        self.assertEqual(self.search("contrat", candidates=[theirs.pk]), [theirs.pk])
+        self.assertEqual(self.search("contrat", exclude=[mine.pk, theirs.pk]), [])
+
+    def test_only_the_owner_rows_are_scored(self):
+        for i in range(5):
+            Task.objects.create(title=f"Contrat de Bob {i}", user=self.bob)
+        mine = [Task.objects.create(title=f"Contrat d'Alice {i}", user=self.alice).pk for i in range(2)]
+        self.index.build()
+        self.index._load()
+        scored_rows = []
+
+        class RecordingMatrix(np.ndarray):
+            def __matmul__(self, other):
+                scored_rows.append(len(self))
+                return np.asarray(self) @ other
+
+        self.index.matrix = np.asarray(self.index.matrix).view(RecordingMatrix)
+        self.assertEqual(set(self.search("contrat", user_id=self.alice.pk)), set(mine))
+        self.assertEqual(scored_rows, [2])
+        self.assertEqual(self.search("contrat", user_id=self.alice.pk, candidates=mine[:1]), mine[:1])
+        self.assertEqual(scored_rows, [2, 1])
+
+
+class MetricsTests(TestCase):
+    """Fichiers de métriques par processus, archivage des processus disparus, accès"""
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = tmp.name
+        override = override_settings(METRICS_DIR=self.dir, METRICS_TOKEN='')
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def dead_pid(self):
+        process = subprocess.Popen([sys.executable, '-c', 'pass'])
+        process.wait()
+        return process.pid
+
+    def write(self, name, pid, hits):
+        with open(os.path.join(self.dir, name), 'w', encoding='utf-8') as f:
+            json.dump({
+                'pid': pid,
+                'counters': [['jobs_total', {}, hits]],
+                'histograms': [],
+                'gauges': [['queue_depth', {}, 7]],
+            }, f)
+
+    def test_concurrent_flushes_leave_valid_files(self):
+        registry = metrics.Registry()
+        registry.inc('jobs_total')
+
+        def flush():
+            for _ in range(50):
+                registry.inc('jobs_total')
+                registry.flush()
+
+        threads = [threading.Thread(target=flush) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(os.listdir(self.dir), [registry._filename])
+        counters, _, _ = registry.collect()
+        self.assertEqual(counters[('jobs_total', ())], 401)
+
+    def test_dead_processes_are_archived_without_losing_counts(self):
+        registry = metrics.Registry()
+        registry.inc('jobs_total', 2)
+        self.write('metrics_1_dead.json', self.dead_pid(), 3)
+        self.write('metrics_2_dead.json', self.dead_pid(), 4)
+
+        counters, _, gauges = registry.collect()
+        self.assertEqual(counters[('jobs_total', ())], 9)
+        # Jauges des processus disparus ignorées
+        self.assertNotIn(('queue_depth', ()), gauges)
+        self.assertEqual(
+            sorted(os.listdir(self.dir)), sorted([metrics.ARCHIVE_FILE, '.archive.lock', registry._filename])
+        )
+
+        # Les cumuls de l'archive ne reculent pas et ne sont pas comptés deux fois
+        self.write('metrics_3_dead.json', self.dead_pid(), 1)
+        counters, _, _ = registry.collect()
+        self.assertEqual(counters[('jobs_total', ())], 10)
+        counters, _, _ = registry.collect()
+        self.assertEqual(counters[('jobs_total', ())], 10)
+
+    def test_endpoint_requires_token_or_staff(self):
+        url = reverse('tasks:metrics')
+        self.assertEqual(self.client.get(url).status_code, 401)
+
+        staff = User.objects.create_user('admin', is_staff=True)
+        self.client.force_login(staff)
+        self.assertEqual(self.client.get(url).status_code, 200)
+        self.client.logout()
+
+        with override_settings(METRICS_TOKEN='secret'):
+            self.assertEqual(self.client.get(url, headers={'Authorization': 'Bearer faux'}).status_code, 401)
+            self.assertEqual(self.client.get(url, headers={'Authorization': 'Bearer secret'}).status_code, 200)
+
+
+class BackupTests(TestCase):
+    """Sauvegarde en ligne : base de l'application en WAL, instantanés horodatés en UTC"""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        self.source = os.path.join(self.directory, 'source.sqlite3')
+        db = sqlite3.connect(self.source)
+        db.execute('PRAGMA journal_mode=WAL')
+        db.execute('CREATE TABLE tasks_task (id INTEGER PRIMARY KEY, title TEXT)')
+        db.executemany('INSERT INTO tasks_task (title) VALUES (?)', [("Tâche",)] * 50)
+        db.commit()
+        db.close()
+
+    def test_application_connections_use_wal(self):
+        path = os.path.join(self.directory, 'app.sqlite3')
+        wrapper = DatabaseWrapper({**connection.settings_dict, 'NAME': path})
+        try:
+            with wrapper.cursor() as cursor:
+                cursor.execute('PRAGMA journal_mode')
+                self.assertEqual(cursor.fetchone()[0], 'wal')
+        finally:
+            wrapper.close()
+
+    def test_snapshots_are_named_in_utc_and_restored(self):
+        target = os.path.join(self.directory, 'snapshots')
+        first, stats, _ = backup.create_snapshot(target, source=self.source, keep=0)
+        second, _, _ = backup.create_snapshot(target, source=self.source, compress=True, keep=0)
+        self.assertEqual(stats['step_pages'], -1)  # WAL : une seule étape
+        self.assertRegex(first.name, r'^db-\d{8}T\d{12}Z\.sqlite3$')
+        self.assertNotEqual(first.name[:-len('.sqlite3')], second.name[:-len('.sqlite3.gz')])
+        self.assertEqual(backup.snapshots(target), [second, first])
+        # Copies autonomes : ni -wal ni -shm à côté des instantanés
+        self.assertEqual(sorted(os.listdir(target)), sorted([first.name, second.name]))
+        self.assertEqual(backup.verify_snapshot(second), ([], {'tasks_task': 50}))
+
+        restored = os.path.join(self.directory, 'restored.sqlite3')
+        backup.restore_snapshot(second, restored)
+        db = sqlite3.connect(restored)
+        self.addCleanup(db.close)
+        self.assertEqual(db.execute('SELECT COUNT(*) FROM tasks_task').fetchone()[0], 50)
+
+
+class LoadTestServerTests(TestCase):
+    """Mode de transaction SQLite : IMMEDIATE pour le seul serveur du test de charge"""
+
+    def transaction_mode(self, env):
+        result = subprocess.run(
+            [sys.executable, '-c', "from django.conf import settings; "
+                                   "print(settings.DATABASES['default']['OPTIONS']['transaction_mode'])"],
+            cwd=settings.BASE_DIR, env=env, capture_output=True, text=True, check=True,
+        )
+        return result.stdout.strip()
+
+    def test_immediate_mode_is_limited_to_the_load_test_server(self):
+        from .management.commands.loadtest_http import Command
+
+        env = {name: value for name, value in os.environ.items() if name != 'SQLITE_TRANSACTION_MODE'}
+        env['DJANGO_SETTINGS_MODULE'] = 'task_project.settings'
+        self.assertEqual(self.transaction_mode(env), 'DEFERRED')
+        server_env = Command()._server_env('127.0.0.1', 'http://127.0.0.1:9')
+        self.assertEqual(self.transaction_mode(server_env), 'IMMEDIATE')
+
+
+class HealthProbeTests(TestCase):
+    """Sondes de disponibilité : base réellement lue, session HTTP dédiée"""
+
+    def probe_file(self, path):
+        wrapper = DatabaseWrapper({**connection.settings_dict, 'NAME': path})
+        with mock.patch.object(health, 'connection', wrapper):
+            return health.probe_database()
+
+    def test_database_probe_reads_a_table(self):
+        self.assertEqual(health.probe_database(), 'ok')
+        with tempfile.TemporaryDirectory() as directory:
+            garbage = os.path.join(directory, 'pas-une-base.sqlite3')
+            with open(garbage, 'wb') as f:
+                f.write(b'contenu quelconque' * 512)
+            for path in (garbage, os.path.join(directory, 'vide.sqlite3'),
+                         os.path.join(directory, 'absent', 'db.sqlite3')):
+                with self.subTest(path=os.path.basename(path)), self.assertRaises(Exception):
+                    self.probe_file(path)
+
+    def test_ollama_probe_uses_its_own_session(self):
+        from .ai import _get_sync_clients
+
+        server = start_mock_server(latency=0)
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        with override_settings(OLLAMA_URL=server.url):
+            self.assertEqual(health.probe_ollama(), "2 modèle(s) disponible(s)")
+            self.assertIsNot(health._session(), _get_sync_clients()[0])
+        with override_settings(OLLAMA_URL='http://127.0.0.1:9'), self.assertRaises(Exception):
+            health.probe_ollama()
+
+    def test_failing_database_makes_instance_unavailable(self):
+        def failing():
+            raise health.ProbeFailed("base illisible")
+
+        monitor = health.HealthMonitor(probes=(('database', failing, True), ('ollama', lambda: 'ok', False)))
+        monitor.ensure_started = lambda: None
+        for name, probe, _ in monitor.probes:
+            monitor.run_probe(name, probe)
+        ready, report = monitor.readiness()
+        self.assertFalse(ready)
+        self.assertEqual(report['status'], 'unavailable')
+        self.assertEqual(report['checks']['database']['detail'], "base illisible")
+
+
+class StartupTests(TestCase):
+    """Démarrage à froid : aucune dépendance lourde importée au chargement"""
+
+    def test_no_heavy_module_is_loaded_at_startup(self):
+        out = io.StringIO()
+        call_command('startup_benchmark', runs=1, top=0, stdout=out, stderr=out)
+        report = out.getvalue()
+        self.assertEqual(report.count("Aucun module lourd chargé au démarrage"), 2, report)
+        self.assertNotIn("Modules lourds chargés", report)
+
+
+class LimiterTests(TestCase):
+    """Limiteur d'appels à Ollama : priorité des voies, équité, refus rapides"""
+
+    QUEUE_LIMITS = {'interactive': 5, 'background': 5, 'batch': 5}
+
+    def test_lanes_by_priority_and_clients_in_turn(self):
+        limiter = Limiter(capacity=1, queue_limits=self.QUEUE_LIMITS, timeout=1)
+        served = []
+        self.assertTrue(limiter._enqueue('batch', 'a', None).granted)
+        for lane, client in [('batch', 'a'), ('background', 'b'), ('interactive', 'a'),
+                             ('interactive', 'a'), ('interactive', 'b')]:
+            limiter._enqueue(lane, client, lambda lane=lane, client=client: served.append((lane, client)))
+        for _ in range(6):
+            limiter._release()
+        self.assertEqual(served, [
+            ('interactive', 'a'), ('interactive', 'b'), ('interactive', 'a'), ('background', 'b'), ('batch', 'a'),
+        ])
+        self.assertEqual(limiter.active, 0)
+
+    def test_full_lane_is_rejected_immediately(self):
+        limiter = Limiter(capacity=1, queue_limits={**self.QUEUE_LIMITS, 'interactive': 0}, timeout=1)
+        with limiter.slot('batch'):
+            with self.assertRaises(QueueFull):
+                with limiter.slot('interactive'):
+                    pass
+        self.assertEqual(limiter.stats()['rejected']['interactive'], 1)
+
+    def test_wait_is_bounded(self):
+        limiter = Limiter(capacity=1, queue_limits=self.QUEUE_LIMITS, timeout=0.01)
+        with limiter.slot('batch'):
+            with self.assertRaises(QueueTimeout):
+                with limiter.slot('interactive'):
+                    pass
+            self.assertEqual(limiter.stats()['queued']['interactive'], 0)
+        self.assertEqual(limiter.active, 0)
+
+    @override_settings(OLLAMA_CONCURRENCY=1, OLLAMA_QUEUE_LIMITS={'interactive': 0, 'background': 0, 'batch': 0})
+    def test_embeddings_do_not_wait_behind_generations(self):
+        server = start_mock_server(latency=0)
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        with override_settings(OLLAMA_URL=server.url), ollama_limiter.slot('batch'):
+            vector = OllamaEmbedder('nomic-embed-text:latest').embed("Préparer la réunion")
+        self.assertAlmostEqual(float(np.linalg.norm(vector)), 1.0, places=5)
+        self.assertEqual(embedding_limiter.active, 0)
+
+
+class LoggingTests(TestCase):
+    """Journalisation asynchrone : filtres propres à chaque handler, fork"""
+
+    def test_handlers_do_not_share_filters(self):
+        handlers = logging.getLogger('tasks').handlers
+        self.assertEqual(len(handlers), 2)
+        file_filters, console_filters = ({id(f) for f in handler.filters} for handler in handlers)
+        self.assertTrue(file_filters)
+        self.assertFalse(file_filters & console_filters)
+
+    @unittest.skipUnless(hasattr(os, 'fork'), "fork indisponible")
+    def test_forked_child_writes_through_a_fresh_queue(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'child.log')
+            handler = AsyncHandler(target='logging.FileHandler', filename=path, encoding='utf-8')
+            self.addCleanup(handler.close)
+            parent_queue = handler.queue
+
+            pid = os.fork()
+            if pid == 0:
+                # Processus enfant : aucune assertion, seul le code de sortie compte
+                status = 1
+                try:
+                    if handler.queue is not parent_queue and handler.listener._thread.is_alive():
+                        handler.handle(logging.makeLogRecord({'msg': "écrit par l'enfant", 'levelno': logging.INFO}))
+                        handler.stop()
+                        status = 0
+                finally:
+                    os._exit(status)
+
+            _, status = os.waitpid(pid, 0)
+            self.assertEqual(os.waitstatus_to_exitcode(status), 0)
+            with open(path, encoding='utf-8') as f:
+                self.assertIn("écrit par l'enfant", f.read())
+
+
+class PrecompressedStaticTests(TestCase):
+    """Fichiers statiques servis sous leur variante précompressée"""
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        for name, content in (('style.css', b'body{}'), ('style.css.br', b'br'), ('style.css.gz', b'gz')):
+            with open(os.path.join(tmp.name, name), 'wb') as f:
+                f.write(content)
+        override = override_settings(STATIC_ROOT=tmp.name, DEBUG=False)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def test_serves_best_encoding_without_content_disposition(self):
+        for accepted, encoding, body in (('gzip, br', 'br', b'br'), ('gzip', 'gzip', b'gz'), ('', None, b'body{}')):
+            response = self.client.get('/static/style.css', headers={'Accept-Encoding': accepted})
+            self.assertEqual(b''.join(response.streaming_content), body)
+            self.assertEqual(response.headers.get('Content-Encoding'), encoding)
+            self.assertEqual(response['Content-Type'], 'text/css')
+            self.assertEqual(response['Vary'], 'Accept-Encoding')
+            self.assertNotIn('Content-Disposition', response.headers)
+
+
+class MockOllamaTestCase(TestCase):
+    """Tests contre le serveur Ollama factice (réponses instantanées, déterministes)"""
+
+    mock_options = {}
+
+    def setUp(self):
+        self.ollama = start_mock_server(latency=0, **self.mock_options)
+        self.addCleanup(self.ollama.server_close)
+        self.addCleanup(self.ollama.shutdown)
+        override = override_settings(
+            OLLAMA_URL=self.ollama.url, SEMANTIC_EMBEDDER='hash', STORAGES=TEST_STORAGES,
+        )
+        override.enable()
+        self.addCleanup(override.disable)
+        # Modèle redécouvert auprès du serveur de chaque test
+        model_manager.invalidate()
+        self.user = User.objects.create_user('alice')
+
+
+class InsightsViewTests(MockOllamaTestCase):
+    """Vues d'insights asynchrones"""
+
+    async def test_insights_page_renders_for_logged_in_user(self):
+        await Task.objects.acreate(title="Préparer la réunion", user=self.user)
+        client = AsyncClient()
+        await client.aforce_login(self.user)
+        response = await client.get(reverse('tasks:ai_insights'))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, self.ollama.reply)
+        # Gabarit de base : utilisateur connecté affiché
+        self.assertContains(response, 'alice')
+
+    async def test_insights_page_redirects_when_ollama_is_down(self):
+        await Task.objects.acreate(title="Préparer la réunion", user=self.user)
+        client = AsyncClient()
+        await client.aforce_login(self.user)
+        with override_settings(OLLAMA_URL='http://127.0.0.1:9'):
+            response = await client.get(reverse('tasks:ai_insights'))
+        self.assertRedirects(response, reverse('tasks:task_list'), fetch_redirect_response=False)
+
+    async def test_api_returns_insights(self):
+        await Task.objects.acreate(title="Préparer la réunion", user=self.user)
+        client = AsyncClient()
+        await client.aforce_login(self.user)
+        response = await client.get(reverse('tasks:ai_insights_api'))
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertTrue(data['success'])
+        self.assertEqual(data['insights']['analysis'], self.ollama.reply)
+        self.assertEqual(data['insights']['model_used'], 'llama3.1:latest')
+
+    @override_settings(OLLAMA_CONCURRENCY=1, OLLAMA_QUEUE_LIMITS={'interactive': 0, 'background': 0, 'batch': 0})
+    async def test_api_answers_503_when_ollama_is_busy(self):
+        await Task.objects.acreate(title="Préparer la réunion", user=self.user)
+        client = AsyncClient()
+        await client.aforce_login(self.user)
+        # Seule place occupée par un autre client : file interactive pleine d'emblée
+        async with ollama_limiter.aslot('batch', client='autre'):
+            response = await client.get(reverse('tasks:ai_insights_api'))
+        self.assertEqual(response.status_code, 503)
+        self.assertIn('Retry-After', response)
+        self.assertFalse(response.json()['success'])
+
+
+def triage_responder(payload):
+    """Réponse du tri : priorité haute et aucune échéance pour chaque tâche du prompt"""
+    ids = re.findall(r'"id": (\d+)', payload['messages'][0]['content'])
+    return json.dumps({'tasks': [{'id': int(pk), 'priority': 'high', 'due_date': None} for pk in ids]})
+
+
+class ModelManagerTests(MockOllamaTestCase):
+    """Choix du modèle mis en cache, modèle gardé chargé, durées par appel"""
+
+    mock_options = {'load_time': 0.05, 'tokens_per_second': 1000}
+
+    def test_model_is_discovered_once_then_cached(self):
+        from . import ai
+
+        with mock.patch('tasks.ai.get_available_models', wraps=ai.get_available_models) as discover:
+            self.assertEqual({model_manager.resolve() for _ in range(3)}, {'llama3.1:latest'})
+            self.assertEqual(discover.call_count, 1)
+            model_manager.invalidate()
+            model_manager.resolve()
+            self.assertEqual(discover.call_count, 2)
+
+    def test_loaded_fallback_is_preferred(self):
+        server = start_mock_server(latency=0, models=['llama3:latest', 'mistral:latest'])
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        server.load('mistral:latest')
+        with override_settings(OLLAMA_URL=server.url), self.assertLogs('tasks.ai', 'WARNING'):
+            self.assertEqual(model_manager.resolve(), 'mistral:latest')
+
+    def test_ping_keeps_the_model_loaded_and_calls_report_load_time(self):
+        from .ai import generate_ai_insights
+
+        tasks = [Task.objects.create(title="Tâche", user=self.user)]
+        self.assertGreaterEqual(model_manager.ping(), 0.05)
+        self.assertEqual([model for model, _ in self.ollama.loaded_models()], ['llama3.1:latest'])
+        timings = generate_ai_insights(tasks)['timings']
+        self.assertEqual(timings['load'], 0)
+        self.assertGreater(timings['generation'], 0)
+
+
+class WarmUpTests(MockOllamaTestCase):
+    """Préchauffage des workers : intégration IA chargée hors du démarrage"""
+
+    mock_options = {'load_time': 0.05}
+
+    def test_warm_up_can_be_disabled(self):
+        with override_settings(OLLAMA_WARMUP=False):
+            self.assertIsNone(warm_up_in_background())
+
+    def test_warm_up_loads_the_model_in_a_background_thread(self):
+        with override_settings(OLLAMA_WARMUP=True, OLLAMA_PING_INTERVAL=0):
+            thread = warm_up_in_background()
+            self.assertIsInstance(thread, threading.Thread)
+            thread.join(5)
+        self.assertFalse(thread.is_alive())
+        self.assertEqual([model for model, _ in self.ollama.loaded_models()], ['llama3.1:latest'])
+        # Premier appel après le préchauffage : ni découverte ni chargement
+        with mock.patch('tasks.ai.get_available_models') as discover:
+            self.assertEqual(model_manager.ping(), 0)
+        discover.assert_not_called()
+
+
+class TriageTests(MockOllamaTestCase):
+    """Tri automatique par lots contre le serveur factice"""
+
+    mock_options = {'responder': triage_responder}
+
+    def test_run_triage_applies_suggestions_in_batches(self):
+        Task.objects.bulk_create(Task(title=f"Tâche {i}", user=self.user) for i in range(5))
+        Task.objects.create(title="Terminée", user=self.user, status='done')
+
+        stats = run_triage(batch_size=2, workers=2)
+
+        self.assertEqual((stats['tasks'], stats['triaged'], stats['failed_batches']), (5, 5, 0))
+        self.assertEqual(Task.objects.filter(priority='high', triaged_at__isnull=False).count(), 5)
+        self.assertIsNone(Task.objects.get(status='done').triaged_at)
+
+    def test_concurrent_edit_is_not_overwritten(self):
+        task = Task.objects.create(title="Tâche", user=self.user, priority='low')
+        batch = next(_batches(triage_candidates(), 10))
+        # Modifiée par l'utilisateur pendant l'appel au modèle
+        Task.objects.filter(pk=task.pk).update(priority='urgent', updated_at=timezone.now())
+
+        self.assertEqual(apply_suggestions(batch, {task.pk: ('medium', None)}), 0)
+        task.refresh_from_db()
+        self.assertEqual((task.priority, task.triaged_at), ('urgent', None))
+
+    def test_applied_suggestion_bumps_updated_at(self):
+        task = Task.objects.create(title="Tâche", user=self.user)
+        batch = next(_batches(triage_candidates(), 10))
+        self.assertEqual(apply_suggestions(batch, {task.pk: ('urgent', datetime.date(2030, 1, 31))}), 1)
+        updated = Task.objects.get(pk=task.pk)
+        self.assertEqual((updated.priority, updated.priority_rank), ('urgent', 3))
+        self.assertEqual(updated.due_date.date(), datetime.date(2030, 1, 31))
+        self.assertGreater(updated.updated_at, task.updated_at)
+        self.assertEqual(updated.triaged_at, updated.updated_at)
+
+    def test_batch_is_written_in_a_single_update(self):
+        Task.objects.bulk_create(Task(title=f"Tâche {i}", user=self.user) for i in range(4))
+        batch = next(_batches(triage_candidates(), 10))
+        suggestions = {task.pk: ('high', None) for task in batch}
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(apply_suggestions(batch, suggestions), 4)
+        updates = [query for query in queries if query['sql'].startswith('UPDATE')]
+        self.assertEqual(len(updates), 1)
+        self.assertEqual(Task.objects.filter(priority='high', priority_rank=2).count(), 4)
+
+    def test_command_fails_cleanly_without_ollama(self):
+        Task.objects.create(title="Tâche", user=self.user)
+        model_manager.invalidate()
+        with override_settings(OLLAMA_URL='http://127.0.0.1:9'), self.assertLogs('tasks.ai'), \
+                self.assertRaisesMessage(CommandError, "Aucun modèle Ollama n'est disponible"):
+            call_command('triage_tasks', stdout=io.StringIO())
+        self.assertIsNone(Task.objects.get().triaged_at)
+
+
+class TriageParsingTests(TestCase):
+    """Validation des réponses du modèle et découpage en lots"""
+
+    today = datetime.date(2025, 1, 10)
+
+    def test_parse_suggestions_keeps_valid_entries(self):
+        content = json.dumps({'tasks': [
+            {'id': 1, 'priority': 'HIGH', 'due_date': '2025-01-31'},
+            {'id': 1, 'priority': 'low', 'due_date': None},      # doublon
+            {'id': 2, 'priority': 'critique', 'due_date': None},  # priorité inconnue
+            {'id': 3, 'priority': 'low', 'due_date': '2024-12-31'},  # échéance passée
+            {'id': '4', 'priority': 'urgent', 'due_date': 'demain'},  # date illisible
+            {'id': 99, 'priority': 'low'},                        # hors du lot
+            'texte',
+        ]})
+        with override_settings(TRIAGE_MAX_HORIZON_DAYS=365):
+            accepted, rejected = parse_suggestions(content, {1, 2, 3, 4}, self.today)
+        self.assertEqual(accepted, {
+            1: ('high', datetime.date(2025, 1, 31)), 3: ('low', None), 4: ('urgent', None),
+        })
+        self.assertEqual(rejected, 1)
+
+    def test_parse_suggestions_rejects_malformed_responses(self):
+        for content in ('pas du JSON', '{"tasks": {}}', '42', None):
+            with self.subTest(content=content):
+                self.assertEqual(parse_suggestions(content, {1, 2}, self.today), ({}, 2))
+        # Liste nue acceptée
+        self.assertEqual(parse_suggestions('[{"id": 1, "priority": "low"}]', {1}, self.today), ({1: ('low', None)}, 0))
+
+    def test_batches_follow_keys_and_stop_at_limit(self):
+        user = User.objects.create_user('alice')
+        with override_settings(SEMANTIC_EMBEDDER='hash'):
+            tasks = Task.objects.bulk_create(Task(title=f"Tâche {i}", user=user) for i in range(7))
+        pks = [task.pk for task in tasks]
+        self.assertEqual([[t.pk for t in batch] for batch in _batches(Task.objects.all(), 3)],
+                         [pks[0:3], pks[3:6], pks[6:7]])
+        self.assertEqual([[t.pk for t in batch] for batch in _batches(Task.objects.all(), 3, limit=4)],
+                         [pks[0:3], pks[3:4]])
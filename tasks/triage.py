@@ -0,0 +1,241 @@
+"""
+Tri automatique des tâches par l'IA : priorité et échéance suggérées.
+
+Un appel par tâche prendrait des heures sur un gros arriéré. Ici :
+- les tâches non triées (`triaged_at` vide, hors tâches terminées) sont
+  parcourues par clés croissantes et regroupées en lots de
+  `TRIAGE_BATCH_SIZE` tâches, chaque lot formant un seul prompt en mode
+  JSON ;
+- les lots sont envoyés par un pool borné de threads, via la voie `batch`
+  du limiteur (les requêtes des utilisateurs restent prioritaires) ;
+- chaque réponse est validée (identifiant du lot, priorité connue,
+  échéance dans l'horizon autorisé) puis les suggestions acceptées sont
+  appliquées depuis le thread principal, le seul à écrire en base, et
+  seulement aux tâches non modifiées depuis leur lecture (`updated_at`) :
+  une modification faite pendant l'appel au modèle n'est pas écrasée, la
+  tâche reste à trier ;
+- `triaged_at` est renseigné dans la même écriture : une exécution
+  interrompue reprend là où elle s'était arrêtée. Les tâches d'un lot en
+  échec restent non triées et seront reprises à l'exécution suivante.
+"""
+
+import datetime
+import json
+import logging
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .limiter import ollama_limiter
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+PRIORITIES = [key for key, _ in Task.PRIORITY_CHOICES]
+
+# Heure d'échéance appliquée aux dates suggérées (fin de journée de travail)
+DUE_TIME = datetime.time(18, 0)
+
+# Longueur maximale d'une description envoyée au modèle
+DESCRIPTION_LIMIT = 300
+
+TRIAGE_OPTIONS = {
+    'temperature': 0.1,  # Suggestions stables d'une exécution à l'autre
+}
+
+
+def triage_candidates():
+    """Tâches à trier (servi par l'index partiel sur les tâches non triées)"""
+    return Task.objects.filter(triaged_at__isnull=True).exclude(status='done')
+
+
+def build_triage_prompt(tasks, today):
+    """Prompt d'un lot : les tâches en JSON et le format de réponse attendu"""
+    items = [{
+        'id': task.pk,
+        'titre': task.title,
+        'description': (task.description or '')[:DESCRIPTION_LIMIT],
+        'statut': task.get_status_display(),
+        'priorité_actuelle': task.priority,
+        'échéance_actuelle': task.due_date.date().isoformat() if task.due_date else None,
+    } for task in tasks]
+    return f"""
+    Nous sommes le {today.isoformat()}. Pour chacune des tâches suivantes, propose
+    une priorité parmi {', '.join(PRIORITIES)} et une date d'échéance réaliste
+    (format AAAA-MM-JJ, ou null si aucune échéance ne se justifie).
+
+    Tâches :
+    {json.dumps(items, ensure_ascii=False)}
+
+    Réponds uniquement avec un objet JSON de la forme :
+    {{"tasks": [{{"id": 12, "priority": "high", "due_date": "2025-01-31"}}]}}
+    avec exactement une entrée par tâche, en reprenant son id.
+    """
+
+
+def parse_suggestions(content, task_ids, today):
+    """Valide la réponse du modèle pour un lot.
+
+    Retourne ({id: (priorité, date d'échéance ou None)}, nombre de tâches du
+    lot sans suggestion valide). Une échéance invalide est ignorée sans
+    rejeter la priorité.
+    """
+    try:
+        data = json.loads(content)
+    except (TypeError, ValueError):
+        return {}, len(task_ids)
+    entries = data.get('tasks') if isinstance(data, dict) else data
+    if not isinstance(entries, list):
+        return {}, len(task_ids)
+
+    horizon = today + datetime.timedelta(days=settings.TRIAGE_MAX_HORIZON_DAYS)
+    accepted = {}
+    for entry in entries:
+        if not isinstance(entry, dict):
+            continue
+        try:
+            task_id = int(entry.get('id'))
+        except (TypeError, ValueError):
+            continue
+        priority = str(entry.get('priority', '')).lower()
+        if task_id not in task_ids or task_id in accepted or priority not in PRIORITIES:
+            continue
+        due_date = None
+        try:
+            due_date = datetime.date.fromisoformat(str(entry.get('due_date')))
+        except ValueError:
+            pass
+        if due_date is not None and not today <= due_date <= horizon:
+            due_date = None
+        accepted[task_id] = (priority, due_date)
+    return accepted, len(task_ids) - len(accepted)
+
+
+def suggest_batch(tasks, model, today):
+    """Appel au modèle pour un lot (exécuté dans un thread du pool, sans accès à la base)"""
+    from .ai import _get_sync_clients
+
+    _, ollama_client = _get_sync_clients()
+    with ollama_limiter.slot('batch'):
+        response = ollama_client.chat(
+            model=model,
+            messages=[{'role': 'user', 'content': build_triage_prompt(tasks, today)}],
+            format='json',
+            options={**TRIAGE_OPTIONS, 'num_predict': 40 * len(tasks) + 50},
+            keep_alive=settings.OLLAMA_KEEP_ALIVE,
+        )
+    return parse_suggestions(response['message']['content'], {task.pk for task in tasks}, today)
+
+
+def apply_suggestions(tasks, suggestions, overwrite_due=False):
+    """Applique les suggestions acceptées ; retourne le nombre de tâches triées.
+
+    Une échéance déjà fixée n'est remplacée qu'avec `overwrite_due`. Une
+    tâche modifiée depuis sa lecture (`updated_at` différent) est laissée
+    telle quelle, et reste à trier.
+    """
+    now = timezone.now()
+    tz = timezone.get_current_timezone()
+    suggested = [task for task in tasks if task.pk in suggestions]
+    if not suggested:
+        return 0
+    with transaction.atomic():
+        # Date de modification relue dans la transaction de l'écriture
+        current = dict(
+            Task.objects.select_for_update()
+            .filter(pk__in=[task.pk for task in suggested])
+            .values_list('pk', 'updated_at')
+        )
+        changed = []
+        for task in suggested:
+            if current.get(task.pk) != task.updated_at:
+                continue
+            priority, due_date = suggestions[task.pk]
+            task.priority, task.triaged_at, task.updated_at = priority, now, now
+            if due_date and (overwrite_due or task.due_date is None):
+                task.due_date = datetime.datetime.combine(due_date, DUE_TIME, tzinfo=tz)
+            changed.append(task)
+        if changed:
+            # Un seul UPDATE pour le lot ; priority_rank suit `priority`
+            # (TaskQuerySet.bulk_update)
+            Task.objects.bulk_update(
+                changed, ['priority', 'due_date', 'triaged_at', 'updated_at'], batch_size=len(changed),
+            )
+    return len(changed)
+
+
+def _batches(queryset, batch_size, limit=None):
+    """Lots de tâches par clés croissantes (curseur : la requête reste servie par index)"""
+    last_pk, sent = 0, 0
+    fields = ('pk', 'title', 'description', 'status', 'priority', 'due_date', 'updated_at')
+    while limit is None or sent < limit:
+        size = batch_size if limit is None else min(batch_size, limit - sent)
+        batch = list(queryset.filter(pk__gt=last_pk).order_by('pk').only(*fields)[:size])
+        if not batch:
+            return
+        last_pk = batch[-1].pk
+        sent += len(batch)
+        yield batch
+
+
+def run_triage(queryset=None, batch_size=None, workers=None, limit=None,
+               overwrite_due=False, dry_run=False, progress=None):
+    """Trie les tâches du queryset (par défaut toutes les tâches à trier).
+
+    Retourne un dictionnaire de statistiques (tâches envoyées, triées,
+    suggestions rejetées, lots en échec, durée). `progress` est appelé après
+    chaque lot avec ces statistiques.
+    """
+    from .ai import model_manager
+
+    queryset = triage_candidates() if queryset is None else queryset
+    batch_size = batch_size or settings.TRIAGE_BATCH_SIZE
+    workers = workers or settings.OLLAMA_CONCURRENCY
+    model = model_manager.resolve()
+    today = timezone.localdate()
+    stats = {'model': model, 'tasks': 0, 'triaged': 0, 'rejected': 0, 'failed_batches': 0, 'elapsed': 0.0}
+    start = time.perf_counter()
+
+    batches = _batches(queryset, batch_size, limit)
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='triage') as pool:
+        pending = {}
+
+        def submit():
+            batch = next(batches, None)
+            if batch is not None:
+                pending[pool.submit(suggest_batch, batch, model, today)] = batch
+            return batch is not None
+
+        # Au plus deux lots en attente par thread : l'arriéré n'est pas chargé d'un coup
+        while len(pending) < 2 * workers and submit():
+            pass
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                batch = pending.pop(future)
+                stats['tasks'] += len(batch)
+                try:
+                    suggestions, rejected = future.result()
+                except Exception as e:
+                    stats['failed_batches'] += 1
+                    logger.error(f"Tri automatique : échec d'un lot de {len(batch)} tâche(s) : {e}")
+                    continue
+                stats['rejected'] += rejected
+                if dry_run:
+                    stats['triaged'] += len(suggestions)
+                else:
+                    stats['triaged'] += apply_suggestions(batch, suggestions, overwrite_due)
+                stats['elapsed'] = time.perf_counter() - start
+                if progress:
+                    progress(stats, batch, suggestions)
+                submit()
+
+    stats['elapsed'] = time.perf_counter() - start
+    logger.info(
+        f"Tri automatique : {stats['triaged']}/{stats['tasks']} tâche(s) triée(s) "
+        f"en {stats['elapsed']:.1f} s ({stats['tasks'] / (stats['elapsed'] or 1):.1f} tâches/s)"
+    )
+    return stats
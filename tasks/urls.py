@@ -20,12 +20,31 @@ urlpatterns = [
     # Supprimer une tâche
     path('task/<int:pk>/delete/', views.TaskDeleteView.as_view(), name='task_delete'),
     
+    # Restaurer une tâche archivée
+    path('archive/<int:pk>/restore/', views.restore_archived_task, name='task_restore'),
+    
     # Changer le statut d'une tâche (AJAX)
     path('task/<int:pk>/toggle-status/', views.toggle_task_status, name='task_toggle_status'),
     
+    # Changements de statut regroupés (AJAX)
+    path('api/tasks/toggle-status/', views.toggle_task_status_batch, name='task_toggle_status_batch'),
+    
     # Obtenir des insights IA
     path('insights/', views.get_ai_insights, name='ai_insights'),
     
     # API pour les insights (pour les appels AJAX)
     path('api/insights/', views.ai_insights_api, name='ai_insights_api'),
+    
+    # Indicateurs de flux : débit, travail en cours, temps de cycle
+    path('api/analytics/', views.analytics_api, name='analytics_api'),
+    
+    # Flux iCalendar des échéances (URL à jeton signé, pour les agendas)
+    path('calendar/<str:token>.ics', views.calendar_feed, name='calendar_feed'),
+    
+    # Sondes des répartiteurs de charge : vie et disponibilité
+    path('healthz', views.liveness, name='liveness'),
+    path('readyz', views.readiness, name='readiness'),
+    
+    # Métriques (format Prometheus)
+    path('metrics', views.metrics_view, name='metrics'),
 ]
@@ -1,32 +1,85 @@
+from django.conf import settings
 from django.shortcuts import render, get_object_or_404, redirect
+from django.views.decorators.cache import never_cache
 from django.views.generic import ListView, DetailView, CreateView, UpdateView, DeleteView
 from django.contrib import messages
-from django.http import JsonResponse
-from django.urls import reverse_lazy
+from django.contrib.auth.decorators import login_required
+from django.contrib.auth.mixins import LoginRequiredMixin
+from django.http import Http404, HttpResponse, HttpResponseBadRequest, JsonResponse, StreamingHttpResponse
+from django.urls import reverse, reverse_lazy
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
 from django.utils import timezone
+from django.core.handlers.asgi import ASGIRequest
 from django.core.paginator import Paginator
-from django.db.models import Q
-from django.conf import settings
-import ollama
+from django.db.models import Case, Count, F, IntegerField, Max, Q, Value, When
+from django.db import transaction
 import json
 import logging
-import requests
-from .models import Task
+from .limiter import OllamaBusy, ollama_limiter
+from .models import ArchivedTask, Task, batch_task_events, due_date_missing, priority_rank_expression
 from .forms import TaskForm
+from . import ical, metrics
+from .health import health_monitor
 
 # Configuration du logging
 logger = logging.getLogger(__name__)
 
-class TaskListView(ListView):
+class OwnedTaskMixin(LoginRequiredMixin):
+    """Restreint les vues aux tâches de l'utilisateur connecté"""
+    
+    def get_queryset(self):
+        return Task.objects.for_user(self.request.user)
+
+class TaskListView(OwnedTaskMixin, ListView):
     """Vue pour afficher la liste des tâches avec filtres et pagination"""
     model = Task
     template_name = 'tasks/task_list.html'
     context_object_name = 'tasks'
     paginate_by = 10  # 10 tâches par page
     
+    # Modes fragment (requêtes AJAX de filtrage/pagination) : 'html' renvoie
+    # uniquement la grille et la pagination, 'json' des lignes compactes
+    FRAGMENT_MODES = ('html', 'json')
+    
+    # Tris proposés (paramètre `sort`) : libellé et clés de tri. Chacun suit
+    # un index (user, ...) : pas de tri en mémoire, même sur un gros compte.
+    # `undated` (tâche sans échéance) range ces tâches après les tâches datées
+    # Clé primaire en dernier critère : ordre total, une tâche ne change pas
+    # de page d'un chargement à l'autre (dates ou échéances égales). Toujours
+    # croissante : les entrées d'index se terminent par le rowid croissant,
+    # un `-pk` ajouterait un tri temporaire (« USE TEMP B-TREE »)
+    SORTS = {
+        'recent': ("Plus récentes", ('-created_at', 'pk')),
+        'urgency': ("Urgence puis échéance", ('-priority_rank', 'undated', 'due_date', 'pk')),
+        'due': ("Échéance la plus proche", (F('due_date').asc(nulls_last=True), 'pk')),
+        'updated': ("Modifiées récemment", ('-updated_at', 'pk')),
+    }
+    DEFAULT_SORT = 'recent'
+    
+    @property
+    def sort(self):
+        sort = self.request.GET.get('sort')
+        return sort if sort in self.SORTS else self.DEFAULT_SORT
+    
+    @property
+    def include_archived(self):
+        """Interroger aussi la table d'archive (hors recherche sémantique)"""
+        return bool(self.request.GET.get('archived')) and not self.request.GET.get('semantic')
+    
+    @property
+    def fragment(self):
+        mode = self.request.GET.get('fragment')
+        return mode if mode in self.FRAGMENT_MODES else None
+    
+    def get_template_names(self):
+        if self.fragment == 'html':
+            return ['tasks/task_grid.html']
+        return super().get_template_names()
+    
     def get_queryset(self):
         """Filtre les tâches selon les paramètres de recherche"""
-        queryset = Task.objects.all()
+        queryset = super().get_queryset()
         
         # Filtre par statut
         status = self.request.GET.get('status')
@@ -40,53 +93,148 @@ class TaskListView(ListView):
         
         # Recherche dans le titre et la description
         search = self.request.GET.get('search')
+        if search and self.request.GET.get('semantic'):
+            # Recherche sémantique : classement par similarité
+            from .semantic import semantic_search
+            ids = semantic_search(search, user_id=self.request.user.pk)
+            ranking = Case(
+                *[When(pk=pk, then=Value(rank)) for rank, pk in enumerate(ids)],
+                output_field=IntegerField(),
+            )
+            return queryset.filter(pk__in=ids).order_by(ranking) if ids else queryset.none()
         if search:
             queryset = queryset.filter(
                 Q(title__icontains=search) | 
                 Q(description__icontains=search)
             )
         
-        return queryset.order_by('-created_at')
+        ordering = self.SORTS[self.sort][1]
+        if self.include_archived:
+            return self._with_archived(queryset, status, priority, search).order_by(*ordering)
+        
+        return queryset.alias(undated=due_date_missing()).order_by(*ordering)
+    
+    def _with_archived(self, queryset, status, priority, search):
+        """Union des deux tables, réduite aux clés de tri et à `archived` pour le
+        tri et la pagination ; les objets de la page sont chargés ensuite"""
+        archived = ArchivedTask.objects.filter(user=self.request.user)
+        if status and status != 'done':
+            archived = archived.none()
+        if priority:
+            archived = archived.filter(priority=priority)
+        if search:
+            archived = archived.filter(
+                Q(title__icontains=search) | 
+                Q(description__icontains=search)
+            )
+        # Les tâches archivées n'ont pas de colonne de rang : calculé à la volée
+        archived = archived.annotate(priority_rank=priority_rank_expression(F('priority')))
+        
+        def rows(qs, flag):
+            return qs.order_by().annotate(archived=Value(flag), undated=due_date_missing()).values(
+                'pk', 'created_at', 'updated_at', 'due_date', 'priority_rank', 'undated', 'archived'
+            )
+        
+        return rows(queryset, False).union(rows(archived, True), all=True)
+    
+    def paginate_queryset(self, queryset, page_size):
+        paginator, page, object_list, is_paginated = super().paginate_queryset(queryset, page_size)
+        if self.include_archived:
+            rows = list(object_list)
+            hot = Task.objects.in_bulk([row['pk'] for row in rows if not row['archived']])
+            cold = ArchivedTask.objects.in_bulk([row['pk'] for row in rows if row['archived']])
+            object_list = [
+                task for task in ((cold if row['archived'] else hot).get(row['pk']) for row in rows)
+                if task is not None
+            ]
+            page.object_list = object_list
+        return paginator, page, object_list, is_paginated
     
     def get_context_data(self, **kwargs):
         """Ajoute des données supplémentaires au contexte"""
         context = super().get_context_data(**kwargs)
         
-        # Statistiques
-        context['stats'] = {
-            'total': Task.objects.count(),
-            'todo': Task.objects.filter(status='todo').count(),
-            'doing': Task.objects.filter(status='doing').count(),
-            'done': Task.objects.filter(status='done').count(),
-            'overdue': sum(1 for task in Task.objects.all() if task.is_overdue()),
-        }
+        # En mode fragment, ni statistiques ni formulaire : seule la grille est rendue
+        if self.fragment:
+            return context
+        
+        # Statistiques de l'utilisateur : une seule requête d'agrégation
+        # servie par l'index (user, status, due_date)
+        context['stats'] = Task.objects.for_user(self.request.user).aggregate(
+            total=Count('pk'),
+            todo=Count('pk', filter=Q(status='todo')),
+            doing=Count('pk', filter=Q(status='doing')),
+            done=Count('pk', filter=Q(status='done')),
+            overdue=Count('pk', filter=Q(due_date__lt=timezone.now()) & ~Q(status='done')),
+        )
         
         # Paramètres de filtre actuels
         context['current_status'] = self.request.GET.get('status', '')
         context['current_priority'] = self.request.GET.get('priority', '')
         context['current_search'] = self.request.GET.get('search', '')
+        context['current_semantic'] = bool(self.request.GET.get('semantic'))
+        context['current_archived'] = bool(self.request.GET.get('archived'))
+        context['current_sort'] = self.sort
+        context['sorts'] = [(key, label) for key, (label, _) in self.SORTS.items()]
+        context['calendar_feed_url'] = self.request.build_absolute_uri(
+            reverse('tasks:calendar_feed', args=[ical.feed_token(self.request.user)])
+        )
         
         return context
+    
+    def render_to_response(self, context, **response_kwargs):
+        if self.fragment == 'json':
+            page = context['page_obj']
+            return JsonResponse({
+                'tasks': [{
+                    'id': task.pk,
+                    'title': task.title,
+                    'status': task.status,
+                    'status_display': task.get_status_display(),
+                    'priority': task.priority,
+                    'priority_display': task.get_priority_display(),
+                    'due_date': task.due_date.isoformat() if task.due_date else None,
+                    'overdue': task.is_overdue(),
+                    'archived': getattr(task, 'archived', False),
+                } for task in context['tasks']],
+                'page': page.number,
+                'num_pages': page.paginator.num_pages,
+            })
+        return super().render_to_response(context, **response_kwargs)
 
-class TaskDetailView(DetailView):
+class TaskDetailView(OwnedTaskMixin, DetailView):
     """Vue pour afficher le détail d'une tâche"""
     model = Task
     template_name = 'tasks/task_detail.html'
     context_object_name = 'task'
 
-class TaskCreateView(CreateView):
+def warn_near_duplicates(request, form):
+    """Ajoute un avertissement si le formulaire a détecté des tâches similaires"""
+    duplicates = getattr(form, 'near_duplicates', [])
+    if duplicates:
+        titles = ', '.join(f"« {task.title} » ({score:.0%})" for task, score in duplicates)
+        messages.warning(request, f'Tâche(s) très similaire(s) déjà existante(s) : {titles}')
+
+class TaskCreateView(LoginRequiredMixin, CreateView):
     """Vue pour créer une nouvelle tâche"""
     model = Task
     form_class = TaskForm
     template_name = 'tasks/task_form.html'
     success_url = reverse_lazy('tasks:task_list')
     
+    def get_form_kwargs(self):
+        """La tâche créée appartient à l'utilisateur connecté"""
+        kwargs = super().get_form_kwargs()
+        kwargs['instance'] = Task(user=self.request.user)
+        return kwargs
+    
     def form_valid(self, form):
         """Traitement après validation du formulaire"""
         messages.success(self.request, 'Tâche créée avec succès !')
+        warn_near_duplicates(self.request, form)
         return super().form_valid(form)
 
-class TaskUpdateView(UpdateView):
+class TaskUpdateView(OwnedTaskMixin, UpdateView):
     """Vue pour modifier une tâche existante"""
     model = Task
     form_class = TaskForm
@@ -96,9 +244,10 @@ class TaskUpdateView(UpdateView):
     def form_valid(self, form):
         """Traitement après validation du formulaire"""
         messages.success(self.request, 'Tâche modifiée avec succès !')
+        warn_near_duplicates(self.request, form)
         return super().form_valid(form)
 
-class TaskDeleteView(DeleteView):
+class TaskDeleteView(OwnedTaskMixin, DeleteView):
     """Vue pour supprimer une tâche"""
     model = Task
     template_name = 'tasks/task_confirm_delete.html'
@@ -109,14 +258,28 @@ class TaskDeleteView(DeleteView):
         messages.success(self.request, 'Tâche supprimée avec succès !')
         return super().delete(request, *args, **kwargs)
 
+@login_required
+def restore_archived_task(request, pk):
+    """Remet une tâche archivée de l'utilisateur dans la table active"""
+    if request.method != 'POST':
+        return redirect('tasks:task_list')
+    
+    from .archive import restore_tasks
+    archived = get_object_or_404(ArchivedTask, pk=pk, user=request.user)
+    restore_tasks(ArchivedTask.objects.filter(pk=archived.pk))
+    messages.success(request, 'Tâche restaurée avec succès !')
+    return redirect('tasks:task_detail', pk=pk)
+
+# Cycle des statuts : todo -> doing -> done -> todo
+STATUS_CYCLE = {'todo': 'doing', 'doing': 'done', 'done': 'todo'}
+
+@login_required
 def toggle_task_status(request, pk):
     """Vue AJAX pour changer le statut d'une tâche"""
     if request.method == 'POST':
-        task = get_object_or_404(Task, pk=pk)
+        task = get_object_or_404(Task.objects.for_user(request.user), pk=pk)
         
-        # Cycle des statuts : todo -> doing -> done -> todo
-        status_cycle = {'todo': 'doing', 'doing': 'done', 'done': 'todo'}
-        task.status = status_cycle.get(task.status, 'todo')
+        task.status = STATUS_CYCLE.get(task.status, 'todo')
         task.save()
         
         return JsonResponse({
@@ -127,83 +290,202 @@ def toggle_task_status(request, pk):
     
     return JsonResponse({'success': False, 'error': 'Méthode non autorisée'})
 
-def check_ollama_connection():
-    """Vérifie si Ollama est accessible"""
+# Nombre maximal de tâches par lot de changements de statut
+MAX_TOGGLE_BATCH = 100
+
+@login_required
+def toggle_task_status_batch(request):
+    """Vue AJAX : applique en un seul appel les changements de statut regroupés côté client.
+    
+    Corps attendu : {"tasks": [{"id": 12, "toggles": 2}, ...]} où `toggles` est
+    le nombre de clics accumulés sur la tâche pendant la fenêtre de regroupement.
+    """
+    if request.method != 'POST':
+        return JsonResponse({'success': False, 'error': 'Méthode non autorisée'})
+    
     try:
-        response = requests.get(f"{settings.OLLAMA_URL}/api/tags", timeout=5)
-        return response.status_code == 200
-    except Exception as e:
-        logger.error(f"Impossible de se connecter à Ollama : {e}")
-        return False
+        payload = json.loads(request.body or b'{}')
+        toggles = {int(item['id']): int(item.get('toggles', 1)) % len(STATUS_CYCLE)
+                   for item in payload.get('tasks', [])}
+    except (ValueError, TypeError, KeyError, AttributeError):
+        return JsonResponse({'success': False, 'error': 'Requête invalide'}, status=400)
+    
+    if len(toggles) > MAX_TOGGLE_BATCH:
+        return JsonResponse({'success': False, 'error': 'Trop de tâches dans le lot'}, status=400)
+    
+    results = []
+    # Une transaction, et un seul INSERT pour l'historique des statuts du lot
+    with transaction.atomic(), batch_task_events():
+        tasks = Task.objects.for_user(request.user).select_for_update().in_bulk(list(toggles))
+        for task_id, count in toggles.items():
+            task = tasks.get(task_id)
+            if task is None:
+                results.append({'id': task_id, 'success': False, 'error': 'Tâche introuvable'})
+                continue
+            if count:
+                for _ in range(count):
+                    task.status = STATUS_CYCLE.get(task.status, 'todo')
+                task.save(update_fields=['status', 'updated_at'])
+            results.append({
+                'id': task_id,
+                'success': True,
+                'new_status': task.status,
+                'status_display': task.get_status_display(),
+            })
+    
+    return JsonResponse({'success': True, 'results': results})
 
-def get_available_models():
-    """Récupère la liste des modèles disponibles"""
+@login_required
+def analytics_api(request):
+    """Indicateurs de flux (débit, WIP, temps de cycle) des `days` derniers jours, en JSON"""
+    # numpy et le module d'analyse chargés à la demande
+    from .analytics import task_analytics
     try:
-        response = requests.get(f"{settings.OLLAMA_URL}/api/tags", timeout=5)
-        if response.status_code == 200:
-            data = response.json()
-            return [model['name'] for model in data.get('models', [])]
-        return []
-    except Exception as e:
-        logger.error(f"Erreur lors de la récupération des modèles : {e}")
-        return []
+        days = int(request.GET.get('days', 30))
+    except ValueError:
+        return JsonResponse({'success': False, 'error': 'Paramètre days invalide'}, status=400)
+    days = max(1, min(days, settings.ANALYTICS_MAX_DAYS))
+    return JsonResponse({'success': True, 'analytics': task_analytics(request.user, days)})
+
+def calendar_feed(request, token):
+    """Flux iCalendar des échéances, authentifié par le jeton signé de l'URL.
+    
+    Filtres `status` et `priority` ; réponse 304 si l'ETag (nombre de tâches
+    et dernière modification) n'a pas changé.
+    """
+    user_id = ical.user_id_from_token(token)
+    if user_id is None:
+        raise Http404("Flux inconnu")
+    try:
+        filters = ical.parse_filters(request.GET)
+    except ValueError as e:
+        return HttpResponseBadRequest(str(e))
+    
+    queryset = ical.feed_queryset(user_id, filters)
+    state = queryset.aggregate(count=Count('pk'), latest=Max('updated_at'))
+    latest = state['latest'].timestamp() if state['latest'] else 0
+    etag = f'"{state["count"]}-{int(latest * 1e6):x}"'
+    
+    response = get_conditional_response(request, etag=etag, last_modified=int(latest) or None)
+    if response is not None:
+        metrics.inc('cache_requests_total', cache='calendar_feed', result='hit')
+    else:
+        metrics.inc('cache_requests_total', cache='calendar_feed', result='miss')
+        host = request.get_host()
+        origin = f"{request.scheme}://{host}"
+        # Sous ASGI, générateur asynchrone : envoyé au fil de la lecture
+        stream = ical.astream_feed if isinstance(request, ASGIRequest) else ical.stream_feed
+        response = StreamingHttpResponse(
+            stream(queryset, host, lambda pk: origin + reverse('tasks:task_detail', args=[pk])),
+            content_type='text/calendar; charset=utf-8',
+        )
+        response['Content-Disposition'] = 'inline; filename="taches.ics"'
+    response['ETag'] = etag
+    if latest:
+        response['Last-Modified'] = http_date(latest)
+    # Toujours revalider : la vérification de l'ETag ne coûte qu'une agrégation
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+@never_cache
+def liveness(request):
+    """Sonde de vie : le processus répond (aucune dépendance consultée)"""
+    return JsonResponse({'status': 'ok'})
+
+@never_cache
+def readiness(request):
+    """Sonde de disponibilité : derniers résultats des sondes de fond (503 si la base est indisponible)"""
+    ready, report = health_monitor.readiness()
+    return JsonResponse(report, status=200 if ready else 503)
+
+def metrics_view(request):
+    """Exposition des métriques au format texte Prometheus (tous workers confondus)"""
+    if not metrics.is_authorized(request):
+        response = HttpResponse('Accès refusé\n', status=401, content_type='text/plain; charset=utf-8')
+        response['WWW-Authenticate'] = 'Bearer realm="metrics"'
+        return response
+    return HttpResponse(
+        metrics.registry.render(),
+        content_type='text/plain; version=0.0.4; charset=utf-8'
+    )
 
-def get_ai_insights(request):
-    """Vue pour afficher les insights IA"""
+@login_required
+async def get_ai_insights(request):
+    """Vue pour afficher les insights IA (asynchrone : l'appel au LLM ne bloque pas de worker)"""
+    # Intégration IA chargée à la demande (démarrage des workers plus rapide)
+    from .ai import acheck_ollama_connection, agenerate_ai_insights
     try:
         # Vérification de la connexion Ollama
-        if not check_ollama_connection():
+        if not await acheck_ollama_connection():
             messages.error(request, 'Ollama n\'est pas accessible. Assurez-vous qu\'il est démarré sur le port 11434.')
             return redirect('tasks:task_list')
         
-        # Récupération des tâches
-        tasks = Task.objects.all()
+        # Récupération des tâches. L'utilisateur chargé remplace `request.user`
+        # (chargement paresseux et synchrone) : le gabarit de base l'affiche
+        user = request.user = await request.auser()
+        tasks = [task async for task in Task.objects.for_user(user)]
         
-        if not tasks.exists():
+        if not tasks:
             messages.info(request, 'Aucune tâche trouvée. Ajoutez des tâches pour obtenir des insights.')
             return redirect('tasks:task_list')
         
         # Préparation des données pour l'IA
-        insights = generate_ai_insights(tasks)
+        insights = await agenerate_ai_insights(tasks, client=user.pk)
         
         context = {
             'insights': insights,
-            'tasks_count': tasks.count(),
+            'tasks_count': len(tasks),
         }
         
         return render(request, 'tasks/ai_insights.html', context)
         
+    except OllamaBusy:
+        messages.warning(request, 'Le modèle est très sollicité, réessayez dans quelques instants.')
+        return redirect('tasks:task_list')
     except Exception as e:
         logger.error(f"Erreur lors de la génération des insights : {e}")
         messages.error(request, f'Erreur lors de la génération des insights : {str(e)}')
         return redirect('tasks:task_list')
 
-def ai_insights_api(request):
-    """API pour les insights IA (appels AJAX)"""
+@login_required
+async def ai_insights_api(request):
+    """API pour les insights IA (appels AJAX, asynchrone)"""
+    from .ai import acheck_ollama_connection, agenerate_ai_insights
     if request.method == 'GET':
         try:
             # Vérification de la connexion Ollama
-            if not check_ollama_connection():
+            if not await acheck_ollama_connection():
                 return JsonResponse({
                     'success': False,
                     'error': 'Ollama n\'est pas accessible'
                 })
             
-            tasks = Task.objects.all()
+            user = request.user = await request.auser()
+            tasks = [task async for task in Task.objects.for_user(user)]
             
-            if not tasks.exists():
+            if not tasks:
                 return JsonResponse({
                     'success': False,
                     'message': 'Aucune tâche trouvée'
                 })
             
-            insights = generate_ai_insights(tasks)
+            insights = await agenerate_ai_insights(tasks, client=user.pk)
             
             return JsonResponse({
                 'success': True,
-                'insights': insights
+                'insights': insights,
+                'queue': ollama_limiter.stats(),
             })
             
+        except OllamaBusy as e:
+            # Refus immédiat plutôt qu'une requête qui expire
+            response = JsonResponse({
+                'success': False,
+                'error': str(e),
+                'queue': ollama_limiter.stats(),
+            }, status=503)
+            response['Retry-After'] = str(e.retry_after)
+            return response
         except Exception as e:
             logger.error(f"Erreur API insights : {e}")
             return JsonResponse({
@@ -212,119 +494,3 @@ def ai_insights_api(request):
             })
     
     return JsonResponse({'success': False, 'error': 'Méthode non autorisée'})
-
-def generate_ai_insights(tasks):
-    """Génère des insights IA basés sur les tâches"""
-    try:
-        # Vérifier les modèles disponibles
-        available_models = get_available_models()
-        logger.info(f"Modèles disponibles : {available_models}")
-        
-        # Déterminer le modèle à utiliser
-        model_to_use = None
-        possible_models = [
-            settings.OLLAMA_MODEL,  # D'abord le modèle configuré
-            'llama3.1:latest',
-            'llama3.1',
-            'llama3:latest', 
-            'llama3',
-            'mistral:latest',
-            'mistral'
-        ]
-        
-        for model in possible_models:
-            if model in available_models:
-                model_to_use = model
-                break
-        
-        if not model_to_use:
-            if available_models:
-                model_to_use = available_models[0]  # Utiliser le premier modèle disponible
-                logger.warning(f"Modèle configuré non trouvé, utilisation de {model_to_use}")
-            else:
-                raise Exception("Aucun modèle Ollama n'est disponible. Veuillez installer un modèle avec 'ollama pull llama3.1'")
-        
-        # Préparation des données des tâches
-        task_data = []
-        for task in tasks:
-            task_info = {
-                'titre': task.title,
-                'description': task.description or 'Pas de description',
-                'statut': task.get_status_display(),
-                'priorité': task.get_priority_display(),
-                'créée_le': task.created_at.strftime('%d/%m/%Y'),
-                'en_retard': task.is_overdue()
-            }
-            task_data.append(task_info)
-        
-        # Statistiques rapides
-        stats = {
-            'total': len(task_data),
-            'à_faire': len([t for t in task_data if t['statut'] == 'À faire']),
-            'en_cours': len([t for t in task_data if t['statut'] == 'En cours']),
-            'terminées': len([t for t in task_data if t['statut'] == 'Terminé']),
-            'en_retard': len([t for t in task_data if t['en_retard']])
-        }
-        
-        # Construction du prompt pour l'IA
-        prompt = f"""
-        Analyse ces {stats['total']} tâches et fournis des insights utiles en français :
-
-        Statistiques :
-        - Total : {stats['total']} tâches
-        - À faire : {stats['à_faire']}
-        - En cours : {stats['en_cours']}
-        - Terminées : {stats['terminées']}
-        - En retard : {stats['en_retard']}
-
-        Détail des tâches :
-        {json.dumps(task_data, indent=2, ensure_ascii=False)}
-
-        Fournis une analyse structurée avec :
-        1. Un résumé général de la situation
-        2. Les priorités recommandées
-        3. Des conseils d'organisation
-        4. Des points d'attention particuliers
-
-        Réponds en français, de manière concise et actionnable.
-        """
-        
-        # Configuration du client Ollama
-        client = ollama.Client(host=settings.OLLAMA_URL)
-        
-        # Appel à Ollama
-        logger.info(f"Utilisation du modèle : {model_to_use}")
-        response = client.chat(
-            model=model_to_use,
-            messages=[{
-                'role': 'user',
-                'content': prompt
-            }],
-            options={
-                'temperature': 0.7,
-                'top_p': 0.9,
-                'num_predict': 800,  # Limiter la longueur de la réponse
-            }
-        )
-        
-        insights = response['message']['content']
-        
-        return {
-            'analysis': insights,
-            'stats': stats,
-            'model_used': model_to_use,
-            'generated_at': timezone.now().strftime('%d/%m/%Y à %H:%M')
-        }
-        
-    except Exception as e:
-        logger.error(f"Erreur génération insights : {e}")
-        error_msg = str(e)
-        if "model" in error_msg.lower() and "not found" in error_msg.lower():
-            error_msg += "\n\nPour résoudre ce problème :\n1. Ouvrez un terminal\n2. Exécutez : ollama pull llama3.1\n3. Attendez le téléchargement\n4. Réessayez"
-        
-        return {
-            'analysis': f"Erreur lors de la génération des insights : {error_msg}",
-            'stats': {},
-            'model_used': 'N/A',
-            'generated_at': timezone.now().strftime('%d/%m/%Y à %H:%M')
-        }
\ No newline at end of file
@@ -0,0 +1,36 @@
+"""
+Préchauffage des workers.
+
+Appelé par `task_project/wsgi.py` et `task_project/asgi.py` une fois
+l'application chargée : un thread importe l'intégration IA (`tasks.ai`) et
+ouvre une connexion vers Ollama, pour que la première requête d'insights ne
+paie ni l'import ni l'établissement de la connexion. Le démarrage du worker
+n'attend pas ce thread.
+
+Avec `gunicorn --preload`, le module WSGI est chargé par le processus
+maître avant le fork : le thread n'existe alors pas dans les workers.
+"""
+
+import logging
+import threading
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+def _warm_up():
+    try:
+        from .ai import warm_up
+        warm_up()
+    except Exception as e:
+        logger.warning(f"Préchauffage de l'intégration IA impossible : {e}")
+
+
+def warm_up_in_background():
+    """Lance le préchauffage dans un thread (désactivable par OLLAMA_WARMUP=False)"""
+    if not settings.OLLAMA_WARMUP:
+        return None
+    thread = threading.Thread(target=_warm_up, name='ollama-warm-up', daemon=True)
+    thread.start()
+    return thread